@@ -0,0 +1,218 @@
+"""
+End-to-end benchmark of typical request patterns against a local stand-in
+for a Productstatus server, implemented in `benchmarks/fake_server.py`.
+
+The scenarios are:
+
+* sweep:           iterate over all data instances, page by page
+* traverse:        follow datainstance.data.productinstance.product for each
+                   of the first data instances, loading related resources lazily
+* traverse-set:    the same, fetching the related resources of each level in
+                   bulk through Tastypie `set/` endpoints
+* ingest:          create product instance, data and data instance chains,
+                   saving each resource separately
+* ingest-session:  the same, saving the chains in a unit-of-work session
+* find-or-create:  find or create products by slug, half of which exist,
+                   with find_or_create_many(), and again using its memo
+
+For each scenario, the number of items processed and requests sent per
+second is reported, along with the median and 99th percentile request
+latency.
+
+Usage:
+
+    python benchmarks/end_to_end.py [scenario ...] [--items N] [--latency-ms MS] ...
+"""
+
+import os
+import sys
+import time
+import argparse
+import datetime
+import dateutil.tz
+
+# Import the client library from this source tree, so that the benchmarks
+# run without installing it.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import productstatus.api
+import productstatus.metrics
+
+import fake_server
+
+
+def sweep(api, options):
+    count = 0
+    for datainstance in api.datainstance.objects.limit(options.page_size):
+        datainstance.url
+        count += 1
+    return count
+
+
+def traverse(api, options):
+    datainstances = api.datainstance.objects.limit(options.items)
+    count = min(options.items, datainstances.count())
+    for index in range(count):
+        datainstances[index].data.productinstance.product.slug
+    return count
+
+
+def fetch_set(api, collection, uris, chunk_size=100):
+    """
+    Fetch resources by URI through the `set/` endpoint of a collection,
+    returning a dictionary of Resource objects by URI.
+    """
+    collection = getattr(api, collection)
+    ids = sorted(set(x.rstrip('/').split('/')[-1] for x in uris))
+    resources = {}
+    for offset in range(0, len(ids), chunk_size):
+        url = '%sset/%s/' % (collection._url, ';'.join(ids[offset:offset + chunk_size]))
+        for item in api._get_response_data(api._do_request('get', url))['objects']:
+            resources[item['resource_uri']] = api._resource_class(api, collection, item['id'], item)
+    return resources
+
+
+def traverse_set(api, options):
+    datainstances = api.datainstance.objects.limit(options.items)
+    datainstances = [datainstances[x] for x in range(min(options.items, datainstances.count()))]
+    level = datainstances
+    for field, collection in [('data', 'data'), ('productinstance', 'productinstance'), ('product', 'product')]:
+        related = fetch_set(api, collection, [x._data[field].resource_uri for x in level])
+        for resource in level:
+            resource._data[field] = related[resource._data[field].resource_uri]
+        level = list(related.values())
+    for datainstance in datainstances:
+        datainstance.data.productinstance.product.slug
+    return len(datainstances)
+
+
+def _chain(api, product, index):
+    reference_time = datetime.datetime(2020, 1, 1, tzinfo=dateutil.tz.tzutc()) + datetime.timedelta(hours=index)
+    productinstance = api.productinstance.create()
+    productinstance.product = product
+    productinstance.reference_time = reference_time
+    productinstance.version = 1
+    data = api.data.create()
+    data.productinstance = productinstance
+    data.time_period_begin = reference_time
+    data.time_period_end = reference_time + datetime.timedelta(hours=1)
+    datainstance = api.datainstance.create()
+    datainstance.data = data
+    datainstance.url = 'file:///lustre/storeA/ingest/%d.nc' % index
+    datainstance.format = 'netcdf'
+    datainstance.expires = reference_time + datetime.timedelta(days=7)
+    datainstance.deleted = False
+    datainstance.partial = False
+    return [productinstance, data, datainstance]
+
+
+def ingest(api, options):
+    product = api.product.objects.limit(1)[0]
+    for index in range(options.items):
+        for resource in _chain(api, product, index):
+            resource.save()
+    return options.items
+
+
+def ingest_session(api, options):
+    product = api.product.objects.limit(1)[0]
+    with api.session():
+        for index in range(options.items):
+            _chain(api, product, index)
+    return options.items
+
+
+def find_or_create(api, options):
+    data = [{'slug': 'product-%d' % (index - options.items // 2), 'name': 'Product %d' % index}
+            for index in range(options.items)]
+    productstatus.api.clear_find_or_create_memo()
+    api.product.find_or_create_many(data, memo=True)
+    api.product.find_or_create_many(data, memo=True)
+    productstatus.api.clear_find_or_create_memo()
+    return options.items * 2
+
+
+SCENARIOS = [
+    ('sweep', sweep),
+    ('traverse', traverse),
+    ('traverse-set', traverse_set),
+    ('ingest', ingest),
+    ('ingest-session', ingest_session),
+    ('find-or-create', find_or_create),
+]
+
+
+def run_scenario(url, function, options):
+    """
+    Run a scenario with a new Api object, after loading the schemas, and
+    return (items, requests, elapsed seconds, request latencies).
+    """
+    latencies = []
+    metrics = productstatus.metrics.Metrics()
+    metrics.add_exporter(lambda event: latencies.append(event.latency)
+                         if isinstance(event, productstatus.metrics.RequestEvent) else None)
+    api = productstatus.api.Api(url, transport=options.transport, metrics=metrics)
+    for name in fake_server.ORDER:
+        getattr(api, name).schema
+    metrics.reset()
+    del latencies[:]
+    start = time.monotonic()
+    items = function(api, options)
+    elapsed = time.monotonic() - start
+    requests = api.stats()['totals']['count']
+    api.close()
+    return items, requests, elapsed, sorted(latencies)
+
+
+def run(options):
+    server = fake_server.FakeProductstatusServer(
+        products=options.products,
+        productinstances=options.productinstances,
+        data=options.data,
+        datainstances=options.datainstances,
+        latency=options.latency_ms / 1000.0,
+    )
+    url = server.start()
+    print('%d data instances, %d ms server latency, %s transport' % (
+        server.count('datainstance'), options.latency_ms, options.transport))
+    print('%-16s %8s %9s %10s %12s %10s %10s' % (
+        'scenario', 'items', 'requests', 'items/s', 'requests/s', 'p50 ms', 'p99 ms'))
+    try:
+        for name, function in SCENARIOS:
+            if options.scenarios and name not in options.scenarios:
+                continue
+            items, requests, elapsed, latencies = run_scenario(url, function, options)
+            print('%-16s %8d %9d %10.0f %12.0f %10.2f %10.2f' % (
+                name,
+                items,
+                requests,
+                items / elapsed,
+                requests / elapsed,
+                latencies[len(latencies) // 2] * 1000 if latencies else 0,
+                latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+            ))
+    finally:
+        server.stop()
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description='End-to-end benchmark against a local Productstatus stand-in server.')
+    parser.add_argument('scenarios', nargs='*', metavar='scenario',
+                        help='scenarios to run, all by default: %s' % ', '.join(x[0] for x in SCENARIOS))
+    parser.add_argument('--products', type=int, default=10)
+    parser.add_argument('--productinstances', type=int, default=4, help='product instances per product')
+    parser.add_argument('--data', type=int, default=6, help='data objects per product instance')
+    parser.add_argument('--datainstances', type=int, default=2, help='data instances per data object')
+    parser.add_argument('--items', type=int, default=100, help='items processed by the traverse, ingest and find-or-create scenarios')
+    parser.add_argument('--page-size', type=int, default=20, help='page size of the sweep scenario')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='server latency of each request')
+    parser.add_argument('--transport', default='requests', help='HTTP transport used by the client')
+    options = parser.parse_args(args)
+    unknown = set(options.scenarios) - set(x[0] for x in SCENARIOS)
+    if unknown:
+        parser.error('unknown scenarios: %s' % ', '.join(sorted(unknown)))
+    return options
+
+
+if __name__ == '__main__':
+    run(parse_args(sys.argv[1:]))
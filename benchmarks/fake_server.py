@@ -0,0 +1,391 @@
+"""
+In-process stand-in for a Productstatus server, used by the end-to-end
+benchmarks.
+
+The server implements the parts of the Tastypie REST API used by the client
+library: the API root and collection schemas, paged and filtered list
+endpoints with ordering, detail endpoints, `set/` endpoints returning several
+resources at once, resource creation with POST, updates with PATCH, bulk
+creation, updates and deletion with PATCH on list endpoints, and DELETE.
+
+It serves a synthetic graph of products, product instances, data and data
+instances of configurable size, and can add a fixed delay to every response
+to simulate server-side latency.
+
+Usage:
+
+    server = FakeProductstatusServer(products=10, productinstances=4, data=6, datainstances=2)
+    url = server.start()
+    api = productstatus.api.Api(url)
+    ...
+    server.stop()
+"""
+
+import re
+import json
+import time
+import uuid
+import datetime
+import threading
+import http.server
+import urllib.parse
+
+
+API_PREFIX = '/api/v1/'
+
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+# Maximum number of resources returned per page, as in Tastypie.
+MAX_LIMIT = 1000
+
+# Default value shown in Tastypie schemas for fields without a default.
+NO_DEFAULT = 'No default provided.'
+
+
+def _field(type_, readonly=False, nullable=False, unique=False, related_type=None, default=NO_DEFAULT):
+    field = {'type': type_, 'readonly': readonly, 'nullable': nullable, 'unique': unique, 'blank': nullable,
+             'default': default}
+    if related_type is not None:
+        field['related_type'] = related_type
+    return field
+
+
+def _fields(**extra):
+    fields = {
+        # IDs are generated by the server unless given by the client
+        'id': _field('string', unique=True, default='00000000-0000-0000-0000-000000000000'),
+        'resource_uri': _field('string', readonly=True),
+        'created': _field('datetime', readonly=True),
+        'modified': _field('datetime', readonly=True),
+    }
+    fields.update(extra)
+    return fields
+
+
+# Fields of each collection.
+COLLECTIONS = {
+    'product': _fields(
+        name=_field('string'),
+        slug=_field('string', unique=True),
+    ),
+    'productinstance': _fields(
+        product=_field('related', related_type='to_one'),
+        reference_time=_field('datetime'),
+        version=_field('integer'),
+    ),
+    'data': _fields(
+        productinstance=_field('related', related_type='to_one'),
+        time_period_begin=_field('datetime', nullable=True),
+        time_period_end=_field('datetime', nullable=True),
+    ),
+    'datainstance': _fields(
+        data=_field('related', related_type='to_one'),
+        url=_field('string'),
+        format=_field('string'),
+        expires=_field('datetime', nullable=True),
+        deleted=_field('boolean'),
+        partial=_field('boolean'),
+    ),
+}
+
+# Collections in the order they refer to each other.
+ORDER = ['product', 'productinstance', 'data', 'datainstance']
+
+
+def resource_uri(collection, id):
+    return '%s%s/%s/' % (API_PREFIX, collection, id)
+
+
+def _id(collection, index):
+    return str(uuid.UUID(int=(ORDER.index(collection) + 1) << 64 | index))
+
+
+def _normalize_datetime(value):
+    """
+    Convert timestamps sent by the client into the format used in responses.
+    """
+    if isinstance(value, str) and re.match(r'^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(Z|[+-]00:?00)$', value):
+        return value[:19] + 'Z'
+    return value
+
+
+def _filter_value(value):
+    """
+    Convert a stored value into the string representation used in query strings.
+    """
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, str) and value.startswith(API_PREFIX):
+        return value.rstrip('/').split('/')[-1]
+    return str(value)
+
+
+class Store(object):
+    """
+    Thread-safe storage of all resources, by collection and ID.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.objects = dict((name, {}) for name in COLLECTIONS)
+
+    def now(self):
+        return datetime.datetime.utcnow().strftime(DATETIME_FORMAT)
+
+    def put(self, collection, data, id=None):
+        """
+        Create or update a resource, returning its stored representation.
+        """
+        fields = COLLECTIONS[collection]
+        id = id or data.get('id') or str(uuid.uuid4())
+        existing = self.objects[collection].get(id)
+        record = dict(existing) if existing else {
+            'id': id,
+            'resource_uri': resource_uri(collection, id),
+            'created': self.now(),
+        }
+        for key, value in data.items():
+            if key in fields and not fields[key]['readonly']:
+                record[key] = _normalize_datetime(value)
+        record['modified'] = self.now()
+        self.objects[collection][id] = record
+        return record
+
+    def populate(self, products, productinstances, data, datainstances):
+        """
+        Create a graph of resources: `products` products with
+        `productinstances` instances each, with `data` data objects per
+        instance, and `datainstances` files per data object.
+        """
+        start = datetime.datetime(2016, 1, 1)
+        counters = dict((name, 0) for name in ORDER)
+
+        def add(collection, record):
+            index = counters[collection]
+            counters[collection] += 1
+            return self.put(collection, record, id=_id(collection, index))
+
+        for p in range(products):
+            product = add('product', {'name': 'Product %d' % p, 'slug': 'product-%d' % p})
+            for i in range(productinstances):
+                reference_time = start + datetime.timedelta(hours=6 * i)
+                productinstance = add('productinstance', {
+                    'product': product['resource_uri'],
+                    'reference_time': reference_time.strftime(DATETIME_FORMAT),
+                    'version': 1,
+                })
+                for d in range(data):
+                    begin = reference_time + datetime.timedelta(hours=d)
+                    data_ = add('data', {
+                        'productinstance': productinstance['resource_uri'],
+                        'time_period_begin': begin.strftime(DATETIME_FORMAT),
+                        'time_period_end': (begin + datetime.timedelta(hours=1)).strftime(DATETIME_FORMAT),
+                    })
+                    for f in range(datainstances):
+                        add('datainstance', {
+                            'data': data_['resource_uri'],
+                            'url': 'file:///lustre/storeA/%s/%d/%d/%d.nc' % (product['slug'], i, d, f),
+                            'format': 'netcdf',
+                            'expires': (begin + datetime.timedelta(days=7)).strftime(DATETIME_FORMAT),
+                            'deleted': False,
+                            'partial': False,
+                        })
+
+    def search(self, collection, params):
+        """
+        Return the list of resources matching exact filters, ordered by the
+        `order_by` parameter.
+        """
+        filters = dict((key, values[-1]) for key, values in params.items()
+                       if key in COLLECTIONS[collection])
+        objects = [x for x in self.objects[collection].values()
+                   if all(_filter_value(x.get(key)) == _normalize_datetime(value) for key, value in filters.items())]
+        for key in reversed(params.get('order_by', [])):
+            name = key.lstrip('-')
+            objects.sort(key=lambda x: (x.get(name) is None, x.get(name)), reverse=key.startswith('-'))
+        return objects
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves the Tastypie API from the store of the server.
+    """
+    protocol_version = 'HTTP/1.1'
+    # Send responses without waiting for acknowledgement of the headers
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def respond(self, status, data=None, headers={}):
+        content = json.dumps(data).encode('UTF-8') if data is not None else b''
+        self.send_response(status)
+        if content:
+            self.send_header('Content-Type', 'application/json')
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if not length:
+            return None
+        return json.loads(self.rfile.read(length).decode('UTF-8'))
+
+    def handle_request(self, method):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        url = urllib.parse.urlsplit(self.path)
+        params = urllib.parse.parse_qs(url.query)
+        if not url.path.startswith(API_PREFIX):
+            return self.respond(404)
+        components = url.path[len(API_PREFIX):].strip('/').split('/')
+        if components == ['']:
+            if method != 'GET':
+                return self.respond(405)
+            return self.respond(200, dict((name, {
+                'list_endpoint': '%s%s/' % (API_PREFIX, name),
+                'schema': '%s%s/schema/' % (API_PREFIX, name),
+            }) for name in COLLECTIONS))
+        collection = components[0]
+        if collection not in COLLECTIONS:
+            return self.respond(404)
+        with self.server.store.lock:
+            if len(components) == 1:
+                return self.dispatch('%s_list' % method.lower(), collection, params)
+            if components[1] == 'schema' and method == 'GET':
+                return self.get_schema(collection)
+            if components[1] == 'set' and len(components) == 3 and method == 'GET':
+                return self.get_set(collection, components[2].split(';'))
+            if len(components) == 2:
+                return self.dispatch('%s_detail' % method.lower(), collection, components[1])
+        return self.respond(404)
+
+    def dispatch(self, name, *args):
+        handler = getattr(self, name, None)
+        if handler is None:
+            return self.respond(405)
+        handler(*args)
+
+    def get_schema(self, collection):
+        fields = COLLECTIONS[collection]
+        methods = ['get', 'post', 'put', 'patch', 'delete']
+        self.respond(200, {
+            'allowed_detail_http_methods': methods,
+            'allowed_list_http_methods': methods,
+            'default_format': 'application/json',
+            'default_limit': 20,
+            'fields': fields,
+            'filtering': dict((name, 1) for name in fields),
+            'ordering': list(fields),
+        })
+
+    def get_list(self, collection, params):
+        objects = self.server.store.search(collection, params)
+        limit = int(params.get('limit', ['20'])[-1]) or MAX_LIMIT
+        limit = min(limit, MAX_LIMIT)
+        offset = int(params.get('offset', ['0'])[-1])
+        self.respond(200, {
+            'meta': {
+                'limit': limit,
+                'offset': offset,
+                'total_count': len(objects),
+                'next': None,
+                'previous': None,
+            },
+            'objects': objects[offset:offset + limit],
+        })
+
+    def get_set(self, collection, ids):
+        objects = self.server.store.objects[collection]
+        self.respond(200, {
+            'objects': [objects[x] for x in ids if x in objects],
+            'not_found': [x for x in ids if x not in objects],
+        })
+
+    def get_detail(self, collection, id):
+        record = self.server.store.objects[collection].get(id)
+        if record is None:
+            return self.respond(404)
+        self.respond(200, record)
+
+    def post_list(self, collection, params):
+        record = self.server.store.put(collection, self.read_body())
+        self.respond(201, headers={'Location': record['resource_uri']})
+
+    def patch_list(self, collection, params):
+        body = self.read_body()
+        store = self.server.store
+        for data in body.get('objects', []):
+            id = data['resource_uri'].rstrip('/').split('/')[-1] if data.get('resource_uri') else None
+            store.put(collection, data, id=id)
+        for uri in body.get('deleted_objects', []):
+            store.objects[collection].pop(uri.rstrip('/').split('/')[-1], None)
+        self.respond(202)
+
+    def patch_detail(self, collection, id):
+        if id not in self.server.store.objects[collection]:
+            return self.respond(404)
+        self.server.store.put(collection, self.read_body(), id=id)
+        self.respond(202)
+
+    def delete_detail(self, collection, id):
+        if self.server.store.objects[collection].pop(id, None) is None:
+            return self.respond(404)
+        self.respond(204)
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_PATCH(self):
+        self.handle_request('PATCH')
+
+    def do_PUT(self):
+        self.handle_request('PUT')
+
+    def do_DELETE(self):
+        self.handle_request('DELETE')
+
+
+class FakeProductstatusServer(object):
+    """
+    A Tastypie stand-in server running in a thread of the current process.
+    """
+
+    def __init__(self, products=10, productinstances=4, data=6, datainstances=2, latency=0.0):
+        """
+        @param products Number of products.
+        @param productinstances Number of instances of each product.
+        @param data Number of data objects of each product instance.
+        @param datainstances Number of files of each data object.
+        @param latency Number of seconds to wait before handling each request.
+        """
+        self.store = Store()
+        self.store.populate(products, productinstances, data, datainstances)
+        self.latency = latency
+
+    def start(self):
+        """
+        Start serving requests, and return the base URL of the server.
+        """
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.store = self.store
+        self.httpd.latency = self.latency
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return 'http://127.0.0.1:%d' % self.httpd.server_address[1]
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+    def count(self, collection):
+        with self.store.lock:
+            return len(self.store.objects[collection])
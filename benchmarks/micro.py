@@ -0,0 +1,375 @@
+"""
+Micro-benchmarks of the client library's hot paths, with stored baselines.
+
+Each benchmark times one operation, such as converting the fields of a
+resource or reading an attribute, without any network requests. Resources use
+the schemas and synthetic data of the end-to-end benchmark server in
+`benchmarks/fake_server.py`, and message classes are those of
+`benchmarks/serialize_base.py`.
+
+The `run` command prints the time per operation of each benchmark, and saves
+the results to a file with `--save`. The `compare` command runs the
+benchmarks, or loads results saved with `--current`, and compares them with a
+baseline. It exits with status 1 if any benchmark is slower than its
+baseline by more than the threshold, so that it can be used as a
+regression gate.
+
+Absolute timings are only comparable on the same machine, so every run also
+times a calibration loop of plain Python operations, and benchmarks are
+compared by their time relative to the calibration loop of the same run.
+This makes the stored baseline usable on other machines, within the default
+threshold of 25%. For a strict comparison, run the baseline on the same
+machine from a git revision with `--against`:
+
+    python benchmarks/micro.py compare
+    python benchmarks/micro.py compare --against HEAD~1 --threshold 0.1
+
+Usage:
+
+    python benchmarks/micro.py run [-k pattern] [--repeat N] [--save file]
+    python benchmarks/micro.py compare [baseline] [-k pattern] [--threshold T] [--current file] [--against rev]
+"""
+
+import os
+import sys
+import json
+import timeit
+import shutil
+import tarfile
+import tempfile
+import subprocess
+import argparse
+import platform
+import datetime
+import collections
+
+# Import the client library from this source tree, so that the benchmarks
+# run without installing it.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import productstatus.api
+import productstatus.codec
+import productstatus.event
+import productstatus.utils
+
+import fake_server
+import serialize_base
+
+
+BASE_URL = 'http://productstatus.fqdn'
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'micro.json')
+
+DEFAULT_THRESHOLD = 0.25
+
+# Benchmark setup functions by name, in the order they are run. Each returns
+# a function performing the operations to time, and the number of operations
+# it performs.
+BENCHMARKS = collections.OrderedDict()
+
+
+def benchmark(name):
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+def make_api():
+    """
+    Return an Api object whose schemas are loaded from the stand-in server
+    definitions, so that no requests are made, and a store of synthetic data.
+    """
+    api = productstatus.api.Api(BASE_URL)
+    for name, fields in fake_server.COLLECTIONS.items():
+        collection = api._collection_class(api, name)
+        collection._schema = {'fields': fields, 'allowed_list_http_methods': ['get', 'post', 'patch']}
+        api._resource_collection[name] = collection
+    store = fake_server.Store()
+    store.populate(products=1, productinstances=1, data=1, datainstances=100)
+    return api, store
+
+
+def make_resource(api, store):
+    record = next(iter(store.objects['datainstance'].values()))
+    return api._resource_class(api, api.datainstance, record['id'], record), record
+
+
+@benchmark('resource.unserialize')
+def bench_resource_unserialize():
+    api, store = make_api()
+    resource, record = make_resource(api, store)
+
+    def run():
+        resource._data = record.copy()
+        resource._unserialize()
+    return run, 1
+
+
+@benchmark('resource.serialize')
+def bench_resource_serialize():
+    api, store = make_api()
+    resource, record = make_resource(api, store)
+    return resource._serialize, 1
+
+
+@benchmark('resource.getattr')
+def bench_resource_getattr():
+    api, store = make_api()
+    resource, record = make_resource(api, store)
+
+    def run():
+        resource.url
+        resource.expires
+        resource.deleted
+        resource.data
+    return run, 4
+
+
+@benchmark('queryset.getitem_cached')
+def bench_queryset_getitem():
+    api, store = make_api()
+    objects = list(store.objects['datainstance'].values())
+    qs = api.datainstance.objects
+    qs._results = {'meta': {'limit': len(objects), 'offset': 0, 'total_count': len(objects)}, 'objects': objects}
+    indexes = range(len(objects))
+
+    def run():
+        for index in indexes:
+            qs[index]
+    return run, len(objects)
+
+
+@benchmark('utils.build_url')
+def bench_build_url():
+    id = '66340f0b-2c2c-436d-a077-3d939f4f7283'
+
+    def run():
+        productstatus.utils.build_url(BASE_URL, '/api/v1/', 'datainstance', id)
+    return run, 1
+
+
+@benchmark('serialize_base.serialize')
+def bench_serialize_base_serialize():
+    objects = serialize_base.make_objects(serialize_base.make_class(productstatus.utils.SerializeBase), 100)
+
+    def run():
+        for object_ in objects:
+            object_.serialize()
+    return run, len(objects)
+
+
+@benchmark('serialize_base.unserialize')
+def bench_serialize_base_unserialize():
+    objects = serialize_base.make_objects(serialize_base.make_class(productstatus.utils.SerializeBase), 100)
+    data = [(x, x.serialize()) for x in objects]
+
+    def run():
+        for object_, serialized in data:
+            object_.unserialize(serialized)
+    return run, len(objects)
+
+
+@benchmark('event.unserialize')
+def bench_event_unserialize():
+    message = json.dumps({
+        'message_id': '5b0c5bd6-8b5a-4b3f-9e4a-a8e0c4b3b1a2',
+        'message_timestamp': '2016-01-01T00:00:00Z',
+        'type': 'resource',
+        'resource': 'datainstance',
+        'id': '66340f0b-2c2c-436d-a077-3d939f4f7283',
+        'uri': '/api/v1/datainstance/66340f0b-2c2c-436d-a077-3d939f4f7283/',
+        'url': 'https://productstatus.fqdn/api/v1/datainstance/66340f0b-2c2c-436d-a077-3d939f4f7283/',
+        'version': [1, 5, 0],
+    }).encode('UTF-8')
+
+    def run():
+        productstatus.event.unserialize(message)
+    return run, 1
+
+
+def calibrate():
+    """
+    Return a function performing a fixed mix of the plain Python operations
+    that the benchmarks consist of: function calls, dictionary and attribute
+    lookups, string formatting and list building. Its time per operation is
+    the unit that benchmarks are compared in.
+    """
+    class Object(object):
+        def __init__(self, index):
+            self.index = index
+
+    keys = ['key%d' % x for x in range(20)]
+
+    def run():
+        data = {}
+        for key in keys:
+            data[key] = Object(len(key))
+        return sorted('%s=%d' % (key, value.index) for key, value in data.items())
+    return run, 1
+
+
+def measure(setup, repeat, calibration):
+    """
+    Return the best and median number of seconds per operation of a
+    benchmark, and its median time relative to the calibration loop. The
+    calibration loop is timed right before each measurement, so that both
+    are slowed down alike by other load on the machine.
+    """
+    function, operations = setup()
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    calibration_timer, calibration_number, calibration_operations = calibration
+    times = []
+    ratios = []
+    for _ in range(repeat):
+        unit = calibration_timer.timeit(calibration_number) / calibration_number / calibration_operations
+        seconds = timer.timeit(number) / number / operations
+        times.append(seconds)
+        ratios.append(seconds / unit)
+    times.sort()
+    ratios.sort()
+    return {'best': times[0], 'median': times[len(times) // 2], 'relative': ratios[len(ratios) // 2]}
+
+
+def select(pattern):
+    return [name for name in BENCHMARKS if not pattern or pattern in name]
+
+
+def run(pattern=None, repeat=9, verbose=True):
+    """
+    Run the benchmarks whose names contain `pattern`, and return the results
+    together with a description of the environment.
+    """
+    function, operations = calibrate()
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    calibration = (timer, number, operations)
+    results = collections.OrderedDict()
+    for name in select(pattern):
+        results[name] = measure(BENCHMARKS[name], repeat, calibration)
+        if verbose:
+            print('%-28s %10.3f us   (median %.3f us, %.4f calibration loops)' % (
+                name, results[name]['best'] * 1e6, results[name]['median'] * 1e6, results[name]['relative']))
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'json_decoder': productstatus.codec.decoder_backend,
+            'json_encoder': productstatus.codec.encoder_backend,
+            'date': datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+        },
+        'results': results,
+    }
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+        f.write('\n')
+
+
+def run_against(revision, pattern=None, repeat=9):
+    """
+    Run the benchmarks of a git revision of the repository in a subprocess,
+    and return its results, so that they are measured on this machine.
+    """
+    root = subprocess.check_output(['git', 'rev-parse', '--show-toplevel'],
+                                   cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    directory = tempfile.mkdtemp(prefix='productstatus-benchmark-')
+    try:
+        archive = os.path.join(directory, 'source.tar')
+        subprocess.check_call(['git', 'archive', '--format=tar', '-o', archive, revision], cwd=root)
+        source = os.path.join(directory, 'source')
+        with tarfile.open(archive) as f:
+            f.extractall(source)
+        output = os.path.join(directory, 'results.json')
+        command = [sys.executable, os.path.join(source, 'benchmarks', 'micro.py'), 'run', '--repeat', str(repeat), '--save', output]
+        if pattern:
+            command += ['-k', pattern]
+        environment = dict(os.environ, PYTHONPATH=source)
+        subprocess.check_call(command, cwd=source, env=environment, stdout=subprocess.DEVNULL)
+        return load(output)
+    finally:
+        shutil.rmtree(directory)
+
+
+def compare(baseline, current, threshold):
+    """
+    Print a comparison of two sets of results, and return the names of the
+    benchmarks that are slower than the baseline by more than `threshold`,
+    relative to the calibration loop of each set of results.
+    """
+    for key in ('python', 'machine', 'json_decoder', 'json_encoder'):
+        if baseline['environment'].get(key) != current['environment'].get(key):
+            print('warning: %s differs from the baseline: %s != %s' % (
+                key, current['environment'].get(key), baseline['environment'].get(key)))
+    key = 'relative'
+    if not all(key in x for results in (baseline, current) for x in results['results'].values()):
+        print('warning: no calibration timings in the results, comparing absolute timings')
+        key = 'best'
+    print('%-28s %12s %12s %8s' % ('benchmark', 'baseline us', 'current us', 'ratio'))
+    regressions = []
+    for name, result in current['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            print('%-28s %12s %12.3f %8s   new' % (name, '-', result['best'] * 1e6, '-'))
+            continue
+        ratio = result[key] / previous[key]
+        status = ''
+        if ratio > 1 + threshold:
+            status = 'REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            status = 'improved'
+        print('%-28s %12.3f %12.3f %7.2fx   %s' % (name, previous['best'] * 1e6, result['best'] * 1e6, ratio, status))
+    return regressions
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Micro-benchmarks of the Productstatus client library.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+    run_parser = subparsers.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('--save', metavar='FILE', help='save the results to a file')
+    compare_parser = subparsers.add_parser('compare', help='compare the benchmarks with a baseline')
+    compare_parser.add_argument('baseline', nargs='?', default=DEFAULT_BASELINE, help='results saved with "run --save"')
+    compare_parser.add_argument('--current', metavar='FILE', help='compare results saved with "run --save" instead of running the benchmarks')
+    compare_parser.add_argument('--against', metavar='REV', help='run the benchmarks of a git revision as the baseline, instead of loading it')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='slowdown ratio reported as a regression')
+    for subparser in (run_parser, compare_parser):
+        subparser.add_argument('-k', metavar='PATTERN', dest='pattern', help='only run benchmarks whose names contain PATTERN')
+        subparser.add_argument('--repeat', type=int, default=9, help='number of measurements of each benchmark')
+    options = parser.parse_args(args)
+
+    if options.command == 'run':
+        results = run(options.pattern, options.repeat)
+        if options.save:
+            save(options.save, results)
+        return 0
+
+    if options.against:
+        baseline = run_against(options.against, options.pattern, options.repeat)
+    else:
+        baseline = load(options.baseline)
+    if options.current:
+        current = load(options.current)
+        names = select(options.pattern)
+        current['results'] = collections.OrderedDict((k, v) for k, v in current['results'].items() if k in names)
+    else:
+        current = run(options.pattern, options.repeat, verbose=False)
+    regressions = compare(baseline, current, options.threshold)
+    if regressions:
+        print('%d benchmarks regressed by more than %.0f%%: %s' % (len(regressions), options.threshold * 100, ', '.join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
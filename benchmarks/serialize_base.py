@@ -0,0 +1,105 @@
+"""
+Micro-benchmark comparing the compiled SerializeBase serializers with the
+previous implementation, which looked up converter methods by reflection for
+every member on every call.
+
+Usage:
+
+    python benchmarks/serialize_base.py [iterations]
+"""
+
+import os
+import sys
+import timeit
+import datetime
+import dateutil.tz
+
+# Import the client library from this source tree, so that the benchmarks
+# run without installing it.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import productstatus.utils
+
+
+class ReflectiveSerializeBase(productstatus.utils.SerializeBase):
+    """
+    The reflective implementation of SerializeBase, kept for comparison.
+    """
+
+    def serialize(self):
+        serialized = {}
+        for key in self.__serializable__:
+            func_name = 'serialize_' + key
+            func = getattr(self, func_name, None)
+            serialized[key] = getattr(self, key, None)
+            if callable(func):
+                serialized[key] = func(serialized[key])
+            elif hasattr(serialized[key], 'serialize'):
+                serialized[key] = serialized[key].serialize()
+        return serialized
+
+    def unserialize(self, data):
+        for key in self.__serializable__:
+            func_name = 'unserialize_' + key
+            func = getattr(self, func_name, None)
+            if callable(func):
+                value = func(data[key])
+            else:
+                value = data[key]
+            setattr(self, key, value)
+
+
+def make_class(base):
+    """
+    Create a message class with typical members, derived from `base`.
+    """
+    class Message(base):
+        __serializable__ = ['id', 'type', 'uri', 'resource', 'version', 'url', 'message_id', 'message_timestamp']
+
+        def serialize_message_timestamp(self, value):
+            return self._serialize_datetime(value)
+
+        def unserialize_version(self, value):
+            return int(value)
+
+    return Message
+
+
+def make_objects(cls, count):
+    timestamp = datetime.datetime(2016, 1, 1, tzinfo=dateutil.tz.tzutc())
+    objects = []
+    for i in range(count):
+        object_ = cls()
+        object_.id = str(i)
+        object_.type = 'resource'
+        object_.uri = '/api/v1/datainstance/%d/' % i
+        object_.resource = 'datainstance'
+        object_.version = i
+        object_.url = 'http://example.com/%d' % i
+        object_.message_id = str(i)
+        object_.message_timestamp = timestamp
+        objects.append(object_)
+    return objects
+
+
+def run(iterations=20, count=1000):
+    results = {}
+    for name, base in [('reflective', ReflectiveSerializeBase), ('compiled', productstatus.utils.SerializeBase)]:
+        objects = make_objects(make_class(base), count)
+        data = [x.serialize() for x in objects]
+        serialize = timeit.timeit(lambda: [x.serialize() for x in objects], number=iterations)
+        unserialize = timeit.timeit(lambda: [x.unserialize(y) for x, y in zip(objects, data)], number=iterations)
+        results[name] = (serialize, unserialize)
+        print('%-12s serialize: %8.2f us/object   unserialize: %8.2f us/object' % (
+            name,
+            serialize / iterations / count * 1e6,
+            unserialize / iterations / count * 1e6,
+        ))
+    print('speedup      serialize: %8.2fx            unserialize: %8.2fx' % (
+        results['reflective'][0] / results['compiled'][0],
+        results['reflective'][1] / results['compiled'][1],
+    ))
+
+
+if __name__ == '__main__':
+    run(*[int(x) for x in sys.argv[1:2]])
@@ -0,0 +1,193 @@
+"""
+Benchmark comparing the HTTP transports on many concurrent GET requests.
+
+A local server answers every request with a page of resources after a fixed
+delay, simulating server-side latency. It speaks HTTP/1.1, and HTTP/2 to
+clients that use it from the start of the connection (prior knowledge), as
+HTTP/2 is not negotiated on unencrypted connections otherwise. The server is
+implemented with the `h11` and `h2` packages, which are installed together
+with `httpx[http2]`.
+
+The transports compared are:
+
+* requests:     HTTP/1.1 connection pool with one connection per thread
+* httpx-http1:  HTTP/1.1 connection pool with one connection per thread
+* httpx-http2:  HTTP/2, multiplexing all requests over one connection
+
+Usage:
+
+    python benchmarks/transport.py [requests] [concurrency] [latency_ms]
+"""
+
+import os
+import sys
+import time
+import json
+import asyncio
+import threading
+import concurrent.futures
+
+import h11
+import h2.config
+import h2.connection
+import h2.events
+
+# Import the client library from this source tree, so that the benchmarks
+# run without installing it.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import productstatus.api
+import productstatus.transport
+
+
+H2_PREFACE = b'PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n'
+
+PAGE = json.dumps({
+    'meta': {'limit': 20, 'offset': 0, 'total_count': 20},
+    'objects': [{
+        'id': '%08d-0000-0000-0000-000000000000' % i,
+        'resource_uri': '/api/v1/datainstance/%08d-0000-0000-0000-000000000000/' % i,
+        'url': 'file:///lustre/storeA/products/file_%d.nc' % i,
+        'expires': '2016-01-01T00:00:00Z',
+    } for i in range(20)],
+}).encode('UTF-8')
+
+
+class BenchmarkServer(object):
+    """
+    HTTP/1.1 and HTTP/2 server running an asyncio event loop in a thread.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.connections = 0
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        future = asyncio.run_coroutine_threadsafe(asyncio.start_server(self.handle, '127.0.0.1', 0), self.loop)
+        self.server = future.result()
+        return 'http://127.0.0.1:%d' % self.server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    async def shutdown(self):
+        self.server.close()
+        await self.server.wait_closed()
+        tasks = [x for x in asyncio.all_tasks() if x is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            data = await reader.readexactly(len(H2_PREFACE))
+            if data == H2_PREFACE:
+                await self.handle_http2(reader, writer, data)
+            else:
+                await self.handle_http1(reader, writer, data)
+        except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_http1(self, reader, writer, data):
+        connection = h11.Connection(h11.SERVER)
+        connection.receive_data(data)
+        while True:
+            event = connection.next_event()
+            if event is h11.NEED_DATA:
+                data = await reader.read(65536)
+                connection.receive_data(data)
+                if not data:
+                    return
+            elif isinstance(event, h11.EndOfMessage):
+                await asyncio.sleep(self.latency)
+                headers = [('content-type', 'application/json'), ('content-length', str(len(PAGE)))]
+                writer.write(connection.send(h11.Response(status_code=200, headers=headers)))
+                writer.write(connection.send(h11.Data(data=PAGE)))
+                writer.write(connection.send(h11.EndOfMessage()))
+                await writer.drain()
+                if connection.our_state is h11.MUST_CLOSE:
+                    return
+                connection.start_next_cycle()
+            elif isinstance(event, h11.ConnectionClosed):
+                return
+
+    async def handle_http2(self, reader, writer, data):
+        connection = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        connection.initiate_connection()
+        while data:
+            for event in connection.receive_data(data):
+                if isinstance(event, h2.events.StreamEnded):
+                    asyncio.ensure_future(self.respond_http2(connection, writer, event.stream_id))
+            writer.write(connection.data_to_send())
+            data = await reader.read(65536)
+
+    async def respond_http2(self, connection, writer, stream_id):
+        await asyncio.sleep(self.latency)
+        headers = [(':status', '200'), ('content-type', 'application/json'), ('content-length', str(len(PAGE)))]
+        connection.send_headers(stream_id, headers)
+        connection.send_data(stream_id, PAGE, end_stream=True)
+        writer.write(connection.data_to_send())
+
+
+class PriorKnowledgeHttpxTransport(productstatus.transport.HttpxTransport):
+    """
+    HTTP/2 without negotiation, as required for unencrypted connections.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs['http1'] = False
+        super(PriorKnowledgeHttpxTransport, self).__init__(*args, **kwargs)
+
+
+class Http1HttpxTransport(productstatus.transport.HttpxTransport):
+    def __init__(self, *args, **kwargs):
+        kwargs['http2'] = False
+        super(Http1HttpxTransport, self).__init__(*args, **kwargs)
+
+
+TRANSPORTS = [
+    ('requests', productstatus.transport.RequestsTransport),
+    ('httpx-http1', Http1HttpxTransport),
+    ('httpx-http2', PriorKnowledgeHttpxTransport),
+]
+
+
+def run(requests=2000, concurrency=50, latency_ms=5):
+    print('%d GET requests, %d threads, %d ms server latency' % (requests, concurrency, latency_ms))
+    for name, transport in TRANSPORTS:
+        server = BenchmarkServer(latency_ms / 1000.0)
+        url = server.start() + '/api/v1/datainstance/'
+        api = productstatus.api.Api(url.split('/api/')[0], transport=transport, pool_maxsize=concurrency)
+
+        def get(x):
+            start = time.monotonic()
+            api._get_response_data(api._do_request('get', url))
+            return time.monotonic() - start
+
+        get(None)
+        start = time.monotonic()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = sorted(executor.map(get, range(requests)))
+        elapsed = time.monotonic() - start
+        api.close()
+        server.stop()
+        print('%-12s %8.0f requests/s   p50: %6.2f ms   p99: %6.2f ms   connections: %d' % (
+            name,
+            requests / elapsed,
+            latencies[len(latencies) // 2] * 1000,
+            latencies[int(len(latencies) * 0.99)] * 1000,
+            server.connections,
+        ))
+
+
+if __name__ == '__main__':
+    run(*[int(x) for x in sys.argv[1:4]])
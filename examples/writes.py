@@ -44,3 +44,24 @@ datainstance.format = api.dataformat['netcdf']
 datainstance.servicebackend = api.servicebackend['lustre-a']
 datainstance.expires = productstatus.utils.get_utc_now() + datetime.timedelta(days=1)
 datainstance.save()
+
+# Many objects can be saved together in a session. When the `with` block exits,
+# objects are saved after the objects they refer to, and objects that do not
+# depend on each other are saved concurrently in bulk.
+with api.session():
+    productinstance = api.productinstance.create()
+    productinstance.reference_time = productstatus.utils.get_utc_now()
+    productinstance.product = api.product['ecmwf-atmospheric-model-bc-surface']
+    productinstance.version = 2
+    for hour in range(3):
+        data = api.data.create()
+        data.productinstance = productinstance
+        data.time_period_begin = productinstance.reference_time + datetime.timedelta(hours=hour)
+        data.time_period_end = data.time_period_begin
+        datainstance = api.datainstance.create()
+        datainstance.url = 'file:///lustre/storeA/projects/metproduction/products/foobar/myfile_%d.nc' % hour
+        datainstance.data = data
+        datainstance.format = api.dataformat['netcdf']
+        datainstance.servicebackend = api.servicebackend['lustre-a']
+        datainstance.expires = productstatus.utils.get_utc_now() + datetime.timedelta(days=1)
+print(productinstance.resource_uri)
@@ -0,0 +1,780 @@
+"""!
+The productstatus.aio module is an asyncio interface to the Productstatus REST
+API, with the same fluent model as productstatus.api. Requests are made using
+aiohttp with a pool of persistent connections, so that a single process can
+keep many requests in flight without blocking the event loop.
+
+Data is never loaded implicitly: resources are fetched with `await
+resource.fetch()`, and query sets are iterated with `async for`. Accessing an
+attribute of a resource that has not been fetched raises an exception.
+
+Example usage:
+
+async with productstatus.aio.AsyncApi('https://productstatus.met.no') as api:
+    product = await api.product.get('arome-metcoop-2500m')
+    qs = api.productinstance.objects.filter(product=product).order_by('-reference_time')
+    async for productinstance in qs:
+        print(productinstance.reference_time)
+    datainstance = api.datainstance['66340f0b-2c2c-436d-a077-3d939f4f7283']
+    await datainstance.fetch()
+    datainstance.expires = productstatus.utils.get_utc_now()
+    await datainstance.save()
+
+Bulk operations are available as coroutines, such as `await
+collection.bulk_save(resources)` and `await qs.delete()`. Retry policies,
+several servers and request metrics work as in the synchronous client.
+Sessions, Api.deadline(), hedged requests, concurrency limiters and
+QuerySet.parallel_map() are only available in the synchronous client.
+
+This module requires aiohttp.
+"""
+
+import asyncio
+import inspect
+import uuid
+import logging
+import time
+
+import aiohttp
+
+import productstatus.api
+import productstatus.codec
+import productstatus.exceptions
+import productstatus.routing
+import productstatus.transport
+import productstatus.utils
+
+
+SERVICE_UNAVAILABLE_EXCEPTIONS = (aiohttp.ClientError,
+                                  asyncio.TimeoutError,
+                                  )
+
+
+class _SyncOnly(object):
+    """!
+    @brief Hides a member of the synchronous client that the asyncio client
+    does not provide, explaining why when it is accessed.
+    """
+
+    def __init__(self, name, reason):
+        self.name = name
+        self.reason = reason
+
+    def message(self):
+        return '%s is not available in the asyncio client; %s' % (self.name, self.reason)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        raise AttributeError(self.message())
+
+
+def _client_timeout(timeout):
+    """!
+    @brief Return the aiohttp timeout for a request timeout given as a number
+    of seconds, None, or a (connect, read) tuple.
+    """
+    if isinstance(timeout, tuple):
+        return aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+    return aiohttp.ClientTimeout(total=timeout)
+
+
+async def _gather(coroutines, max_workers):
+    """!
+    @brief Await coroutines with at most `max_workers` of them running at a
+    time, and return the list of results in the same order.
+
+    If any coroutines raise an exception, the exception of the first such
+    coroutine is re-raised once all of them have completed.
+    """
+    semaphore = asyncio.Semaphore(max(max_workers, 1))
+
+    async def run(coroutine):
+        async with semaphore:
+            try:
+                return None, await coroutine
+            except Exception as e:
+                return e, None
+
+    outcomes = await asyncio.gather(*[run(x) for x in coroutines])
+    for exception, result in outcomes:
+        if exception is not None:
+            raise exception
+    return [result for exception, result in outcomes]
+
+
+async def resolve_evaluated_resources(resources, max_workers=8):
+    """!
+    @brief asyncio version of productstatus.api.resolve_evaluated_resources().
+    The lazily evaluated functions may be coroutine functions.
+    """
+    if isinstance(resources, productstatus.api.Resource):
+        resources = [resources]
+
+    async def evaluate(group):
+        evaluated = group[0]
+        resource = evaluated.function(*evaluated.args, **evaluated.kwargs)
+        if inspect.isawaitable(resource):
+            resource = await resource
+        if not isinstance(resource, productstatus.api.Resource):
+            raise RuntimeError('Lazy evaluated function "%s" did not return a Resource object.' % evaluated.function.__name__)
+        return resource
+
+    groups = productstatus.api._pending_evaluations(resources)
+    for group, result in zip(groups, await _gather([evaluate(x) for x in groups], max_workers)):
+        for evaluated in group:
+            evaluated._resource = result
+
+
+class Response(object):
+    """!
+    @brief A completely read HTTP response, with the same attributes as the
+    `requests` response objects used by productstatus.api.
+    """
+
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    @property
+    def text(self):
+        return self.content.decode('UTF-8', 'replace')
+
+
+class AsyncApi(productstatus.api.Api):
+    """!
+    @brief asyncio version of productstatus.api.Api.
+
+    The resource type list is loaded when entering an `async with` block, or
+    with `await api.load_schema()`. Resource collections are then available as
+    members, as with the synchronous Api class.
+    """
+
+    def __init__(self, base_url, verify_ssl=True, username=None, api_key=None, timeout=3,
+                 limit=100, limit_per_host=0, keepalive_timeout=15,
+                 retry=None, limiter=None, metrics=None, read_after_write=5.0):
+        """!
+        @param base_url The root URL where the Productstatus server serves
+            data, or a list of root URLs of servers serving the same data.
+            @see productstatus.api.Api.
+        @param verify_ssl Whether or not to verify SSL certificates.
+        @param username Client API username.
+        @param api_key Client API key.
+        @param timeout Request timeout in seconds, or a (connect, read) tuple.
+        @param limit Maximum number of simultaneous connections.
+        @param limit_per_host Maximum number of simultaneous connections to one host, or 0 for no limit.
+        @param keepalive_timeout Number of seconds to keep idle connections open.
+        @param retry A productstatus.retry.RetryPolicy object. Retries and
+            deadlines are supported, but hedging is not.
+        @param limiter Not supported; use `limit` and `limit_per_host` to
+            limit the number of concurrent requests.
+        @param metrics A productstatus.metrics.Metrics object.
+        @param read_after_write @see productstatus.api.Api.
+        """
+        if limiter is not None:
+            raise productstatus.exceptions.ProductstatusException(
+                'The asyncio client does not support concurrency limiters; use the limit and limit_per_host arguments instead'
+            )
+        if retry is not None and retry.hedge_percentile is not None:
+            raise productstatus.exceptions.ProductstatusException(
+                'The asyncio client does not support hedged requests; create the retry policy without hedge_percentile'
+            )
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        super(AsyncApi, self).__init__(base_url,
+                                       verify_ssl=verify_ssl,
+                                       username=username,
+                                       api_key=api_key,
+                                       timeout=timeout,
+                                       retry=retry,
+                                       metrics=metrics,
+                                       read_after_write=read_after_write)
+        # The aiohttp session is used instead of an HTTP transport
+        self._session = None
+
+    def __getstate__(self):
+        """!
+        @brief Return the configuration of this object for pickling. The
+        aiohttp session is not included.
+        """
+        state = super(AsyncApi, self).__getstate__()
+        del state['_session']
+        return state
+
+    def __setstate__(self, state):
+        """!
+        @brief Restore a pickled object. A new aiohttp session is created on first use.
+        """
+        super(AsyncApi, self).__setstate__(state)
+        self._session = None
+
+    def _reset_after_fork(self):
+        """!
+        @brief Discard the aiohttp session inherited from the parent process,
+        together with everything discarded by the synchronous Api class.
+        """
+        super(AsyncApi, self)._reset_after_fork()
+        self._session = None
+
+    def _get_session(self):
+        """!
+        @brief Return the aiohttp session, creating it if neccessary. The
+        session must be created within the running event loop.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._limit,
+                limit_per_host=self._limit_per_host,
+                keepalive_timeout=self._keepalive_timeout,
+                ssl=None if self._verify_ssl else False,
+            )
+            headers = {'content-type': 'application/json'}
+            if self.has_credentials():
+                headers['Authorization'] = 'ApiKey %s:%s' % (self._username, self._api_key)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=headers,
+                timeout=_client_timeout(self._timeout),
+            )
+        return self._session
+
+    async def close(self):
+        """!
+        @brief Close all connections to the server.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        await self.load_schema()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _do_request(self, method, url, params=None, data=None):
+        """!
+        @brief Run a request through aiohttp and add exception handling.
+        Requests are retried according to the retry policy given to the
+        constructor, and GET requests are spread across several servers if
+        there are more than one.
+        @returns A Response object.
+        """
+        deadline = self._get_deadline()
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self._timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise productstatus.exceptions.DeadlineExceededException(
+                        "Deadline exceeded after %d attempts: %s %s" % (attempt - 1, method.upper(), url)
+                    )
+                timeout = productstatus.api._clamp_timeout(timeout, remaining)
+            response = None
+            try:
+                response = await self._send_request_once(method, url, params, data, timeout, attempt > 1)
+            except SERVICE_UNAVAILABLE_EXCEPTIONS as e:
+                error = e
+            if response is not None and not self._retry.should_retry_status(response.status_code):
+                break
+            delay = self._retry.retry_delay(method, attempt, response)
+            if delay is None or (deadline is not None and time.monotonic() + delay >= deadline):
+                break
+            logging.debug('Retrying %s %s in %.3f seconds' % (method.upper(), url, delay))
+            await asyncio.sleep(delay)
+
+        if response is None:
+            raise productstatus.exceptions.ServiceUnavailableException(
+                "Could not perform request: %s" % str(error)
+            )
+        self._raise_response_exceptions(response)
+        return response
+
+    async def _send_request_once(self, method, url, params, data, timeout, retry):
+        """!
+        @brief Send a request, sending GET requests to the primary server to
+        the server chosen by the endpoint router instead, if several servers
+        are used. @see productstatus.api.Api._send_request_once().
+        @param retry True if the request is sent again after a failed request.
+        """
+        if self._router is None:
+            return await self._send_http_request(method, url, params, data, timeout, retry)
+        if method.lower() != 'get' or not url.startswith(self._base_url + '/'):
+            try:
+                return await self._send_http_request(method, url, params, data, timeout, retry)
+            finally:
+                if method.lower() in productstatus.routing.WRITE_METHODS:
+                    self._router.record_write()
+        endpoint = self._router.choose()
+        url = endpoint.url + url[len(self._base_url):]
+        start = time.monotonic()
+        try:
+            response = await self._send_http_request(method, url, params, data, timeout, retry)
+        except asyncio.CancelledError:
+            self._router.finish(endpoint, None, True)
+            raise
+        except BaseException as e:
+            self._router.finish(endpoint, time.monotonic() - start, not isinstance(e, SERVICE_UNAVAILABLE_EXCEPTIONS))
+            raise
+        self._router.finish(endpoint, time.monotonic() - start, response.status_code < 500)
+        return response
+
+    async def _send_http_request(self, method, url, params, data, timeout, retry):
+        """!
+        @brief Send a request through the aiohttp session, recording its latency.
+        """
+        attempt = productstatus.api._Attempt(retry=retry)
+        start = time.monotonic()
+        try:
+            async with self._get_session().request(method.upper(), url, params=params, data=data,
+                                                   timeout=_client_timeout(timeout)) as response:
+                content = await response.read()
+                response = Response(response.status, content, response.headers)
+        except SERVICE_UNAVAILABLE_EXCEPTIONS:
+            self._record_request(method, url, data, None, time.monotonic() - start, attempt)
+            raise
+        latency = time.monotonic() - start
+        if response.status_code < 400:
+            self._retry.record_latency(method, latency)
+        self._record_request(method, url, data, response, latency, attempt)
+        return response
+
+    async def load_schema(self):
+        """!
+        @brief Retrieve the list of resource types from the server, unless it is already loaded.
+        """
+        if not self._schema:
+            response = await self._do_request('get', self._url)
+            self._schema = self._get_response_data(response)
+
+    def _get_schema_from_server(self):
+        raise productstatus.exceptions.ProductstatusException(
+            'The resource types are not loaded; use "await api.load_schema()" or "async with api"'
+        )
+
+    async def get_event_listener_configuration(self):
+        """!
+        @brief Fetch the message queue configuration from the Productstatus server.
+        """
+        await self.load_schema()
+        configuration = await self.kafka.get('default')
+        if not configuration._complete:
+            await configuration.fetch()
+        return configuration
+
+    async def get_event_listener(self, **kwargs):
+        """!
+        @brief Instantiate a message delivery object with configuration
+        retrieved from the Productstatus server.
+        @returns A productstatus.event.Listener object.
+        """
+        import productstatus.event
+        if not self._event_listener:
+            configuration = await self.get_event_listener_configuration()
+            kwargs['bootstrap_servers'] = configuration.brokers
+            kwargs['ssl'] = configuration.ssl
+            kwargs['ssl_verify'] = configuration.ssl_verify
+            self._event_listener = productstatus.event.Listener(str(configuration.topic), **kwargs)
+        return self._event_listener
+
+    session = _SyncOnly('Api.session', 'use "await collection.bulk_save(resources)" instead')
+    deadline = _SyncOnly('Api.deadline', 'use asyncio.wait_for() instead')
+
+    def __getattr__(self, name):
+        member = getattr(type(self), name, None)
+        if isinstance(member, _SyncOnly):
+            raise AttributeError(member.message())
+        return super(AsyncApi, self).__getattr__(name)
+
+    def __repr__(self):
+        return '<Productstatus asyncio API at %s>' % self._url
+
+
+class AsyncQuerySet(productstatus.api.QuerySet):
+    """!
+    @brief asyncio version of productstatus.api.QuerySet.
+
+    Results are iterated using `async for`, or retrieved by index with `await
+    qs.get(index)`. Indexing with brackets only works for results that are
+    already loaded.
+    """
+
+    async def _get(self, filters):
+        """!
+        @brief Request a page of search results with the given filters,
+        counting the request in stats().
+        """
+        start = time.monotonic()
+        response = None
+        try:
+            response = await self._api._do_request('get', self._collection._url, params=productstatus.transport.query_parameters(filters))
+            return response
+        finally:
+            self._count_request(response, time.monotonic() - start)
+
+    async def execute(self):
+        """
+        Fetch results from the server.
+        """
+        await self._collection.load_schema()
+        response = await self._get(self._filters)
+        self._results = self._api._get_response_data(response)
+
+    async def execute_if_empty(self):
+        """
+        Ensure there exists some search results.
+        """
+        if not self._results:
+            await self.execute()
+
+    async def count(self):
+        """!
+        @brief Return the number of results in the search query.
+        """
+        await self.execute_if_empty()
+        return self._results['meta']['total_count']
+
+    def __len__(self):
+        raise TypeError('Use "await qs.count()" with the asyncio client')
+
+    async def get(self, index):
+        """!
+        @brief Return the Resource of Nth index in the search results, running
+        a remote request if needs be.
+        """
+        if self._relative_item_index(index) is None:
+            self.filter(offset=index)
+            await self.execute()
+        if self._relative_item_index(index) is None:
+            raise IndexError('Out of range: %d' % index)
+        return self[index]
+
+    def __getitem__(self, index):
+        """!
+        @brief Return the Resource of Nth index in the search results, if it
+        is already loaded.
+        """
+        if self._relative_item_index(index) is None:
+            raise productstatus.exceptions.ProductstatusException(
+                'Search result %d is not loaded; use "await qs.get(%d)"' % (index, index)
+            )
+        return super(AsyncQuerySet, self).__getitem__(index)
+
+    async def _iterate_pages(self):
+        """!
+        @brief Iterate through all search results one page at a time, yielding
+        the list of decoded objects in each page.
+        """
+        await self._collection.load_schema()
+        filters = dict(self._filters)
+        offset = filters.get('offset', 0)
+        while True:
+            filters['offset'] = offset
+            response = await self._get(filters)
+            results = self._api._get_response_data(response)
+            objects = results['objects']
+            if not objects:
+                return
+            yield objects
+            offset += len(objects)
+            if offset >= results['meta']['total_count']:
+                return
+
+    async def __aiter__(self):
+        resource_class = self._api._resource_class
+        async for objects in self._iterate_pages():
+            for item in objects:
+                yield resource_class(self._api, self._collection, item['id'], item)
+
+    async def to_columns(self, fields):
+        """!
+        @brief Return all search results as a dictionary of columns.
+        @see productstatus.api.QuerySet.to_columns().
+        """
+        await self._collection.load_schema()
+        schema_fields = self._collection.schema['fields']
+        for field in fields:
+            if field not in schema_fields:
+                raise KeyError('Attribute does not exist: %s' % field)
+        columns = dict((field, []) for field in fields)
+        async for objects in self._iterate_pages():
+            for field in fields:
+                columns[field].extend([item.get(field) for item in objects])
+        return columns
+
+    async def delete(self, max_workers=8, chunk_size=100):
+        """!
+        @brief Delete all resources matching the search query.
+        @see productstatus.api.QuerySet.delete().
+        """
+        await self._collection.load_schema()
+        start = time.time()
+        filters = self._delete_filters()
+        results = self._api._get_response_data(await self._get(filters))
+
+        async def get_page(offset):
+            return self._api._get_response_data(await self._get(dict(filters, offset=offset)))
+
+        offsets = self._remaining_page_offsets(filters, results)
+        pages = [results] + await _gather([get_page(x) for x in offsets], max_workers)
+        uris = self._resource_uris(pages)
+        report = await self._collection._delete_uris(uris, max_workers=max_workers, chunk_size=chunk_size)
+        report.elapsed = time.time() - start
+        logging.info('%s: %s' % (self, report))
+        return report
+
+    parallel_map = _SyncOnly('QuerySet.parallel_map', 'iterate with "async for" and use asyncio.gather() instead')
+
+
+class AsyncResourceCollection(productstatus.api.ResourceCollection):
+    """!
+    @brief asyncio version of productstatus.api.ResourceCollection.
+
+    Resources can be accessed by UUID using indexes, without making a request.
+    Use `await collection.get(slug)` to look up resources by slug.
+    """
+
+    async def load_schema(self):
+        """!
+        @brief Retrieve the data model schema for this resource type, unless it is already loaded.
+        """
+        if not self._schema:
+            response = await self._api._do_request('get', self._schema_url)
+            self._schema = self._api._get_response_data(response)
+            self._validators = {}
+            self._required_fields = None
+        return self._schema
+
+    def _get_schema_from_server(self):
+        raise productstatus.exceptions.ProductstatusException(
+            'The %s schema is not loaded; use "await api.%s.load_schema()"' % (self._resource_name, self._resource_name)
+        )
+
+    async def get(self, id):
+        """!
+        @brief Return a resource given its UUID or slug. Resources given by
+        slug are searched for on the server.
+        """
+        try:
+            uuid.UUID(id)
+            return self[id]
+        except ValueError:
+            qs = self.objects.filter(slug=id)
+            if await qs.count() == 0:
+                raise productstatus.exceptions.ResourceNotFoundException(
+                    '%s resource with slug "%s" not found.' % (
+                        self._resource_name,
+                        id,
+                    )
+                )
+            return qs[0]
+
+    def __getitem__(self, id):
+        """!
+        @brief Resource accessor. Returns a Resource object pointing to a
+        specific UUID, without fetching it from the server.
+        """
+        try:
+            uuid.UUID(id)
+        except ValueError:
+            raise KeyError('Use "await collection.get(slug)" to look up resources by slug with the asyncio client')
+        return self._api._resource_class(self._api, self, id)
+
+    async def find_or_create_ephemeral(self, data, order_by=None, extra_params={}):
+        """!
+        @see productstatus.api.ResourceCollection.find_or_create_ephemeral().
+        """
+        await self.load_schema()
+        qs = self.objects
+        qs.filter(**data)
+        if order_by:
+            qs.order_by(order_by)
+        if await qs.count() == 0:
+            logging.info('No matching %s resource found, creating...' % self._resource_name)
+            resource = self.create()
+            [setattr(resource, key, value) for key, value in data.items()]
+            [setattr(resource, key, value) for key, value in extra_params.items()]
+            return resource
+        return qs[0]
+
+    async def find_or_create(self, *args, **kwargs):
+        """!
+        @see productstatus.api.ResourceCollection.find_or_create().
+        """
+        resource = await self.find_or_create_ephemeral(*args, **kwargs)
+        if not resource._has_url():
+            await resource.save()
+            logging.info('%s: resource created' % resource)
+        return resource
+
+    async def find_or_create_many(self, list_of_data, order_by=None, extra_params={}, memo=False, max_workers=8):
+        """!
+        @see productstatus.api.ResourceCollection.find_or_create_many().
+        """
+        await self.load_schema()
+        keys, unique, found = self._find_or_create_lookup(list_of_data, order_by, extra_params, memo)
+
+        async def search(batch):
+            if len(batch) == 1:
+                qs = self._find_or_create_queryset(unique[batch[0]], order_by)
+                if await qs.count() == 0:
+                    return {}
+                return {batch[0]: qs[0]}
+            matches = {}
+            async for objects in self._find_or_create_batch_queryset(batch, order_by)._iterate_pages():
+                self._find_or_create_match(batch, objects, matches)
+            return matches
+
+        batches = self._find_or_create_batches([x for x in unique.keys() if x not in found])
+        for matches in await _gather([search(x) for x in batches], max_workers):
+            for key, resource in matches.items():
+                logging.info('%s: using existing resource' % resource)
+                found[key] = resource
+
+        missing = [x for x in unique.keys() if x not in found]
+        if missing:
+            created = self._find_or_create_new(missing, unique, extra_params)
+            await self.bulk_save(created, max_workers=max_workers)
+            found.update(zip(missing, created))
+
+        if memo:
+            self._find_or_create_remember(found, order_by, extra_params)
+        return [found[key] for key in keys]
+
+    async def bulk_save(self, resources, chunk_size=100, max_workers=8):
+        """!
+        @brief Save a list of new or changed resources of this type using as
+        few requests as possible.
+        @see productstatus.api.ResourceCollection.bulk_save().
+        """
+        await self.load_schema()
+        resources = list(resources)
+        pending = self._bulk_save_pending(resources)
+
+        await resolve_evaluated_resources(pending, max_workers=max_workers)
+
+        if self._supports_bulk_patch():
+            bulk = self._bulk_patch_resources(pending)
+            try:
+                for offset in range(0, len(bulk), chunk_size):
+                    chunk = bulk[offset:offset + chunk_size]
+                    response = await self._api._do_request('patch', self._url, data=self._serialize_bulk(chunk))
+                    self._finish_bulk_patch(chunk, response)
+            except productstatus.exceptions.MethodNotAllowedException:
+                logging.info('%s: bulk PATCH not allowed, falling back to single saves' % self)
+            pending = [x for x in pending if x._needs_save()]
+
+        await _gather([x.save() for x in pending], max_workers)
+        return resources
+
+    async def purge_expired(self, field='expires', now=None, page_size=productstatus.api.DELETE_PAGE_SIZE, **kwargs):
+        """!
+        @brief Delete all resources of this type whose expiry time has passed.
+        @see productstatus.api.ResourceCollection.purge_expired().
+        """
+        await self.load_schema()
+        return await self._expired_queryset(field, now, page_size).delete(**kwargs)
+
+    async def _delete_uris(self, uris, max_workers=8, chunk_size=100):
+        """!
+        @brief Delete a list of resources given by their URIs, returning a DeleteReport.
+        """
+        report = productstatus.api.DeleteReport()
+        remaining = list(uris)
+        while remaining and self._supports_bulk_patch():
+            chunk = remaining[:chunk_size]
+            serialized = productstatus.codec.dumps({'objects': [], 'deleted_objects': chunk})
+            try:
+                await self._api._do_request('patch', self._url, data=serialized)
+                report.deleted += len(chunk)
+            except productstatus.exceptions.MethodNotAllowedException:
+                logging.info('%s: bulk delete not allowed, falling back to single deletes' % self)
+                break
+            except productstatus.exceptions.ProductstatusException as e:
+                report.failed += [(uri, e) for uri in chunk]
+            remaining = remaining[chunk_size:]
+
+        async def delete(uri):
+            try:
+                await self._api._do_request('delete', productstatus.utils.build_url(self._api._base_url, uri))
+            except productstatus.exceptions.ProductstatusException as e:
+                return e
+            return None
+
+        for uri, exception in zip(remaining, await _gather([delete(x) for x in remaining], max_workers)):
+            if exception is None:
+                report.deleted += 1
+            else:
+                report.failed.append((uri, exception))
+        self._forget_deleted(uris, report)
+        return report
+
+
+class AsyncResource(productstatus.api.Resource):
+    """!
+    @brief asyncio version of productstatus.api.Resource.
+
+    Resource data is loaded with `await resource.fetch()`, and stored with
+    `await resource.save()`. Related resources are returned without data, and
+    must be fetched before their attributes can be read.
+    """
+
+    async def fetch(self):
+        """!
+        @brief Fetch the resource from the API server.
+        @returns This Resource object.
+        """
+        if not self._has_url():
+            raise productstatus.exceptions.ProductstatusException('Trying to get an object without a primary key')
+        await self._collection.load_schema()
+        try:
+            response = await self._api._do_request('get', self._url)
+        except productstatus.exceptions.NotFoundException as e:
+            productstatus.api._find_or_create_memo_forget(self._api._base_url, [self._uri()])
+            raise productstatus.exceptions.ResourceNotFoundException(e)
+        self._load_data(self._api._get_response_data(response))
+        return self
+
+    async def save(self):
+        """!
+        @brief Store the locally cached values on the server.
+        @see productstatus.api.Resource.save().
+        """
+        await self._collection.load_schema()
+        await resolve_evaluated_resources(self)
+        request = self._prepare_save()
+        if request is None:
+            return
+        method, url, serialized = request
+        response = await self._api._do_request(method, url, data=serialized)
+        self._finish_save(response)
+
+    async def delete(self):
+        """!
+        @brief Delete this resource from the server.
+        """
+        if not self._has_url():
+            raise productstatus.exceptions.ProductstatusException('Trying to delete an object without a primary key')
+        try:
+            await self._api._do_request('delete', self._url)
+        except productstatus.exceptions.NotFoundException as e:
+            productstatus.api._find_or_create_memo_forget(self._api._base_url, [self._uri()])
+            raise productstatus.exceptions.ResourceNotFoundException(e)
+        productstatus.api._find_or_create_memo_forget(self._api._base_url, [self._uri()])
+        self._url = None
+        self._id = None
+
+    def _get_resource_from_server(self):
+        raise productstatus.exceptions.ProductstatusException(
+            'Resource at %s is not loaded; use "await resource.fetch()"' % self._url
+        )
+
+
+AsyncApi._collection_class = AsyncResourceCollection
+AsyncApi._queryset_class = AsyncQuerySet
+AsyncApi._resource_class = AsyncResource
@@ -1,22 +1,243 @@
+import os
 import uuid
 import copy
-import requests
-import requests.auth
-import json
+import weakref
+import contextlib
+import threading
+import functools
+import queue
+import collections
+import concurrent.futures
 import logging
+import time
+import decimal
 import datetime
-import dateutil.parser
-import dateutil.tz
+import urllib.parse
 
+import productstatus.codec
 import productstatus.utils
 import productstatus.exceptions
-import productstatus.event
+import productstatus.metrics
+import productstatus.retry
+import productstatus.routing
+import productstatus.transport
+import productstatus.unitofwork
 
 
-SERVICE_UNAVAILABLE_EXCEPTIONS = (requests.exceptions.RequestException,
-                                  requests.exceptions.Timeout,
+SERVICE_UNAVAILABLE_EXCEPTIONS = (productstatus.exceptions.TransportException,
                                   )
 
+# Python types accepted by client-side validation for each schema field type.
+# Related fields are checked separately, and unknown types are not checked.
+# Values of other types are also accepted if the server converts them, see
+# FIELD_CONVERSIONS.
+FIELD_TYPES = {
+    'string': (str,),
+    'integer': (int,),
+    'float': (int, float),
+    'decimal': (int, float, decimal.Decimal, str),
+    'boolean': (bool,),
+    'datetime': (datetime.datetime,),
+    'list': (list, tuple),
+    'dict': (dict,),
+}
+
+# Conversion functions applied by Tastypie to values of numeric fields. Values
+# that are converted without error, and without losing precision, are accepted
+# by client-side validation, e.g. `2.0` or `'2'` for an integer field. Booleans
+# are not accepted, although Tastypie converts any value to a boolean.
+FIELD_CONVERSIONS = {
+    'integer': int,
+    'float': float,
+}
+
+# Default value shown in Tastypie schemas for fields without a default.
+NO_DEFAULT = 'No default provided.'
+
+
+# Maximum number of entries in the find_or_create_many() cache.
+FIND_OR_CREATE_MEMO_SIZE = 10000
+
+# Number of results requested per page while collecting resources to delete.
+DELETE_PAGE_SIZE = 1000
+
+# Maximum number of values searched for with a single `__in` filter by
+# find_or_create_many().
+FIND_OR_CREATE_BATCH_SIZE = 100
+
+# Process-wide cache of resource URIs found or created by
+# ResourceCollection.find_or_create_many(), keyed by server, resource type,
+# search parameters, ordering and extra parameters. The least recently used
+# entries are discarded when it is full.
+_find_or_create_memo = collections.OrderedDict()
+_find_or_create_memo_lock = threading.Lock()
+
+
+def clear_find_or_create_memo():
+    """!
+    @brief Empty the process-wide cache used by ResourceCollection.find_or_create_many().
+    """
+    with _find_or_create_memo_lock:
+        _find_or_create_memo.clear()
+
+
+def _find_or_create_memo_get(key):
+    """!
+    @brief Return a resource URI from the find_or_create_many() cache, or
+    None if it is not cached.
+    """
+    with _find_or_create_memo_lock:
+        uri = _find_or_create_memo.get(key)
+        if uri is not None:
+            _find_or_create_memo.move_to_end(key)
+        return uri
+
+
+def _find_or_create_memo_update(items):
+    """!
+    @brief Add (key, resource URI) pairs to the find_or_create_many() cache,
+    discarding the least recently used entries if it is full.
+    """
+    with _find_or_create_memo_lock:
+        for key, uri in items:
+            _find_or_create_memo[key] = uri
+            _find_or_create_memo.move_to_end(key)
+        while len(_find_or_create_memo) > FIND_OR_CREATE_MEMO_SIZE:
+            _find_or_create_memo.popitem(last=False)
+
+
+def _find_or_create_memo_forget(base_url, uris):
+    """!
+    @brief Remove the entries for deleted resources on a server from the
+    find_or_create_many() cache.
+    """
+    uris = set(uris)
+    with _find_or_create_memo_lock:
+        stale = [key for key, uri in _find_or_create_memo.items() if key[0] == base_url and uri in uris]
+        for key in stale:
+            del _find_or_create_memo[key]
+
+
+# Api objects in this process, which are reset in child processes after fork.
+_instances = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    """!
+    @brief Discard connections, event listeners and locks inherited from the
+    parent process. Called in the child process after os.fork().
+    """
+    global _find_or_create_memo_lock
+    _find_or_create_memo_lock = threading.Lock()
+    for api in list(_instances):
+        api._reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# Api object used by QuerySet.parallel_map() in pool worker processes.
+_worker_api = None
+
+
+def _init_parallel_map_worker(api):
+    """!
+    @brief Pool initializer for QuerySet.parallel_map(), run once in each
+    worker process.
+    """
+    global _worker_api
+    _worker_api = api
+
+
+def _parallel_map_chunk(func, resource_name, objects):
+    """!
+    @brief Run `func` on Resource objects created from a list of decoded
+    objects in a QuerySet.parallel_map() worker process, and return the list
+    of results.
+    """
+    collection = getattr(_worker_api, resource_name)
+    return [func(_worker_api._resource_class(_worker_api, collection, item['id'], item)) for item in objects]
+
+
+def _connect_timeout(timeout):
+    """!
+    @brief Return the connect timeout of a request timeout given as a number
+    of seconds, None, or a (connect, read) tuple.
+    """
+    if isinstance(timeout, tuple):
+        return timeout[0]
+    return timeout
+
+
+def _clamp_timeout(timeout, remaining):
+    """!
+    @brief Return a request timeout shortened to at most `remaining` seconds.
+    @see _connect_timeout().
+    """
+    if isinstance(timeout, tuple):
+        return tuple(remaining if x is None else min(x, remaining) for x in timeout)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+class _AbandonedRequest(Exception):
+    """!
+    @brief Raised instead of sending a hedged request that is no longer needed.
+    """
+
+
+class _Attempt(object):
+    """!
+    @brief One attempt at sending a request: the first one, a retry, or a
+    hedge sent because the first one was slower than usual.
+
+    Once another hedged request has been answered, the attempt is abandoned:
+    it is not sent if it has not been sent yet, and otherwise releases its
+    concurrency limiter slot right away. The HTTP request itself cannot be
+    interrupted, and its response is discarded when it arrives.
+    """
+
+    def __init__(self, retry=False, hedge=False):
+        self.retry = retry
+        self.hedge = hedge
+        self._lock = threading.Lock()
+        self._limiter = None
+        self._token = None
+        self.abandoned = False
+
+    def hold(self, limiter, token):
+        """!
+        @brief Keep the concurrency limiter slot taken for this attempt.
+        Returns False, giving the slot back, if the attempt is abandoned.
+        """
+        with self._lock:
+            if not self.abandoned:
+                self._limiter = limiter
+                self._token = token
+                return True
+        limiter.cancel(token)
+        return False
+
+    def release(self, overloaded):
+        """!
+        @brief Release the concurrency limiter slot with the outcome of the
+        request, unless it was given back when the attempt was abandoned.
+        """
+        with self._lock:
+            token, self._token = self._token, None
+        if token is not None:
+            self._limiter.release(token, overloaded=overloaded)
+
+    def abandon(self):
+        """!
+        @brief Abandon this attempt, giving back its concurrency limiter slot.
+        """
+        with self._lock:
+            self.abandoned = True
+            token, self._token = self._token, None
+        if token is not None:
+            self._limiter.cancel(token)
+
 
 class Api(object):
     """
@@ -33,31 +254,176 @@ class Api(object):
     products = api.product
     arome = products['66340f0b-2c2c-436d-a077-3d939f4f7283']
     print(arome.grid_resolution)
+
+    Api objects are thread-safe, and may be shared by any number of threads.
+    The server schema and resource collections are loaded only once, even
+    when first accessed by several threads at the same time. Requests are
+    sent through a pool of persistent connections, which is shared by all
+    threads. Resource and QuerySet objects are not thread-safe, and should not
+    be changed by one thread while they are used by another. Unit-of-work
+    sessions only collect resources changed by the thread that started them.
+
+    Api, ResourceCollection, QuerySet and Resource objects can be pickled, and
+    Api objects can be used in processes created with os.fork(). Schemas and
+    cached find_or_create_many() results are kept, so that worker processes
+    do not need to retrieve them again, while connections are created anew
+    in each process.
     """
 
-    def __init__(self, base_url, verify_ssl=True, username=None, api_key=None, timeout=3):
+    # Classes used for collections, query sets and resources. Assigned at the
+    # end of this module, and overridden by productstatus.aio.AsyncApi.
+    _collection_class = None
+    _queryset_class = None
+    _resource_class = None
+
+    def __init__(self, base_url, verify_ssl=True, username=None, api_key=None, timeout=3,
+                 pool_connections=10, pool_maxsize=10, pool_block=False, keep_alive=True,
+                 retry=None, limiter=None, transport='requests', metrics=None,
+                 lazy_load_detector=None, read_after_write=5.0):
         """
         Initialize the Api class.
 
-        @param base_url The root URL where the Productstatus server serves data.
+        @param base_url The root URL where the Productstatus server serves
+            data, or a list of root URLs of servers serving the same data.
+            The first server in the list is the primary server, which
+            receives all writes. Reads are spread across all servers.
         @param verify_ssl Whether or not to verify SSL certificates.
         @param username Client API username.
         @param api_key Client API key.
-        @param timeout Request timeout in seconds.
-        """
-        self._base_url = base_url.rstrip('/')
+        @param timeout Request timeout in seconds, or a (connect, read) tuple.
+        @param pool_connections Number of hosts to keep connection pools for.
+        @param pool_maxsize Maximum number of connections kept open to one host.
+        @param pool_block If True, threads wait for a free connection when
+            `pool_maxsize` connections to a host are in use. Otherwise, extra
+            connections are opened and closed after use.
+        @param keep_alive Whether or not to reuse connections between requests.
+        @param retry A productstatus.retry.RetryPolicy object. The default
+            policy sends each request once, without retries or hedging.
+        @param limiter A productstatus.limiter.AdaptiveLimiter object, which
+            limits the number of concurrent requests. It may be shared by
+            several Api objects. By default, requests are not limited.
+        @param transport The HTTP transport used to send requests, either
+            the name of a transport in productstatus.transport.TRANSPORTS,
+            a productstatus.transport.Transport subclass, or a callable
+            taking the same arguments and returning a Transport object.
+        @param metrics A productstatus.metrics.Metrics object, which counts
+            the requests sent and is returned by stats(). It may be shared
+            by several Api objects. By default, a new one is created.
+        @param lazy_load_detector A productstatus.lazyload.LazyLoadDetector
+            object, which warns when resources found through a QuerySet
+            make one request each to load the same related resource.
+        @param read_after_write Number of seconds after a write during which
+            reads are sent to the primary server, if several servers are used,
+            so that they see the write even if replicas lag behind. With 0,
+            reads may be answered by replicas that do not have the write yet.
+        """
+        if isinstance(base_url, str):
+            base_url = [base_url]
+        self._endpoints = [x.rstrip('/') for x in base_url]
+        self._base_url = self._endpoints[0]
+        if len(self._endpoints) > 1:
+            self._router = productstatus.routing.EndpointRouter(self._endpoints, read_after_write=read_after_write)
+        else:
+            self._router = None
         self._url_prefix = '/api/v1/'
         self._url = productstatus.utils.build_url(self._base_url, self._url_prefix)
         self._verify_ssl = verify_ssl
         self._timeout = timeout
-        self._session = requests.Session()
-        self._session.verify = self._verify_ssl
-        self._session.headers.update({'content-type': 'application/json'})
+        self._username = username
+        self._api_key = api_key
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._pool_block = pool_block
+        self._keep_alive = keep_alive
+        self._retry = retry or productstatus.retry.RetryPolicy()
+        self._limiter = limiter
+        self._transport_class = productstatus.transport.get_transport_class(transport)
+        self._metrics = metrics or productstatus.metrics.Metrics()
+        self._lazy_load_detector = lazy_load_detector
+        self._profiler = None
+        self._transport = None
+        self._hedge_executor = None
         self._event_listener = None
-        if username and api_key:
-            self._session.auth = TastypieApiKeyAuth(username, api_key)
         self._resource_collection = {}
         self._schema = {}
+        self._lock = threading.RLock()
+        self._thread_local = threading.local()
+        _instances.add(self)
+
+    def __getstate__(self):
+        """!
+        @brief Return the configuration of this object for pickling, together
+        with the schemas and find_or_create_many() results retrieved from the
+        server. Connections, locks and event listeners are not included.
+        """
+        state = self.__dict__.copy()
+        for name in ['_transport', '_hedge_executor', '_event_listener', '_lock', '_thread_local', '_profiler']:
+            del state[name]
+        state['_resource_collection'] = dict(
+            (name, collection._schema) for name, collection in self._resource_collection.items()
+        )
+        with _find_or_create_memo_lock:
+            state['_find_or_create_memo'] = [
+                (key, value) for key, value in _find_or_create_memo.items() if key[0] == self._base_url
+            ]
+        return state
+
+    def __setstate__(self, state):
+        """!
+        @brief Restore a pickled object. A new HTTP transport is created on first use.
+        """
+        state = state.copy()
+        collection_schemas = state.pop('_resource_collection')
+        memo = state.pop('_find_or_create_memo')
+        self.__dict__.update(state)
+        self._transport = None
+        self._hedge_executor = None
+        self._event_listener = None
+        self._profiler = None
+        self._lock = threading.RLock()
+        self._thread_local = threading.local()
+        self._resource_collection = {}
+        for name, schema in collection_schemas.items():
+            collection = self._collection_class(self, name)
+            collection._schema = schema
+            self._resource_collection[name] = collection
+        _find_or_create_memo_update(memo)
+        _instances.add(self)
+
+    def _reset_after_fork(self):
+        """!
+        @brief Discard the HTTP transport, event listener and locks inherited
+        from the parent process. They are not closed, as their connections
+        still belong to the parent process.
+        """
+        if self._transport is not None:
+            self._transport._reset_after_fork()
+        self._transport = None
+        self._hedge_executor = None
+        self._event_listener = None
+        self._profiler = None
+        self._lock = threading.RLock()
+        self._thread_local = threading.local()
+        for collection in self._resource_collection.values():
+            collection._lock = threading.RLock()
+        if self._limiter is not None:
+            self._limiter._reset_after_fork()
+        if self._router is not None:
+            self._router._reset_after_fork()
+        self._metrics._reset_after_fork()
+        if self._lazy_load_detector is not None:
+            self._lazy_load_detector._reset_after_fork()
+
+    @property
+    def _sessions(self):
+        """!
+        @brief The stack of active unit-of-work sessions started by the current thread.
+        """
+        try:
+            return self._thread_local.sessions
+        except AttributeError:
+            self._thread_local.sessions = []
+            return self._thread_local.sessions
 
     def get_event_listener_configuration(self):
         """!
@@ -71,6 +437,8 @@ class Api(object):
         retrieved from the Productstatus server.
         @returns A productstatus.event.Listener object.
         """
+        # Kafka and SSL support is imported on demand, keeping REST-only use fast
+        import productstatus.event
         if not self._event_listener:
             configuration = self.get_event_listener_configuration()
             kwargs['bootstrap_servers'] = configuration.brokers
@@ -94,34 +462,332 @@ class Api(object):
         @brief Returns True if a username and API key was supplied with the API
         object constructor, False otherwise.
         """
-        return self._session.auth is not None
+        return bool(self._username and self._api_key)
+
+    def _get_transport(self):
+        """!
+        @brief Return the HTTP transport, creating it on first use.
+        """
+        transport = self._transport
+        if transport is None:
+            with self._lock:
+                if self._transport is None:
+                    self._transport = self._create_transport()
+                transport = self._transport
+        return transport
+
+    def _create_transport(self):
+        """!
+        @brief Return a new HTTP transport configured with SSL settings,
+        credentials and connection pool settings.
+        """
+        return self._transport_class(verify_ssl=self._verify_ssl,
+                                     username=self._username,
+                                     api_key=self._api_key,
+                                     pool_connections=self._pool_connections,
+                                     pool_maxsize=self._pool_maxsize,
+                                     pool_block=self._pool_block,
+                                     keep_alive=self._keep_alive)
+
+    def close(self):
+        """!
+        @brief Close all connections to the server. New connections are
+        opened if the object is used again.
+        """
+        with self._lock:
+            transport, self._transport = self._transport, None
+        if transport is not None:
+            transport.close()
+
+    def _get_hedge_executor(self):
+        """!
+        @brief Return the thread pool used to run hedged requests, creating it on first use.
+        """
+        executor = self._hedge_executor
+        if executor is None:
+            with self._lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2 * self._pool_maxsize)
+                executor = self._hedge_executor
+        return executor
+
+    @contextlib.contextmanager
+    def deadline(self, seconds):
+        """!
+        @brief Return a context manager that limits the time spent on all
+        requests made by the current thread within its `with` block,
+        including requests made concurrently on its behalf by bulk
+        operations. When the deadline has passed, requests raise
+        DeadlineExceededException. Deadlines can be nested.
+
+        @param seconds Number of seconds from now until the deadline.
+        """
+        previous = getattr(self._thread_local, 'deadline', None)
+        deadline = time.monotonic() + seconds
+        if previous is not None:
+            deadline = min(deadline, previous)
+        self._thread_local.deadline = deadline
+        try:
+            yield
+        finally:
+            self._thread_local.deadline = previous
+
+    def _get_deadline(self):
+        """!
+        @brief Return the monotonic time when the current request must
+        complete, or None if it has no deadline.
+        """
+        deadline = getattr(self._thread_local, 'deadline', None)
+        if self._retry.deadline is not None:
+            policy_deadline = time.monotonic() + self._retry.deadline
+            if deadline is None or policy_deadline < deadline:
+                deadline = policy_deadline
+        return deadline
 
     def _do_request(self, method, *args, **kwargs):
         """
-        Run a request through the requests API. This function wraps
-        self.session.{get,post,patch,put,delete} and adds exception handling.
+        Run a request through the HTTP transport, adding exception handling.
+
+        Failed requests are retried, and slow GET requests are hedged,
+        according to the retry policy given to the constructor.
 
         Returns a response object.
         """
-        if 'timeout' not in kwargs:
-            kwargs['timeout'] = self._timeout
-        try:
-            response = self._session.request(method, *args, **kwargs)
-        except SERVICE_UNAVAILABLE_EXCEPTIONS as e:
+        if self._profiler is not None:
+            with self._profiler.phase('network', self._collection_name(args[0])):
+                return self._do_request_with_retries(method, *args, **kwargs)
+        return self._do_request_with_retries(method, *args, **kwargs)
+
+    def _do_request_with_retries(self, method, *args, **kwargs):
+        """!
+        @brief Send a request, retrying it according to the retry policy.
+        @see _do_request().
+        """
+        timeout = kwargs.pop('timeout', self._timeout)
+        deadline = self._get_deadline()
+        attempt = 0
+        while True:
+            attempt += 1
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise productstatus.exceptions.DeadlineExceededException(
+                        "Deadline exceeded after %d attempts: %s %s" % (attempt - 1, method.upper(), args[0])
+                    )
+                kwargs['timeout'] = _clamp_timeout(timeout, remaining)
+            else:
+                kwargs['timeout'] = timeout
+            response = None
+            try:
+                response = self._send_request(method, args, kwargs, attempt > 1)
+            except SERVICE_UNAVAILABLE_EXCEPTIONS as e:
+                error = e
+            if response is not None and not self._retry.should_retry_status(response.status_code):
+                break
+            delay = self._retry.retry_delay(method, attempt, response)
+            if delay is None or (deadline is not None and time.monotonic() + delay >= deadline):
+                break
+            logging.debug('Retrying %s %s in %.3f seconds' % (method.upper(), args[0], delay))
+            time.sleep(delay)
+
+        if response is None:
             raise productstatus.exceptions.ServiceUnavailableException(
-                "Could not perform request: %s" % str(e)
+                "Could not perform request: %s" % str(error)
             )
-
         self._raise_response_exceptions(response)
         return response
 
+    def _send_request(self, method, args, kwargs, retry=False):
+        """!
+        @brief Send a request once, or hedge it with a second request if it
+        is slower than usual. Returns the first response received.
+        @param retry True if the request is sent again after a failed request.
+        """
+        delay = self._retry.hedge_delay(method)
+        if delay is None:
+            return self._send_request_once(method, args, kwargs, _Attempt(retry=retry))
+        executor = self._get_hedge_executor()
+        # Create the transport here, since the calling thread may hold the
+        # lock that the worker threads would need to create it.
+        self._get_transport()
+        attempts = [_Attempt(retry=retry)]
+        futures = [executor.submit(self._send_request_once, method, args, kwargs, attempts[0])]
+        done, pending = concurrent.futures.wait(futures, timeout=delay)
+        if not done:
+            logging.debug('Hedging %s %s after %.3f seconds' % (method.upper(), args[0], delay))
+            attempts.append(_Attempt(hedge=True))
+            futures.append(executor.submit(self._send_request_once, method, args, kwargs, attempts[1]))
+        winner = futures[0]
+        for future in concurrent.futures.as_completed(futures):
+            if future.exception() is None:
+                winner = future
+                break
+        # The other request is not sent if it has not been sent yet, and
+        # otherwise gives up its concurrency limiter slot right away.
+        for future, attempt in zip(futures, attempts):
+            if future is not winner:
+                future.cancel()
+                attempt.abandon()
+        return winner.result()
+
+    def _send_request_once(self, method, args, kwargs, attempt=None):
+        """!
+        @brief Send a request, recording its latency. If several servers are
+        used, GET requests to the primary server are sent to the server
+        chosen by the endpoint router instead, and writes are reported to it.
+        @param attempt An _Attempt object, or None for a single first attempt.
+        """
+        if attempt is not None and attempt.abandoned:
+            raise _AbandonedRequest()
+        url = args[0]
+        if self._router is None:
+            return self._send_http_request(method, args, kwargs, attempt)
+        if method.lower() != 'get' or not url.startswith(self._base_url + '/'):
+            try:
+                return self._send_http_request(method, args, kwargs, attempt)
+            finally:
+                if method.lower() in productstatus.routing.WRITE_METHODS:
+                    self._router.record_write()
+        endpoint = self._router.choose()
+        args = (endpoint.url + url[len(self._base_url):],) + tuple(args[1:])
+        start = time.monotonic()
+        try:
+            response = self._send_http_request(method, args, kwargs, attempt)
+        except _AbandonedRequest:
+            self._router.finish(endpoint, None, True)
+            raise
+        except BaseException as e:
+            self._router.finish(endpoint, time.monotonic() - start, not isinstance(e, SERVICE_UNAVAILABLE_EXCEPTIONS))
+            raise
+        self._router.finish(endpoint, time.monotonic() - start, response.status_code < 500)
+        return response
+
+    def _send_http_request(self, method, args, kwargs, attempt=None):
+        """!
+        @brief Send a request through the HTTP session, recording its latency.
+        If a concurrency limiter is used, wait for a free slot first, for no
+        longer than the connect timeout.
+        @param attempt An _Attempt object, or None for a single first attempt.
+        """
+        if attempt is None:
+            attempt = _Attempt()
+        limiter = self._limiter
+        if limiter is not None:
+            token = limiter.acquire(_connect_timeout(kwargs.get('timeout')))
+            if token is None:
+                raise productstatus.exceptions.ServiceUnavailableException(
+                    "Timed out waiting for one of %d concurrent requests to complete" % limiter.limit
+                )
+            if not attempt.hold(limiter, token):
+                raise _AbandonedRequest()
+        start = time.monotonic()
+        try:
+            response = self._get_transport().request(method, *args, **kwargs)
+        except BaseException as e:
+            attempt.release(overloaded=isinstance(e, SERVICE_UNAVAILABLE_EXCEPTIONS))
+            self._record_request(method, args[0], kwargs.get('data'), None, time.monotonic() - start, attempt)
+            raise
+        latency = time.monotonic() - start
+        attempt.release(overloaded=response.status_code == 429 or response.status_code >= 500)
+        if response.status_code < 400:
+            self._retry.record_latency(method, latency)
+        self._record_request(method, args[0], kwargs.get('data'), response, latency, attempt)
+        return response
+
+    def _record_request(self, method, url, data, response, latency, attempt=None):
+        """!
+        @brief Count a request in the metrics returned by stats().
+        @param response The response, or None if none was received.
+        @param attempt The _Attempt object, telling whether the request is a
+            retry or a hedge, and whether its response was abandoned.
+        """
+        if attempt is None:
+            attempt = _Attempt()
+        if isinstance(data, str):
+            data = data.encode('UTF-8')
+        self._metrics.record_request(
+            method,
+            self._collection_name(url),
+            None if response is None else response.status_code,
+            latency,
+            len(data) if data else 0,
+            0 if response is None else len(response.content or b''),
+            attempt.abandoned,
+            attempt.retry,
+            attempt.hedge,
+        )
+
+    def _collection_name(self, url):
+        """!
+        @brief Return the name of the resource collection that a URL belongs
+        to, or None if it is not below the URL of any collection.
+        """
+        path = urllib.parse.urlsplit(url).path
+        if not path.startswith(self._url_prefix):
+            return None
+        return path[len(self._url_prefix):].split('/', 1)[0] or None
+
+    def stats(self):
+        """!
+        @brief Return a snapshot of the request and cache metrics, together
+        with the state of the concurrency limiter and of the servers used
+        for reads, if any.
+        """
+        stats = self._metrics.snapshot()
+        stats['limiter'] = None if self._limiter is None else self._limiter.stats()
+        stats['endpoints'] = None if self._router is None else self._router.stats()
+        return stats
+
+    def session(self, **kwargs):
+        """!
+        @brief Return a unit of work that saves new and changed resources in
+        dependency order when its `with` block exits.
+
+        Takes the same parameters as the productstatus.unitofwork.Session constructor.
+        @returns A productstatus.unitofwork.Session object.
+        """
+        return productstatus.unitofwork.Session(self, **kwargs)
+
+    def _map_concurrently(self, func, items, max_workers):
+        """!
+        @brief Run `func` on every item using a pool of threads, and return
+        the list of results in the same order as `items`.
+
+        If any calls raise an exception, the exception of the first such item
+        in `items` is re-raised once all calls have completed. With a single
+        worker or item, calls are made in the current thread, and the first
+        exception is raised immediately, without making the remaining calls.
+        """
+        items = list(items)
+        if max_workers <= 1 or len(items) <= 1:
+            return [func(x) for x in items]
+        deadline = getattr(self._thread_local, 'deadline', None)
+        if deadline is not None:
+            func = functools.partial(self._call_with_deadline, func, deadline)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+            futures = [executor.submit(func, x) for x in items]
+        return [x.result() for x in futures]
+
+    def _call_with_deadline(self, func, deadline, item):
+        """!
+        @brief Call `func` in a worker thread, with the deadline of the thread that started it.
+        """
+        self._thread_local.deadline = deadline
+        try:
+            return func(item)
+        finally:
+            self._thread_local.deadline = None
+
     def _get_response_data(self, response):
         """
         Get unserialized contents from a response object.
         """
-        if response.content:
-            return self._unserialize(response.content)
-        return response.content
+        if not response.content:
+            return response.content
+        if self._profiler is not None:
+            with self._profiler.phase('decode', self._collection_name(str(getattr(response, 'url', '')))):
+                return self._unserialize(response.content)
+        return self._unserialize(response.content)
 
     def _raise_response_exceptions(self, response):
         """
@@ -135,6 +801,8 @@ class Api(object):
             exception = productstatus.exceptions.UnauthorizedException
         elif response.status_code == 404:
             exception = productstatus.exceptions.NotFoundException
+        elif response.status_code == 405:
+            exception = productstatus.exceptions.MethodNotAllowedException
         else:
             exception = productstatus.exceptions.ClientErrorException
         raise exception(response.text)
@@ -144,7 +812,7 @@ class Api(object):
         Convert JSON encoded data into a dictionary.
         """
         try:
-            return json.loads(data.decode('UTF-8'))
+            return productstatus.codec.loads(data)
         except ValueError as e:
             raise productstatus.exceptions.UnserializeException(e)
 
@@ -170,17 +838,22 @@ class Api(object):
         Return a ResourceCollection object which can be used to retrieve
         resources. E.g. api.productinstance will point to /api/v1/productinstance/.
         """
-        if name not in self._resource_collection.keys():
-            if not self._schema:
-                self._get_schema_from_server()
-            if name not in self._schema.keys():
-                # ignore Python internal functions
-                if name[:2] == '__':
-                    raise AttributeError('Attribute %s not found' % name)
-                raise productstatus.exceptions.ResourceTypeNotFoundException(
-                    "The resource '%s' is not supported by the Productstatus server" % name)
-            self._resource_collection[name] = ResourceCollection(self, name)
-        return self._resource_collection[name]
+        # ignore Python internals and private members that are not set yet,
+        # e.g. while unpickling
+        if name[:1] == '_':
+            raise AttributeError('Attribute %s not found' % name)
+        collection = self._resource_collection.get(name)
+        if collection is not None:
+            return collection
+        with self._lock:
+            if name not in self._resource_collection.keys():
+                if not self._schema:
+                    self._get_schema_from_server()
+                if name not in self._schema.keys():
+                    raise productstatus.exceptions.ResourceTypeNotFoundException(
+                        "The resource '%s' is not supported by the Productstatus server" % name)
+                self._resource_collection[name] = self._collection_class(self, name)
+            return self._resource_collection[name]
 
     def __getitem__(self, index):
         """
@@ -220,6 +893,35 @@ class Api(object):
         return '<Productstatus API at %s>' % self._url
 
 
+class DeleteReport(object):
+    """!
+    @brief Summary of a bulk delete operation.
+
+    @param deleted Number of resources deleted.
+    @param failed List of (resource URI, exception) tuples for resources that could not be deleted.
+    @param elapsed Wall time spent, in seconds.
+    """
+
+    def __init__(self, deleted=0, failed=None, elapsed=0.0):
+        self.deleted = deleted
+        self.failed = failed or []
+        self.elapsed = elapsed
+
+    @property
+    def rate(self):
+        """!
+        @brief Number of resources deleted per second.
+        """
+        if not self.elapsed:
+            return 0.0
+        return self.deleted / self.elapsed
+
+    def __repr__(self):
+        return '<DeleteReport: %d deleted, %d failed in %.1fs (%.1f/s)>' % (
+            self.deleted, len(self.failed), self.elapsed, self.rate,
+        )
+
+
 class QuerySet(object):
     """
     The QuerySet class facilitates listing and filtering a resource collection.
@@ -239,6 +941,10 @@ class QuerySet(object):
         self._collection = collection
         self._filters = {}
         self._results = {}
+        self._requests = 0
+        self._bytes_in = 0
+        self._request_seconds = 0.0
+        self._lazy_loads = collections.Counter()
 
     def _relative_item_index(self, index):
         """
@@ -281,11 +987,45 @@ class QuerySet(object):
         """
         return self.filter(limit=int(limit))
 
+    def _get(self, filters):
+        """!
+        @brief Request a page of search results with the given filters,
+        counting the request in stats().
+        """
+        start = time.monotonic()
+        response = None
+        try:
+            response = self._api._do_request('get', self._collection._url, params=sorted(filters.items()))
+            return response
+        finally:
+            self._count_request(response, time.monotonic() - start)
+
+    def _count_request(self, response, seconds):
+        """!
+        @brief Count a request made by this query set.
+        """
+        self._requests += 1
+        self._request_seconds += seconds
+        if response is not None:
+            self._bytes_in += len(response.content or b'')
+
+    def stats(self):
+        """!
+        @brief Return the number of requests made by this query set, the
+        number of bytes received, and the number of seconds spent waiting
+        for responses, including retries.
+        """
+        return {
+            'requests': self._requests,
+            'bytes_in': self._bytes_in,
+            'seconds': self._request_seconds,
+        }
+
     def execute(self):
         """
         Fetch results from the server.
         """
-        response = self._api._do_request('get', self._collection._url, params=sorted(self._filters.items()))
+        response = self._get(self._filters)
         self._results = self._api._get_response_data(response)
 
     def execute_if_empty(self):
@@ -312,22 +1052,29 @@ class QuerySet(object):
         """
         Add a filter to the search query, serializing if neccessary.
         """
+        self._filters[key] = self._serialize_filter_value(key, value)
+
+    @staticmethod
+    def _serialize_filter_value(key, value):
+        """!
+        @brief Convert a filter value into the representation sent to the server.
+        """
         if isinstance(value, productstatus.api.EvaluatedResource):
             value = value.resource
         if isinstance(value, productstatus.api.Resource):
-            if not value.id:
+            primary_key = value._primary_key()
+            if not primary_key:
                 raise productstatus.exceptions.InvalidFilterDataException(
                     'Trying to filter "%s" by a Productstatus resource, but the resource is not persisted on the backend yet' % key
                 )
-            self._filters[key] = value.id
+            return primary_key
         elif isinstance(value, datetime.datetime):
             if not value.tzname():
                 raise productstatus.exceptions.InvalidFilterDataException(
                     'Cannot use a naive timestamp for filtering'
                 )
-            self._filters[key] = value.astimezone(dateutil.tz.tzutc()).strftime('%Y-%m-%dT%H:%M:%SZ')
-        else:
-            self._filters[key] = value
+            return value.astimezone(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        return value
 
     def _dict(self):
         """!
@@ -335,6 +1082,188 @@ class QuerySet(object):
         """
         return [x._dict() for x in self]
 
+    def _iterate_pages(self):
+        """!
+        @brief Iterate through all search results one page at a time, yielding
+        the list of decoded objects in each page. No Resource objects are created.
+        """
+        filters = copy.copy(self._filters)
+        offset = filters.get('offset', 0)
+        while True:
+            filters['offset'] = offset
+            response = self._get(filters)
+            results = self._api._get_response_data(response)
+            objects = results['objects']
+            if not objects:
+                return
+            yield objects
+            offset += len(objects)
+            if offset >= results['meta']['total_count']:
+                return
+
+    def to_columns(self, fields):
+        """!
+        @brief Return all search results as a dictionary of columns.
+
+        Columns are built page by page from the decoded JSON data, and contain
+        the values exactly as returned by the server, without type conversion.
+        Missing values are returned as None. See productstatus.columnar for
+        conversion into NumPy and Arrow arrays.
+
+        @param fields List of field names to include.
+        @returns A dictionary mapping each field name to a list of values.
+        """
+        schema_fields = self._collection.schema['fields']
+        for field in fields:
+            if field not in schema_fields:
+                raise KeyError('Attribute does not exist: %s' % field)
+        columns = dict((field, []) for field in fields)
+        for objects in self._iterate_pages():
+            for field in fields:
+                columns[field].extend([item.get(field) for item in objects])
+        return columns
+
+    def parallel_map(self, func, processes=None, chunksize=10, ordered=True, max_pending_pages=2):
+        """!
+        @brief Run `func` on every resource matching the search query using a
+        pool of worker processes, and yield the results.
+
+        Search results are fetched one page at a time while the workers run.
+        Workers receive the decoded objects of a page in chunks, and call
+        `func` with a Resource object for each of them. The Api object is
+        sent to each worker once, together with the retrieved schemas, so
+        that workers do not need to contact the server before calling `func`.
+
+        `func` must be a picklable function, such as a module-level function,
+        and its return values must also be picklable.
+
+        @param func Function taking one Resource object.
+        @param processes Number of worker processes, defaulting to the number of CPUs.
+        @param chunksize Maximum number of resources sent to a worker at once.
+        @param ordered If True, results are yielded in the order of the
+            search results. Otherwise, they are yielded as soon as available.
+        @param max_pending_pages Maximum number of pages fetched but not yet
+            yielded, bounding memory use when workers are slower than the server.
+        """
+        # multiprocessing is imported on demand, keeping REST-only use fast
+        import multiprocessing
+        # the schema is sent to the workers with the Api object
+        self._collection.schema
+        results = queue.Queue()
+        pages = self._iterate_pages()
+        chunk_counts = []
+        outstanding = {}
+        finished = {}
+        next_page, next_chunk = 0, 0
+        exhausted = False
+        pool = multiprocessing.Pool(processes, initializer=_init_parallel_map_worker, initargs=(self._api,))
+        try:
+            while True:
+                # keep the workers busy while limiting the number of pages in memory
+                in_flight = len(chunk_counts) - next_page if ordered else len(outstanding)
+                while not exhausted and in_flight < max_pending_pages:
+                    try:
+                        objects = next(pages)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    page = len(chunk_counts)
+                    chunks = [objects[x:x + chunksize] for x in range(0, len(objects), chunksize)]
+                    chunk_counts.append(len(chunks))
+                    outstanding[page] = len(chunks)
+                    for index, chunk in enumerate(chunks):
+                        pool.apply_async(_parallel_map_chunk,
+                                         (func, self._collection._resource_name, chunk),
+                                         callback=functools.partial(_put_result, results, (page, index)),
+                                         error_callback=functools.partial(_put_error, results, (page, index)))
+                    in_flight += 1
+                if not outstanding:
+                    break
+                key, values, exception = results.get()
+                if exception is not None:
+                    raise exception
+                outstanding[key[0]] -= 1
+                if not outstanding[key[0]]:
+                    del outstanding[key[0]]
+                if not ordered:
+                    for value in values:
+                        yield value
+                    continue
+                finished[key] = values
+                while (next_page, next_chunk) in finished:
+                    for value in finished.pop((next_page, next_chunk)):
+                        yield value
+                    next_chunk += 1
+                    if next_chunk == chunk_counts[next_page]:
+                        next_page, next_chunk = next_page + 1, 0
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def delete(self, max_workers=8, chunk_size=100):
+        """!
+        @brief Delete all resources matching the search query.
+
+        The resource URIs of all matches are collected first. Pages hold
+        DELETE_PAGE_SIZE results unless a limit is set, and all pages after
+        the first one are requested concurrently. The resources are then
+        deleted in chunks through PATCH requests to the list endpoint, or with
+        concurrent DELETE requests if the server does not allow that.
+        Failures are collected instead of aborting the purge.
+
+        @param max_workers Maximum number of concurrent requests.
+        @param chunk_size Maximum number of resources per bulk delete request.
+        @returns A DeleteReport object.
+        """
+        start = time.time()
+        filters = self._delete_filters()
+        results = self._api._get_response_data(self._get(filters))
+
+        def get_page(offset):
+            return self._api._get_response_data(self._get(dict(filters, offset=offset)))
+
+        offsets = self._remaining_page_offsets(filters, results)
+        pages = [results] + self._api._map_concurrently(get_page, offsets, max_workers)
+        uris = self._resource_uris(pages)
+        report = self._collection._delete_uris(uris, max_workers=max_workers, chunk_size=chunk_size)
+        report.elapsed = time.time() - start
+        logging.info('%s: %s' % (self, report))
+        return report
+
+    def _delete_filters(self):
+        """!
+        @brief Return the filters used to collect the resources to delete,
+        requesting DELETE_PAGE_SIZE results per page unless a limit is set.
+        """
+        filters = copy.copy(self._filters)
+        filters.setdefault('limit', DELETE_PAGE_SIZE)
+        filters.setdefault('offset', 0)
+        return filters
+
+    @staticmethod
+    def _remaining_page_offsets(filters, results):
+        """!
+        @brief Return the offsets of all pages after the first page of search
+        results, using the number of results the server returned in it.
+        """
+        step = len(results['objects'])
+        if not step:
+            return []
+        return list(range(filters['offset'] + step, results['meta']['total_count'], step))
+
+    @staticmethod
+    def _resource_uris(pages):
+        """!
+        @brief Return the resource URIs of the objects in a list of pages of
+        search results, leaving out duplicates found in several pages.
+        """
+        uris = collections.OrderedDict()
+        for results in pages:
+            for item in results['objects']:
+                uris[item['resource_uri']] = True
+        return list(uris.keys())
+
     def __getitem__(self, index):
         """
         Return the Resource of Nth index in the search results, running a
@@ -348,7 +1277,10 @@ class QuerySet(object):
         if relative_index is None:
             raise IndexError('Out of range: %d' % index)
         item = self._results['objects'][relative_index]
-        return Resource(self._api, self._collection, item['id'], item)
+        resource = self._api._resource_class(self._api, self._collection, item['id'], item)
+        if self._api._lazy_load_detector is not None:
+            resource._set_lazy_origin(self._lazy_loads, (self._collection._resource_name,))
+        return resource
 
     def __repr__(self):
         """
@@ -357,6 +1289,91 @@ class QuerySet(object):
         return '<QuerySet on %s>' % self._collection._url
 
 
+def _compile_validator(description):
+    """!
+    @brief Return a function that validates a value against a schema field
+    description, returning an error message, or None if the value is valid.
+    """
+    type_ = description['type']
+    nullable = description.get('nullable', True)
+    max_length = description.get('max_length')
+    choices = description.get('choices')
+    if choices:
+        # Django choices are lists of (value, label) pairs
+        choices = set(x[0] if isinstance(x, (list, tuple)) else x for x in choices)
+    if type_ == 'related':
+        if description.get('related_type') == 'to_one':
+            types = (Resource, EvaluatedResource)
+        else:
+            types = (list, tuple)
+    else:
+        types = FIELD_TYPES.get(type_)
+    conversion = FIELD_CONVERSIONS.get(type_)
+
+    def validate(value):
+        if value is None:
+            if not nullable:
+                return 'may not be null'
+            return None
+        if types is not None:
+            valid = isinstance(value, types) and (bool in types or not isinstance(value, bool))
+            if not valid and conversion is not None:
+                valid = _converts(conversion, value)
+            if not valid:
+                return 'expected %s, got %s' % (type_, type(value).__name__)
+        if type_ == 'datetime' and value.tzinfo is None:
+            return 'naive datetime objects are not supported'
+        if max_length is not None and isinstance(value, str) and len(value) > max_length:
+            return 'length %d exceeds maximum length %d' % (len(value), max_length)
+        if choices and value not in choices:
+            return 'value %r is not a valid choice' % (value,)
+        return None
+
+    return validate
+
+
+def _converts(conversion, value):
+    """!
+    @brief Returns True if the server converts `value` into a number using
+    `conversion` without error or loss of precision.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float, decimal.Decimal, str)):
+        return False
+    try:
+        converted = conversion(value)
+    except (ValueError, OverflowError):
+        return False
+    if isinstance(value, str):
+        return True
+    return converted == value
+
+
+def _is_required(description):
+    """!
+    @brief Returns True if a schema field must be given a value when a
+    resource is created, i.e. it is writable, not nullable, may not be blank,
+    and has no default value.
+    """
+    if description.get('readonly') or description.get('nullable', True) or description.get('blank', True):
+        return False
+    return description.get('default', NO_DEFAULT) == NO_DEFAULT
+
+
+def _put_result(results, key, values):
+    """!
+    @brief Callback for QuerySet.parallel_map(), queueing the results of a chunk.
+    """
+    results.put((key, values, None))
+
+
+def _put_error(results, key, exception):
+    """!
+    @brief Error callback for QuerySet.parallel_map(), queueing the exception
+    raised while processing a chunk.
+    """
+    results.put((key, None, exception))
+
+
 class ResourceCollection(object):
     """
     The ResourceCollection class is used to retrieve resources from the REST
@@ -371,13 +1388,16 @@ class ResourceCollection(object):
         self._url = productstatus.utils.build_url(self._api._url, self._resource_name)
         self._schema_url = productstatus.utils.build_url(self._url, 'schema')
         self._schema = {}
+        self._validators = {}
+        self._required_fields = None
+        self._lock = threading.RLock()
 
     def create(self):
         """
         Create a new, temporary Resource object that might be saved, and thus
         stored on the server.
         """
-        return Resource(self._api, self, None)
+        return self._api._resource_class(self._api, self, None)
 
     def find_or_create_ephemeral(self, data, order_by=None, extra_params={}):
         """
@@ -421,12 +1441,426 @@ class ResourceCollection(object):
             logging.info('%s: resource created' % resource)
         return resource
 
+    def _find_or_create_key(self, data):
+        """!
+        @brief Return a hashable key identifying a search for `data`.
+        """
+        items = []
+        for key, value in data.items():
+            value = QuerySet._serialize_filter_value(key, value)
+            if isinstance(value, list):
+                value = tuple(value)
+            items.append((key, value))
+        return tuple(sorted(items))
+
+    def find_or_create_many(self, list_of_data, order_by=None, extra_params={}, memo=False, max_workers=8):
+        """!
+        @brief Find or create resources for each set of parameters in
+        `list_of_data`, like calling find_or_create() for each of them.
+
+        Identical parameter sets are searched for only once, searches run
+        concurrently, and all missing resources are created with a single
+        bulk save. Parameter sets with a single string or integer field that
+        the server allows `__in` filters on are searched for in batches of up
+        to FIND_OR_CREATE_BATCH_SIZE values.
+
+        @param list_of_data List of dictionaries with data to search for, or to set if nothing is found.
+        @param order_by ordering
+        @param extra_params Extra parameters to insert into new objects, without searching for them
+        @param memo If True, remember the results in a process-wide cache,
+        so that future calls with the same parameters make no requests. The
+        cache holds up to FIND_OR_CREATE_MEMO_SIZE results.
+        @param max_workers Maximum number of concurrent requests.
+        @returns A list of Resource objects, in the same order as `list_of_data`.
+        """
+        keys, unique, found = self._find_or_create_lookup(list_of_data, order_by, extra_params, memo)
+
+        def search(batch):
+            if len(batch) == 1:
+                qs = self._find_or_create_queryset(unique[batch[0]], order_by)
+                if qs.count() == 0:
+                    return {}
+                return {batch[0]: qs[0]}
+            matches = {}
+            for objects in self._find_or_create_batch_queryset(batch, order_by)._iterate_pages():
+                self._find_or_create_match(batch, objects, matches)
+            return matches
+
+        batches = self._find_or_create_batches([x for x in unique.keys() if x not in found])
+        for matches in self._api._map_concurrently(search, batches, max_workers):
+            for key, resource in matches.items():
+                logging.info('%s: using existing resource' % resource)
+                found[key] = resource
+
+        missing = [x for x in unique.keys() if x not in found]
+        if missing:
+            created = self._find_or_create_new(missing, unique, extra_params)
+            self.bulk_save(created, max_workers=max_workers)
+            found.update(zip(missing, created))
+
+        if memo:
+            self._find_or_create_remember(found, order_by, extra_params)
+        return [found[key] for key in keys]
+
+    def _find_or_create_lookup(self, list_of_data, order_by, extra_params, memo):
+        """!
+        @brief Return the search key of each set of parameters given to
+        find_or_create_many(), an ordered dictionary of parameters by unique
+        key, and a dictionary of resources found in the process-wide cache
+        by key.
+        """
+        keys = [self._find_or_create_key(data) for data in list_of_data]
+        unique = collections.OrderedDict()
+        for key, data in zip(keys, list_of_data):
+            unique.setdefault(key, data)
+        found = {}
+        if memo:
+            for key in unique.keys():
+                uri = _find_or_create_memo_get(self._memo_key(key, order_by, extra_params))
+                self._api._metrics.record_cache('find_or_create', uri is not None)
+                if uri is not None:
+                    found[key] = self._api[uri]
+        return keys, unique, found
+
+    def _find_or_create_queryset(self, data, order_by):
+        """!
+        @brief Return a QuerySet searching for resources matching `data`.
+        """
+        qs = self.objects
+        qs.filter(**data)
+        if order_by:
+            qs.order_by(order_by)
+        return qs
+
+    def _find_or_create_batch_field(self, key):
+        """!
+        @brief Return the name of the field searched for by a search key, if
+        it can be searched for together with other values of the same field
+        using an `__in` filter, or None otherwise.
+        """
+        if len(key) != 1:
+            return None
+        name, value = key[0]
+        field = self.schema['fields'].get(name)
+        filtering = self.schema.get('filtering', {}).get(name)
+        if field is None or not (filtering in (1, 2) or (isinstance(filtering, list) and 'in' in filtering)):
+            return None
+        if field['type'] == 'string' and isinstance(value, str) and value and ',' not in value:
+            return name
+        if field['type'] == 'integer' and isinstance(value, int) and not isinstance(value, bool):
+            return name
+        return None
+
+    def _find_or_create_batches(self, keys):
+        """!
+        @brief Split search keys into lists of keys searched for with a
+        single request. Keys for the same field that can be searched for
+        with an `__in` filter are put together, and other keys are alone.
+        """
+        batches = []
+        groups = collections.OrderedDict()
+        for key in keys:
+            name = self._find_or_create_batch_field(key)
+            if name is None:
+                batches.append([key])
+            else:
+                groups.setdefault(name, []).append(key)
+        for group in groups.values():
+            batches += [group[x:x + FIND_OR_CREATE_BATCH_SIZE] for x in range(0, len(group), FIND_OR_CREATE_BATCH_SIZE)]
+        return batches
+
+    def _find_or_create_batch_queryset(self, batch, order_by):
+        """!
+        @brief Return a QuerySet searching for resources matching any of the
+        search keys in a batch, using an `__in` filter.
+        """
+        name = batch[0][0][0]
+        qs = self.objects
+        qs.filter(**{name + '__in': ','.join(str(key[0][1]) for key in batch)})
+        if order_by:
+            qs.order_by(order_by)
+        return qs.limit(FIND_OR_CREATE_BATCH_SIZE)
+
+    def _find_or_create_match(self, batch, objects, matches):
+        """!
+        @brief Add resources from a page of results of a batched search to
+        the dictionary `matches`, keyed by search key. The first match for
+        each key is used, as with single searches.
+        """
+        name = batch[0][0][0]
+        keys = set(batch)
+        for item in objects:
+            key = ((name, item.get(name)),)
+            if key in keys and key not in matches:
+                matches[key] = self._api._resource_class(self._api, self, item['id'], item)
+
+    def _find_or_create_new(self, missing, unique, extra_params):
+        """!
+        @brief Return a list of new, unsaved resources for the keys in `missing`.
+        """
+        logging.info('No matching %s resources found for %d keys, creating...' % (self._resource_name, len(missing)))
+        created = []
+        for key in missing:
+            resource = self.create()
+            [setattr(resource, name, value) for name, value in unique[key].items()]
+            [setattr(resource, name, value) for name, value in extra_params.items()]
+            created.append(resource)
+        return created
+
+    def _find_or_create_remember(self, found, order_by, extra_params):
+        """!
+        @brief Store the URIs of resources found or created by
+        find_or_create_many() in the process-wide cache.
+        """
+        _find_or_create_memo_update(
+            (self._memo_key(key, order_by, extra_params), resource._uri()) for key, resource in found.items()
+        )
+
+    def _memo_key(self, key, order_by, extra_params):
+        """!
+        @brief Return the key used for the process-wide find_or_create_many()
+        cache, which includes the parameters that determine which resource is
+        chosen or created.
+        """
+        return (self._api._base_url, self._resource_name, key, _freeze(order_by), _freeze(extra_params))
+
+    def bulk_save(self, resources, chunk_size=100, max_workers=8):
+        """!
+        @brief Save a list of new or changed resources of this type using as
+        few requests as possible.
+
+        Resources are sent in chunks through a single PATCH request to the list
+        endpoint each, using the Tastypie `objects` payload. New resources are
+        given a client-generated UUID, so that their URIs are known even if the
+        server does not return the created objects. If the server does not
+        support PATCH on the list endpoint, or IDs cannot be set by the client,
+        the resources are saved using concurrent requests instead.
+
+        All resources are validated before anything is sent.
+
+        @param resources List of Resource objects belonging to this collection.
+        @param chunk_size Maximum number of resources per PATCH request.
+        @param max_workers Maximum number of concurrent requests when falling back to single saves.
+        @returns The list of resources.
+        """
+        resources = list(resources)
+        pending = self._bulk_save_pending(resources)
+
+        resolve_evaluated_resources(pending, max_workers=max_workers)
+
+        if self._supports_bulk_patch():
+            bulk = self._bulk_patch_resources(pending)
+            try:
+                for offset in range(0, len(bulk), chunk_size):
+                    self._bulk_patch(bulk[offset:offset + chunk_size])
+            except productstatus.exceptions.MethodNotAllowedException:
+                logging.info('%s: bulk PATCH not allowed, falling back to single saves' % self)
+            # Resources saved in bulk have no remaining changes
+            pending = [x for x in pending if x._needs_save()]
+
+        self._api._map_concurrently(lambda x: x.save(), pending, max_workers)
+        return resources
+
+    def _bulk_save_pending(self, resources):
+        """!
+        @brief Return the resources given to bulk_save() that need to be
+        saved, after checking that they belong to this collection and pass
+        validation.
+        """
+        for resource in resources:
+            if resource._collection is not self:
+                raise productstatus.exceptions.ProductstatusException(
+                    '%s does not belong to the %s collection' % (resource, self._resource_name)
+                )
+        pending = []
+        errors = []
+        for index, resource in enumerate(resources):
+            if not resource._needs_save():
+                continue
+            pending.append(resource)
+            errors += ['[%d] %s' % (index, x) for x in resource._validation_errors(resource._changed_fields())]
+        if errors:
+            raise productstatus.exceptions.ValidationException(
+                '%s resources failed validation: %s' % (self._resource_name, '; '.join(errors))
+            )
+        return pending
+
+    def _bulk_patch_resources(self, pending):
+        """!
+        @brief Give new resources a client-generated ID if the schema allows
+        it, and return the resources that can be saved with bulk PATCH
+        requests.
+        """
+        id_field = self.schema['fields'].get('id')
+        if id_field is not None and not id_field.get('readonly'):
+            for resource in pending:
+                if not resource._has_url() and resource._data.get('id') is None:
+                    resource._data['id'] = str(uuid.uuid4())
+        return [x for x in pending if x._has_url() or x._data.get('id') is not None]
+
+    def purge_expired(self, field='expires', now=None, page_size=DELETE_PAGE_SIZE, **kwargs):
+        """!
+        @brief Delete all resources whose expiry time has passed, e.g.
+        `api.datainstance.purge_expired()`.
+
+        @param field Name of the expiry timestamp field.
+        @param now Resources expiring before this time are deleted. Defaults to the current time.
+        @param page_size Number of results to request per page while
+            collecting resources. The server may return fewer.
+        @param kwargs Passed on to QuerySet.delete().
+        @returns A DeleteReport object.
+        """
+        return self._expired_queryset(field, now, page_size).delete(**kwargs)
+
+    def _expired_queryset(self, field, now, page_size):
+        """!
+        @brief Return a QuerySet of resources whose expiry time has passed.
+        @see purge_expired().
+        """
+        qs = self.objects.filter(**{field + '__lt': now or productstatus.utils.get_utc_now()})
+        if page_size:
+            qs.limit(page_size)
+        return qs
+
+    def _delete_uris(self, uris, max_workers=8, chunk_size=100):
+        """!
+        @brief Delete a list of resources given by their URIs, returning a DeleteReport.
+        """
+        report = DeleteReport()
+        remaining = list(uris)
+        while remaining and self._supports_bulk_patch():
+            chunk = remaining[:chunk_size]
+            serialized = productstatus.codec.dumps({'objects': [], 'deleted_objects': chunk})
+            try:
+                self._api._do_request('patch', self._url, data=serialized)
+                report.deleted += len(chunk)
+            except productstatus.exceptions.MethodNotAllowedException:
+                logging.info('%s: bulk delete not allowed, falling back to single deletes' % self)
+                break
+            except productstatus.exceptions.ProductstatusException as e:
+                report.failed += [(uri, e) for uri in chunk]
+            remaining = remaining[chunk_size:]
+
+        def delete(uri):
+            try:
+                self._api._do_request('delete', productstatus.utils.build_url(self._api._base_url, uri))
+            except productstatus.exceptions.ProductstatusException as e:
+                return e
+            return None
+
+        for uri, exception in zip(remaining, self._api._map_concurrently(delete, remaining, max_workers)):
+            if exception is None:
+                report.deleted += 1
+            else:
+                report.failed.append((uri, exception))
+        self._forget_deleted(uris, report)
+        return report
+
+    def _forget_deleted(self, uris, report):
+        """!
+        @brief Remove resources that were deleted from the process-wide
+        find_or_create_many() cache.
+        """
+        failed = set(uri for uri, exception in report.failed)
+        _find_or_create_memo_forget(self._api._base_url, [x for x in uris if x not in failed])
+
+    def _supports_bulk_patch(self):
+        """!
+        @brief Returns True unless the schema says that PATCH requests are not
+        allowed on the list endpoint.
+        """
+        return 'patch' in self.schema.get('allowed_list_http_methods', ['patch'])
+
+    def _bulk_patch(self, resources):
+        """!
+        @brief Create or update a list of resources with a single PATCH request
+        to the list endpoint.
+        """
+        response = self._api._do_request('patch', self._url, data=self._serialize_bulk(resources))
+        self._finish_bulk_patch(resources, response)
+
+    def _serialize_bulk(self, resources):
+        """!
+        @brief Return the body of a bulk PATCH request that saves a list of resources.
+        """
+        objects = []
+        for resource in resources:
+            data = dict((name, resource._serialize_member(name)) for name in resource._changed_fields())
+            if resource._has_url():
+                data['resource_uri'] = resource._uri()
+            objects.append(data)
+        return productstatus.codec.dumps({'objects': objects}, sort_keys=True)
+
+    def _finish_bulk_patch(self, resources, response):
+        """!
+        @brief Update a list of resources from the response to a bulk PATCH request.
+        """
+        data = self._api._get_response_data(response)
+        returned = data.get('objects') if data else None
+        if returned is not None and len(returned) != len(resources):
+            returned = None
+        for index, resource in enumerate(resources):
+            if not resource._has_url():
+                resource._url = productstatus.utils.build_url(self._url, resource._data['id'])
+                resource._complete = False
+            resource._dirty = set()
+            resource._snapshots = {}
+            if returned is not None:
+                resource._data = returned[index]
+                resource._unserialize()
+                resource._complete = True
+
     def _get_schema_from_server(self):
         """
         Retrieve from the server the data model schema for this resource type.
         """
         response = self._api._do_request('get', self._schema_url)
-        self._schema = self._api._get_response_data(response)
+        schema = self._api._get_response_data(response)
+        with self._lock:
+            self._validators = {}
+            self._required_fields = None
+            self._schema = schema
+
+    def _get_validators(self):
+        """!
+        @brief Return a dictionary of validation functions for all writable
+        fields, compiled from the schema the first time it is needed.
+        """
+        if not self._validators:
+            with self._lock:
+                if not self._validators:
+                    fields = self.schema['fields']
+                    self._validators = dict(
+                        (name, _compile_validator(description))
+                        for name, description in fields.items()
+                        if not description.get('readonly')
+                    )
+        return self._validators
+
+    def _get_required_fields(self):
+        """!
+        @brief Return the names of fields that must be given a value when
+        creating a resource, in the order they appear in the schema.
+        """
+        required = self._required_fields
+        if required is None:
+            required = [name for name, description in self.schema['fields'].items() if _is_required(description)]
+            self._required_fields = required
+        return required
+
+    def validate(self, resources):
+        """!
+        @brief Validate a list of resources against the schema without
+        contacting the server, raising a ValidationException listing all
+        errors in all resources.
+        """
+        errors = []
+        for index, resource in enumerate(resources):
+            errors += ['[%d] %s' % (index, x) for x in resource._validation_errors()]
+        if errors:
+            raise productstatus.exceptions.ValidationException(
+                '%s resources failed validation: %s' % (self._resource_name, '; '.join(errors))
+            )
 
     def __getitem__(self, id):
         """
@@ -436,7 +1870,7 @@ class ResourceCollection(object):
         """
         try:
             uuid_ = uuid.UUID(id)
-            return Resource(self._api, self, id)
+            return self._api._resource_class(self._api, self, id)
         except ValueError:
             qs = self.objects.filter(slug=id)
             if qs.count() == 0:
@@ -461,13 +1895,22 @@ class ResourceCollection(object):
         """
         if name == 'schema':
             if not self._schema:
-                self._get_schema_from_server()
+                with self._lock:
+                    if not self._schema:
+                        self._get_schema_from_server()
             return self._schema
         elif name == 'objects':
-            return QuerySet(self._api, self)
+            return self._api._queryset_class(self._api, self)
 
         raise AttributeError('Attribute does not exist: %s' % name)
 
+    def __reduce__(self):
+        """!
+        @brief Pickle this collection as a reference to its Api object, so
+        that unpickled resources share the collection restored with the Api.
+        """
+        return (getattr, (self._api, self._resource_name))
+
     def __repr__(self):
         """
         Return a human-readable string representing this resource collection object.
@@ -484,6 +1927,10 @@ class Resource(object):
     and foreign keys point to other Resource objects.
     """
 
+    # Lazy load counts and relation path of resources found through a
+    # QuerySet, when a lazy load detector is used.
+    _lazy_origin = None
+
     def __init__(self, api, collection, id, data={}):
         self._api = api
         self._collection = collection
@@ -493,19 +1940,173 @@ class Resource(object):
         else:
             self._url = None
         self._data = copy.copy(data)
+        self._complete = bool(self._data)
+        self._dirty = set()
+        # Copies of list and dict values as they were when first read, to
+        # detect changes made to them in place.
+        self._snapshots = {}
         self._unserialize()
 
     def save(self):
         """
-        Store the locally cached values on the server.
+        Store the locally cached values on the server. The values are
+        validated against the schema before sending.
+
+        New resources are created with a POST request. Existing resources are
+        updated with a PATCH request containing only the fields that were
+        changed locally, without fetching the resource first. If the server
+        returns the stored resource, the local cache is refreshed from the
+        response, otherwise the local values are kept.
+        """
+        request = self._prepare_save()
+        if request is None:
+            return
+        method, url, serialized = request
+        response = self._api._do_request(method, url, data=serialized)
+        self._finish_save(response)
+
+    def _prepare_save(self):
+        """!
+        @brief Validate and serialize this resource for saving. Returns a
+        (method, url, serialized data) tuple, or None if there is nothing to save.
         """
-        serialized = self._serialize()
         if self._has_url():
-            response = self._api._do_request('put', self._url, data=serialized)
-        else:
-            response = self._api._do_request('post', self._collection._url, data=serialized)
-            self._url = productstatus.utils.build_url(self._api._base_url, response.headers['Location'])
-        self._data = {}  # invalidate local cache
+            dirty = self._dirty_fields()
+            if not dirty:
+                return None
+            self._raise_validation_errors(self._validation_errors(dirty))
+            return ('patch', self._url, self._serialize_fields(dirty))
+        self.validate()
+        return ('post', self._collection._url, self._serialize())
+
+    def _finish_save(self, response):
+        """!
+        @brief Update the local state of this resource after it has been saved.
+        """
+        if not self._has_url():
+            self._url = productstatus.utils.resolve_location(self._api._base_url, response.headers['Location'])
+            # Fields populated by the server are not known until fetched
+            self._complete = False
+        self._dirty = set()
+        self._snapshots = {}
+        self._refresh_from_response(response)
+
+    def delete(self):
+        """!
+        @brief Delete this resource from the server. The local object is
+        turned into a non-persistent resource.
+        """
+        if not self._has_url():
+            raise productstatus.exceptions.ProductstatusException('Trying to delete an object without a primary key')
+        try:
+            self._api._do_request('delete', self._url)
+        except productstatus.exceptions.NotFoundException as e:
+            _find_or_create_memo_forget(self._api._base_url, [self._uri()])
+            raise productstatus.exceptions.ResourceNotFoundException(e)
+        _find_or_create_memo_forget(self._api._base_url, [self._uri()])
+        self._url = None
+        self._id = None
+
+    def _changed_fields(self):
+        """!
+        @brief Return the names of fields that must be sent to the server to
+        save this resource: all fields for new resources, and changed fields
+        for existing resources.
+        """
+        if self._has_url():
+            return self._dirty_fields()
+        return self._data.keys()
+
+    def _dirty_fields(self):
+        """!
+        @brief Return the names of fields changed locally: fields that were
+        set, and list or dict values that were changed in place after being
+        read.
+        """
+        changed = [name for name, value in self._snapshots.items() if self._data.get(name) != value]
+        if not changed:
+            return self._dirty
+        return self._dirty | set(changed)
+
+    def _needs_save(self):
+        """!
+        @brief Returns True if this resource is not stored on the server yet,
+        or has unsaved changes.
+        """
+        return not self._has_url() or bool(self._dirty_fields())
+
+    def _refresh_from_response(self, response):
+        """!
+        @brief Replace the local cache with resource data returned by the
+        server, if the response contains any.
+        """
+        data = self._api._get_response_data(response)
+        if not data:
+            return
+        self._data = data
+        self._snapshots = {}
+        self._unserialize()
+        self._complete = True
+
+    def _validation_errors(self, names=None):
+        """!
+        @brief Return a list of error messages for locally cached values that
+        do not pass schema validation. Resources that are not stored on the
+        server yet are also checked for missing required fields.
+
+        Validation follows the conversions made by Tastypie for numeric
+        fields, but is stricter for other types: e.g. booleans must be bool
+        objects, and timestamps must be timezone-aware datetime objects.
+
+        @param names Names of fields to validate, or None to validate all fields.
+        """
+        validators = self._collection._get_validators()
+        errors = []
+        if not self._has_url():
+            errors += ['%s: required field is missing' % name
+                       for name in self._collection._get_required_fields() if name not in self._data]
+        if names is None:
+            names = self._data.keys()
+        for name in names:
+            value = self._data[name]
+            validator = validators.get(name)
+            if validator is None:
+                continue
+            error = validator(value)
+            if error is not None:
+                errors.append('%s: %s' % (name, error))
+        return errors
+
+    def validate(self):
+        """!
+        @brief Validate the locally cached values against the resource schema,
+        without contacting the server. Raises ValidationException if any value
+        is invalid.
+        """
+        self._raise_validation_errors(self._validation_errors())
+
+    def _raise_validation_errors(self, errors):
+        """!
+        @brief Raise ValidationException if the list of errors is not empty.
+        """
+        if errors:
+            raise productstatus.exceptions.ValidationException(
+                '%s failed validation: %s' % (self, '; '.join(errors))
+            )
+
+    def _primary_key(self):
+        """!
+        @brief Return the ID of this resource, deriving it from the URL if it
+        is not cached, so that no request is made. Returns None for resources
+        that are not stored on the server.
+        """
+        if self._data.get('id'):
+            return self._data['id']
+        if self._id:
+            return self._id
+        if self._has_url():
+            return self._url.rstrip('/').split('/')[-1]
+        return None
 
     def _has_url(self):
         """
@@ -529,19 +2130,49 @@ class Resource(object):
         """
         if not self._has_url():
             raise productstatus.exceptions.ProductstatusException('Trying to get an object without a primary key')
+        if self._lazy_origin is not None and self._api._lazy_load_detector is not None:
+            self._api._lazy_load_detector.record(*self._lazy_origin)
         try:
             response = self._api._do_request('get', self._url)
-            self._data = self._api._get_response_data(response)
+            data = self._api._get_response_data(response)
         except productstatus.exceptions.NotFoundException as e:
+            _find_or_create_memo_forget(self._api._base_url, [self._uri()])
             raise productstatus.exceptions.ResourceNotFoundException(e)
+        self._load_data(data)
+
+    def _load_data(self, data):
+        """!
+        @brief Replace the local cache with resource data from the server.
+        """
+        # Keep local changes that have not been saved yet
+        self._dirty = set(self._dirty_fields())
+        self._snapshots = {}
+        dirty = dict((name, self._data[name]) for name in self._dirty)
+        self._data = data
         self._unserialize()
+        self._data.update(dirty)
+        self._complete = True
+        if self._lazy_origin is not None:
+            self._set_lazy_origin(*self._lazy_origin)
+
+    def _set_lazy_origin(self, counts, path):
+        """!
+        @brief Track lazy loads of this resource, and of the related
+        resources reached from it, for the lazy load detector.
+        @param counts Lazy load counts of the QuerySet this resource was found through.
+        @param path Relation path from the QuerySet to this resource.
+        """
+        self._lazy_origin = (counts, path)
+        for name, value in self._data.items():
+            if isinstance(value, Resource) and value is not self:
+                value._set_lazy_origin(counts, path + (name,))
 
     def _ensure_complete_object(self):
         """
         Fetch the resource from the API server if we have an URL and it is not
         already cached.
         """
-        if self._has_url() and not self._data:
+        if self._has_url() and not self._complete:
             self._get_resource_from_server()
 
     def _evaluate_resource_member(self, key):
@@ -565,7 +2196,15 @@ class Resource(object):
         """
         Return a JSON serialized representation of this resource.
         """
-        return json.dumps(self._dict(), sort_keys=True)
+        return productstatus.codec.dumps(self._dict(), sort_keys=True)
+
+    def _serialize_fields(self, names):
+        """!
+        @brief Return a JSON serialized representation of a subset of the
+        locally cached fields.
+        """
+        data = dict((name, self._serialize_member(name)) for name in names)
+        return productstatus.codec.dumps(data, sort_keys=True)
 
     def _serialize_member(self, name):
         """
@@ -589,6 +2228,11 @@ class Resource(object):
         """
         Replace all string members with their proper types.
         """
+        if self._api._profiler is not None:
+            with self._api._profiler.phase('convert', self._collection._resource_name):
+                for member in self._data.keys():
+                    self._unserialize_member(member)
+            return
         for member in self._data.keys():
             self._unserialize_member(member)
 
@@ -604,7 +2248,7 @@ class Resource(object):
         if type_ == 'integer':
             self._data[name] = int(self._data[name])
         elif type_ == 'datetime':
-            self._data[name] = dateutil.parser.parse(self._data[name])
+            self._data[name] = productstatus.utils.parse_datetime(self._data[name])
         elif type_ == 'related' and description['related_type'] == 'to_one':
             self._data[name] = self._api[self._data[name]]
 
@@ -613,20 +2257,29 @@ class Resource(object):
         Attribute accessor. Will load data from the server unless it is cached.
         Enables lazy loading of the resource.
         """
+        # ignore Python internals and private members that are not set yet,
+        # e.g. while unpickling
+        if name[:1] == '_':
+            raise AttributeError('Attribute does not exist: %s' % name)
         fields = self._collection.schema['fields']
         if name not in fields:
             raise AttributeError('Attribute does not exist: %s' % name)
-        # This value usually comes from the server, but to cut down on requests
-        # and make the API client a lot faster when iterating on huge data
-        # sets, we generate it here instead.
-        if name == 'resource_uri' and name not in self._data:
-            return self._uri()
-        self._ensure_complete_object()
         if name not in self._data:
-            return None
+            # This value usually comes from the server, but to cut down on requests
+            # and make the API client a lot faster when iterating on huge data
+            # sets, we generate it here instead.
+            if name == 'resource_uri':
+                return self._uri()
+            self._ensure_complete_object()
+            if name not in self._data:
+                return None
         # Run lazy evaluation
         self._evaluate_resource_member(name)
-        return self._data[name]
+        value = self._data[name]
+        if isinstance(value, (list, dict)) and name not in self._dirty and name not in self._snapshots:
+            if not fields[name]['readonly']:
+                self._snapshots[name] = copy.deepcopy(value)
+        return value
 
     def __setattr__(self, name, value):
         """
@@ -642,8 +2295,10 @@ class Resource(object):
         if fields[name]['readonly']:
             raise AttributeError('Attribute is read only: %s' % name)
         # FIXME: more tests?
-        self._ensure_complete_object()
         self._data[name] = value
+        self._dirty.add(name)
+        if self._api._sessions:
+            self._api._sessions[-1].add(self)
 
     def __repr__(self):
         """
@@ -681,17 +2336,74 @@ class EvaluatedResource(object):
                 raise RuntimeError('Lazy evaluated function "%s" did not return a Resource object.' % self.function.__name__)
         return self._resource
 
+    def _key(self):
+        """!
+        @brief Return a hashable key that is equal for EvaluatedResource
+        objects that call the same function with the same arguments.
+        """
+        return (self.function, _freeze(self.args), _freeze(self.kwargs))
+
+
+def _freeze(value):
+    """!
+    @brief Return a hashable representation of a function argument. Resources
+    are represented by their URL, and unhashable objects by their identity.
+    """
+    if isinstance(value, Resource):
+        if value._has_url():
+            return ('resource', value._url)
+        return ('object', id(value))
+    if isinstance(value, dict):
+        return ('dict', tuple(sorted((repr(k), _freeze(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_freeze(x) for x in value))
+    try:
+        hash(value)
+    except TypeError:
+        return ('object', id(value))
+    return value
+
+
+def resolve_evaluated_resources(resources, max_workers=8):
+    """!
+    @brief Run the lazy evaluation of all pending EvaluatedResource values of
+    one or many Resource objects concurrently.
+
+    EvaluatedResource objects calling the same function with the same
+    arguments are evaluated only once, and share the resulting Resource.
 
-class TastypieApiKeyAuth(requests.auth.AuthBase):
+    @param resources A Resource object, or a list of Resource objects.
+    @param max_workers Maximum number of concurrent evaluations.
     """
-    Django Tastypie requires a special Authorization header format, which is
-    implemented by this class.
+    if isinstance(resources, Resource):
+        resources = [resources]
+    groups = _pending_evaluations(resources)
+    if not groups:
+        return
+    results = resources[0]._api._map_concurrently(lambda x: x[0].resource, groups, max_workers)
+    for group, result in zip(groups, results):
+        for evaluated in group:
+            evaluated._resource = result
+
+
+def _pending_evaluations(resources):
+    """!
+    @brief Return the EvaluatedResource values of a list of Resource objects
+    that have not been evaluated yet, as a list of groups of values calling
+    the same function with the same arguments.
     """
+    pending = collections.OrderedDict()
+    for resource in resources:
+        for value in resource._data.values():
+            if isinstance(value, EvaluatedResource) and value._resource is None:
+                pending.setdefault(value._key(), []).append(value)
+    return list(pending.values())
+
+
+Api._collection_class = ResourceCollection
+Api._queryset_class = QuerySet
+Api._resource_class = Resource
 
-    def __init__(self, username, api_key):
-        self.username = username
-        self.api_key = api_key
 
-    def __call__(self, request):
-        request.headers.update({'Authorization': 'ApiKey %s:%s' % (self.username, self.api_key)})
-        return request
+# Moved to productstatus.transport, and kept here for backwards compatibility.
+TastypieApiKeyAuth = productstatus.transport.TastypieApiKeyAuth
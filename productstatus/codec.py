@@ -0,0 +1,117 @@
+"""!
+JSON codec used by the Productstatus client library.
+
+The fastest available JSON library is picked up at import time: `orjson` and
+`ujson` are used if they are installed, and the standard library `json` module
+is used otherwise. Decoding works directly on bytes, avoiding an intermediate
+string copy.
+
+Encoded output is always byte-for-byte identical to `json.dumps`, because
+resources are compared and printed in that format. `orjson` always produces
+compact output, and is therefore only used for decoding.
+"""
+
+import json
+
+
+def _stdlib_loads(data):
+    return json.loads(data)
+
+
+def _stdlib_dumps(data, sort_keys=False):
+    return json.dumps(data, sort_keys=sort_keys)
+
+
+def _find_decoders():
+    """!
+    @brief Return a dictionary of available decoder functions, keyed by backend name.
+    """
+    decoders = {'json': _stdlib_loads}
+    try:
+        import ujson
+        decoders['ujson'] = ujson.loads
+    except ImportError:
+        pass
+    try:
+        import orjson
+        decoders['orjson'] = orjson.loads
+    except ImportError:
+        pass
+    return decoders
+
+
+def _find_encoders():
+    """!
+    @brief Return a dictionary of available encoder functions, keyed by backend name.
+
+    Only encoders that can reproduce the exact output of `json.dumps` are included.
+    """
+    encoders = {'json': _stdlib_dumps}
+    try:
+        import ujson
+        # The `separators` argument was added in ujson 5.4.0; older versions
+        # cannot produce output identical to the standard library.
+        ujson.dumps({}, separators=(', ', ': '))
+
+        def _ujson_dumps(data, sort_keys=False):
+            return ujson.dumps(data,
+                               sort_keys=sort_keys,
+                               ensure_ascii=True,
+                               escape_forward_slashes=False,
+                               separators=(', ', ': '))
+
+        encoders['ujson'] = _ujson_dumps
+    except (ImportError, TypeError):
+        pass
+    return encoders
+
+
+DECODERS = _find_decoders()
+ENCODERS = _find_encoders()
+
+BACKEND_PREFERENCE = ['orjson', 'ujson', 'json']
+
+decoder_backend = None
+encoder_backend = None
+_loads = None
+_dumps = None
+
+
+def set_backend(name=None):
+    """!
+    @brief Select the JSON backend used for encoding and decoding.
+
+    @param name One of 'orjson', 'ujson' or 'json'. If None, the fastest
+    available backend is used. Backends that cannot encode are used for
+    decoding only.
+    """
+    global decoder_backend, encoder_backend, _loads, _dumps
+    if name is None:
+        preference = BACKEND_PREFERENCE
+    elif name not in DECODERS:
+        raise ValueError("JSON backend '%s' is not available" % name)
+    else:
+        preference = [name, 'json']
+    decoder_backend = [x for x in preference if x in DECODERS][0]
+    encoder_backend = [x for x in preference if x in ENCODERS][0]
+    _loads = DECODERS[decoder_backend]
+    _dumps = ENCODERS[encoder_backend]
+
+
+def loads(data):
+    """!
+    @brief Decode JSON data. Accepts bytes, bytearray or str.
+
+    Raises ValueError if the data cannot be decoded.
+    """
+    return _loads(data)
+
+
+def dumps(data, sort_keys=False):
+    """!
+    @brief Encode a data structure as a JSON string, formatted like `json.dumps`.
+    """
+    return _dumps(data, sort_keys=sort_keys)
+
+
+set_backend()
@@ -0,0 +1,219 @@
+"""!
+The productstatus.columnar module exports QuerySet results into NumPy arrays or
+Apache Arrow tables, without creating a Resource object for each row.
+
+Columns are converted page by page straight from the decoded JSON data.
+Datetime fields are converted into `datetime64[s]` values in UTC, and to-one
+relations are encoded as integer codes into a table of resource URIs.
+
+NumPy is required by this module. Apache Arrow support requires `pyarrow`.
+"""
+
+import collections
+import datetime
+import inspect
+
+import numpy
+
+import productstatus.codec
+import productstatus.exceptions
+import productstatus.utils
+
+
+CategoricalColumn = collections.namedtuple('CategoricalColumn', ['codes', 'categories'])
+CategoricalColumn.__doc__ = """!
+@brief A dictionary-encoded column. `codes` is an integer array indexing into
+`categories`, an array of unique values. Missing values have the code -1.
+"""
+
+UTC_SUFFIXES = ('Z', '+0000', '+00:00')
+
+NUMPY_TYPES = {
+    'integer': numpy.int64,
+    'float': numpy.float64,
+    'boolean': numpy.bool_,
+}
+
+
+def _field_type(description):
+    """!
+    @brief Return a short type name for a schema field description.
+    """
+    type_ = description['type']
+    if type_ == 'related' and description.get('related_type') == 'to_one':
+        return 'to_one'
+    return type_
+
+
+def _strip_utc_suffix(value):
+    """!
+    @brief Return an ISO 8601 string without time zone, suitable for parsing by NumPy.
+    """
+    if value is None:
+        return 'NaT'
+    for suffix in UTC_SUFFIXES:
+        if value.endswith(suffix):
+            return value[:-len(suffix)]
+    # Slow path for timestamps with a non-UTC offset
+    parsed = productstatus.utils.parse_datetime(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat()
+
+
+def datetime64_array(values):
+    """!
+    @brief Convert a list of ISO 8601 strings into a `datetime64[s]` array in UTC.
+    None values are converted into NaT.
+    """
+    return numpy.array([_strip_utc_suffix(x) for x in values], dtype='datetime64[s]')
+
+
+def _numeric_array(values, dtype):
+    """!
+    @brief Convert a list of numbers into an array. Integer and boolean columns
+    containing missing values are converted into float arrays with NaN values.
+    """
+    if None in values:
+        return numpy.array([numpy.nan if x is None else x for x in values], dtype=numpy.float64)
+    return numpy.array(values, dtype=dtype)
+
+
+def _categorical(values):
+    """!
+    @brief Dictionary-encode a list of strings, returning a CategoricalColumn.
+    """
+    index = {}
+    codes = numpy.empty(len(values), dtype=numpy.int32)
+    for i, value in enumerate(values):
+        if value is None:
+            codes[i] = -1
+            continue
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(index)
+        codes[i] = code
+    categories = numpy.array(list(index.keys()), dtype=object)
+    return CategoricalColumn(codes, categories)
+
+
+def _convert_page(values, type_):
+    """!
+    @brief Convert a list of raw JSON values into a NumPy array.
+    """
+    if type_ == 'datetime':
+        return datetime64_array(values)
+    if type_ in NUMPY_TYPES:
+        return _numeric_array(values, NUMPY_TYPES[type_])
+    return numpy.array(values, dtype=object)
+
+
+def _iterate_column_pages(queryset, fields):
+    """!
+    @brief Iterate through a QuerySet, yielding a dictionary of raw value lists for each page.
+    """
+    for objects in queryset._iterate_pages():
+        yield dict((field, [item.get(field) for item in objects]) for field in fields)
+
+
+def _check_synchronous(queryset):
+    """!
+    @brief Raise an exception if a QuerySet belongs to the asyncio client,
+    whose results can only be iterated with `async for`.
+    """
+    if inspect.isasyncgenfunction(queryset._iterate_pages):
+        raise productstatus.exceptions.ProductstatusException(
+            'Columnar export does not support the asyncio client; use "await qs.to_columns(fields)"'
+        )
+
+
+def _field_types(queryset, fields):
+    _check_synchronous(queryset)
+    schema_fields = queryset._collection.schema['fields']
+    for field in fields:
+        if field not in schema_fields:
+            raise KeyError('Attribute does not exist: %s' % field)
+    return dict((field, _field_type(schema_fields[field])) for field in fields)
+
+
+def to_numpy(queryset, fields):
+    """!
+    @brief Export all results of a QuerySet into NumPy arrays.
+
+    @param queryset A productstatus.api.QuerySet object.
+    @param fields List of field names to include.
+    @returns A dictionary mapping each field name to a NumPy array. To-one
+    relations are returned as CategoricalColumn objects with resource URIs as
+    categories.
+    """
+    types = _field_types(queryset, fields)
+    chunks = dict((field, []) for field in fields)
+    for page in _iterate_column_pages(queryset, fields):
+        for field in fields:
+            if types[field] == 'to_one':
+                chunks[field].extend(page[field])
+            else:
+                chunks[field].append(_convert_page(page[field], types[field]))
+
+    columns = {}
+    for field in fields:
+        if types[field] == 'to_one':
+            columns[field] = _categorical(chunks[field])
+        elif chunks[field]:
+            columns[field] = numpy.concatenate(chunks[field])
+        else:
+            columns[field] = _convert_page([], types[field])
+    return columns
+
+
+def _arrow_types():
+    """!
+    @brief Return a dictionary mapping schema field types to Arrow data types.
+    """
+    import pyarrow
+    return {
+        'integer': pyarrow.int64(),
+        'float': pyarrow.float64(),
+        'boolean': pyarrow.bool_(),
+        'datetime': pyarrow.timestamp('s'),
+        'to_one': pyarrow.dictionary(pyarrow.int32(), pyarrow.string()),
+        'string': pyarrow.string(),
+    }
+
+
+def to_arrow(queryset, fields):
+    """!
+    @brief Export all results of a QuerySet into an Apache Arrow table.
+
+    Each page of results becomes a record batch. To-one relations are
+    dictionary-encoded, with dictionaries unified across all batches. Fields
+    of other types are stored as strings, JSON encoded if neccessary.
+
+    @param queryset A productstatus.api.QuerySet object.
+    @param fields List of field names to include.
+    @returns A pyarrow.Table object.
+    """
+    import pyarrow
+
+    types = _field_types(queryset, fields)
+    arrow_types = _arrow_types()
+    schema = pyarrow.schema([(field, arrow_types.get(types[field], pyarrow.string())) for field in fields])
+    batches = []
+    for page in _iterate_column_pages(queryset, fields):
+        arrays = []
+        for field in fields:
+            values = page[field]
+            type_ = types[field]
+            if type_ == 'datetime':
+                array = datetime64_array(values)
+                arrays.append(pyarrow.array(array, mask=numpy.isnat(array), type=pyarrow.timestamp('s')))
+            elif type_ == 'to_one':
+                arrays.append(pyarrow.array(values, type=pyarrow.string()).dictionary_encode())
+            elif type_ in arrow_types:
+                arrays.append(pyarrow.array(values, type=arrow_types[type_]))
+            else:
+                values = [x if x is None or isinstance(x, str) else productstatus.codec.dumps(x) for x in values]
+                arrays.append(pyarrow.array(values, type=pyarrow.string()))
+        batches.append(pyarrow.RecordBatch.from_arrays(arrays, schema=schema))
+
+    return pyarrow.Table.from_batches(batches, schema=schema).unify_dictionaries()
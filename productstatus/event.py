@@ -6,14 +6,14 @@ where Productstatus server publishes its events
 import logging
 import ssl as ssl_module
 import kafka
-import json
 import uuid
 
+import productstatus.codec
 import productstatus.exceptions
 
 
 def unserialize(message):
-    return json.loads(message.decode('utf-8'))
+    return productstatus.codec.loads(message)
 
 
 class Message(dict):
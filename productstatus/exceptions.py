@@ -24,6 +24,13 @@ class ClientErrorException(ProductstatusException):
     pass
 
 
+class ValidationException(ClientErrorException):
+    """
+    Thrown when resource data is rejected by client-side schema validation.
+    """
+    pass
+
+
 class UnauthorizedException(ClientErrorException):
     """
     Thrown when the server returns 401.
@@ -38,6 +45,13 @@ class NotFoundException(ClientErrorException):
     pass
 
 
+class MethodNotAllowedException(ClientErrorException):
+    """
+    Thrown when the server returns 405.
+    """
+    pass
+
+
 class ResourceTypeNotFoundException(NotFoundException):
     """
     Thrown when a resource type can not be found on the server.
@@ -59,6 +73,36 @@ class ServiceUnavailableException(ProductstatusException):
     pass
 
 
+class TransportException(ServiceUnavailableException):
+    """!
+    @brief Thrown by HTTP transports when a request cannot be completed,
+    e.g. because the server cannot be reached or does not respond in time.
+    """
+    pass
+
+
+class DeadlineExceededException(ServiceUnavailableException):
+    """!
+    @brief Thrown when a request cannot complete before its deadline.
+    """
+    pass
+
+
+class ReplayException(ProductstatusException):
+    """!
+    @brief Thrown when a request is not found in a recording being replayed.
+    """
+    pass
+
+
+class LazyLoadException(ProductstatusException):
+    """!
+    @brief Thrown by productstatus.lazyload.LazyLoadDetector when resources
+    are lazily loaded through the same relation path too many times.
+    """
+    pass
+
+
 class UnserializeException(ProductstatusException):
     """
     Thrown when the data from the REST API could not be decoded.
@@ -0,0 +1,129 @@
+"""!
+Detection of repeated lazy loading, also known as the N+1 query problem.
+
+Related resources are loaded from the server when one of their fields is
+first accessed. When iterating over a QuerySet, accessing a related resource
+of each result makes one request per result. A LazyLoadDetector keeps track
+of the relation path through which each lazy load happens, e.g.
+`datainstance.productinstance.product`, and warns, or raises an exception,
+when resources are lazily loaded through the same path more than
+`threshold` times while iterating over one QuerySet.
+
+Example usage:
+
+detector = productstatus.lazyload.LazyLoadDetector(threshold=10)
+api = productstatus.api.Api('https://productstatus.fqdn', lazy_load_detector=detector)
+for datainstance in api.datainstance.objects.filter(format=netcdf):
+    print(datainstance.productinstance.product.name)
+...
+print(detector.report())
+"""
+
+import collections
+import sys
+import threading
+import warnings
+
+import productstatus.exceptions
+import productstatus.utils
+
+
+class LazyLoadWarning(UserWarning):
+    """!
+    @brief Warns about resources lazily loaded too many times through the
+    same relation path.
+    """
+    pass
+
+
+class LazyLoadDetector(object):
+    """!
+    @brief Counts lazy loads of resources found through a QuerySet, for each
+    relation path.
+
+    Only resources returned by a QuerySet, and the related resources reached
+    from them, are tracked. Counts are kept for each QuerySet, and the
+    warning or exception is raised once for each relation path and QuerySet,
+    when the count exceeds the threshold.
+    """
+
+    def __init__(self, threshold=10, raise_exception=False):
+        """!
+        @param threshold Number of lazy loads through the same relation path
+            that are allowed while iterating over one QuerySet.
+        @param raise_exception If True, raise
+            productstatus.exceptions.LazyLoadException instead of issuing a
+            LazyLoadWarning, e.g. to make tests fail.
+        """
+        self.threshold = threshold
+        self.raise_exception = raise_exception
+        self._reset_after_fork()
+
+    def _reset_after_fork(self):
+        """!
+        @brief Create a new lock, and forget all counts. Called after
+        unpickling, and in child processes after os.fork().
+        """
+        self._lock = threading.Lock()
+        self._totals = collections.Counter()
+
+    def __getstate__(self):
+        return {'threshold': self.threshold, 'raise_exception': self.raise_exception}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def record(self, counts, path):
+        """!
+        @brief Record a lazy load, and warn or raise an exception if the
+        threshold is exceeded.
+        @param counts The collections.Counter of the QuerySet that the
+            resource was found through.
+        @param path Relation path as a tuple of names, starting with the
+            name of the collection of the QuerySet.
+        """
+        with self._lock:
+            counts[path] += 1
+            self._totals[path] += 1
+            count = counts[path]
+        if count != self.threshold + 1:
+            return
+        message = (
+            '%s was lazily loaded more than %d times while iterating over %s resources, '
+            'making one request per resource; prefetch or bulk fetch the related %s resources instead' % (
+                '.'.join(path), self.threshold, path[0], path[-1])
+        )
+        if self.raise_exception:
+            raise productstatus.exceptions.LazyLoadException(message)
+        warnings.warn(message, LazyLoadWarning, stacklevel=_calling_stacklevel(sys._getframe()))
+
+    def report(self):
+        """!
+        @brief Return a list of (relation path, number of lazy loads) tuples
+        for all query sets, with the most frequent path first.
+        """
+        with self._lock:
+            return [('.'.join(path), count) for path, count in self._totals.most_common()]
+
+    def reset(self):
+        """!
+        @brief Forget the counts returned by report().
+        """
+        with self._lock:
+            self._totals = collections.Counter()
+
+    def __repr__(self):
+        return '<LazyLoadDetector threshold=%d>' % self.threshold
+
+
+def _calling_stacklevel(frame):
+    """!
+    @brief Return the stacklevel argument to warnings.warn() that points to
+    the first function outside the client library on the stack, counting
+    from the frame of the function calling warnings.warn().
+    """
+    level = 1
+    while frame is not None and productstatus.utils.is_library_frame(frame):
+        frame = frame.f_back
+        level += 1
+    return level
@@ -0,0 +1,189 @@
+"""!
+Adaptive concurrency limiting used by the Productstatus client library.
+
+An AdaptiveLimiter bounds the number of requests that are sent to the server
+at the same time. The limit is adjusted using additive increase and
+multiplicative decrease (AIMD): it grows slowly while the server responds
+quickly, and is cut when the server responds with 429 or 5xx errors, fails
+to respond, or becomes markedly slower than it was when lightly loaded.
+
+Example usage:
+
+limiter = productstatus.limiter.AdaptiveLimiter(initial_limit=10, max_limit=64)
+api = productstatus.api.Api('https://productstatus.fqdn', limiter=limiter)
+...
+print(limiter.limit)
+"""
+
+import collections
+import threading
+import time
+
+
+class AdaptiveLimiter(object):
+    """!
+    @brief An AIMD concurrency limiter, shared by all threads using an Api object.
+
+    Each request must acquire a slot before it is sent, and release it with
+    the outcome once it has completed. While the number of requests in
+    flight reaches the limit, new requests wait for a free slot.
+
+    The limit is increased by `increase` for every `limit` successful
+    requests, i.e. by about `increase` per round trip, as long as the limit
+    is actually being used. It is multiplied by `decrease_factor` when a
+    request signals overload, at most once for all requests sent under the
+    same limit.
+
+    Slow responses signal overload when the smoothed latency exceeds
+    `latency_tolerance` times the lowest latency among the last
+    `latency_window` requests.
+    """
+
+    def __init__(self,
+                 initial_limit=10,
+                 min_limit=1,
+                 max_limit=100,
+                 increase=1.0,
+                 decrease_factor=0.5,
+                 latency_tolerance=2.0,
+                 latency_window=100,
+                 min_samples=20,
+                 smoothing=0.1):
+        """!
+        @param initial_limit Number of concurrent requests allowed initially.
+        @param min_limit Lowest number of concurrent requests allowed.
+        @param max_limit Highest number of concurrent requests allowed.
+        @param increase Increase of the limit per round trip without overload.
+        @param decrease_factor Factor applied to the limit on overload.
+        @param latency_tolerance Ratio between smoothed and lowest latency
+            that signals overload, or None to ignore latency.
+        @param latency_window Number of recent latencies in which the lowest latency is found.
+        @param min_samples Number of latencies recorded before latency can signal overload.
+        @param smoothing Weight of the newest latency in the smoothed latency.
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.min_samples = min_samples
+        self.smoothing = smoothing
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._latencies = collections.deque(maxlen=latency_window)
+        self._smoothed_latency = None
+        self._decreases = 0
+        self._reset_after_fork()
+
+    def _reset_after_fork(self):
+        """!
+        @brief Forget requests in flight and the time of the last decrease,
+        and create a new lock. Called after unpickling, and in child
+        processes after os.fork().
+        """
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._last_decrease = 0.0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_condition']
+        del state['_in_flight']
+        # Monotonic times are meaningless in other processes
+        del state['_last_decrease']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_after_fork()
+
+    @property
+    def limit(self):
+        """!
+        @brief The current number of concurrent requests allowed.
+        """
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        """!
+        @brief The number of requests currently holding a slot.
+        """
+        return self._in_flight
+
+    def acquire(self, timeout=None):
+        """!
+        @brief Wait for a free slot and take it.
+        @param timeout Maximum number of seconds to wait, or None to wait indefinitely.
+        @returns A token to pass to release(), or None if no slot became free in time.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._in_flight < int(self._limit), timeout):
+                return None
+            self._in_flight += 1
+            return time.monotonic()
+
+    def release(self, token, overloaded=False):
+        """!
+        @brief Release a slot taken by acquire(), and adjust the limit.
+        @param token The value returned by acquire().
+        @param overloaded True if the request failed in a way that signals
+            that the server is overloaded.
+        """
+        now = time.monotonic()
+        latency = now - token
+        with self._condition:
+            in_flight = self._in_flight
+            self._in_flight -= 1
+            if not overloaded:
+                overloaded = self._record_latency(latency)
+            if overloaded:
+                # Requests sent before the previous decrease were sent under
+                # a higher limit, and must not decrease it again.
+                if token >= self._last_decrease and self._limit > self.min_limit:
+                    self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+                    self._last_decrease = now
+                    self._decreases += 1
+            elif in_flight >= self._limit / 2:
+                self._limit = min(self.max_limit, self._limit + self.increase / self._limit)
+            self._condition.notify_all()
+
+    def cancel(self, token):
+        """!
+        @brief Release a slot taken by acquire() for a request whose outcome
+        will not be known, such as an abandoned hedged request, without
+        adjusting the limit.
+        @param token The value returned by acquire().
+        """
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def _record_latency(self, latency):
+        """!
+        @brief Record the latency of a successful request, and return True if
+        the server is significantly slower than when lightly loaded.
+        """
+        self._latencies.append(latency)
+        if self._smoothed_latency is None:
+            self._smoothed_latency = latency
+        else:
+            self._smoothed_latency += self.smoothing * (latency - self._smoothed_latency)
+        if self.latency_tolerance is None or len(self._latencies) < self.min_samples:
+            return False
+        return self._smoothed_latency > self.latency_tolerance * min(self._latencies)
+
+    def stats(self):
+        """!
+        @brief Return a dictionary describing the current state of the limiter.
+        """
+        with self._condition:
+            return {
+                'limit': self.limit,
+                'in_flight': self._in_flight,
+                'min_latency': min(self._latencies) if self._latencies else None,
+                'smoothed_latency': self._smoothed_latency,
+                'decreases': self._decreases,
+            }
+
+    def __repr__(self):
+        return '<AdaptiveLimiter limit=%d in_flight=%d>' % (self.limit, self._in_flight)
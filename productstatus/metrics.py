@@ -0,0 +1,276 @@
+"""!
+Request metrics collected by the Productstatus client library.
+
+A Metrics object counts the HTTP requests sent by an Api object, grouped by
+HTTP method and resource collection: their number, status codes, bytes sent
+and received, and a histogram of their latency. It also counts hits and
+misses of client-side caches. A snapshot of all counters is returned by
+Api.stats().
+
+Exporters are callables which receive a RequestEvent for every HTTP request
+sent, and a CacheEvent for every cache lookup, and may forward them to
+Prometheus, StatsD, OpenTelemetry or any other monitoring system.
+
+Example usage:
+
+def export(event):
+    if isinstance(event, productstatus.metrics.RequestEvent):
+        statsd.timing('productstatus.%s.%s' % (event.method, event.collection), event.latency * 1000)
+
+metrics = productstatus.metrics.Metrics()
+metrics.add_exporter(export)
+api = productstatus.api.Api('https://productstatus.fqdn', metrics=metrics)
+...
+print(api.stats())
+"""
+
+import collections
+import logging
+import threading
+
+
+# Upper bounds of the latency histogram buckets, in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+
+# An HTTP request sent to the server. The collection is the name of the
+# resource collection requested, or None for other URLs, such as the API
+# root. The status code is None if no response was received. Retries are
+# requests sent again after a failed request, and hedges are second requests
+# sent because the first one was slower than usual. Abandoned requests are
+# hedged requests whose response was not used, because another request was
+# answered first.
+RequestEvent = collections.namedtuple('RequestEvent', [
+    'method', 'collection', 'status_code', 'latency', 'bytes_out', 'bytes_in', 'abandoned', 'retry', 'hedge',
+], defaults=[False, False, False])
+
+# A lookup in a client-side cache.
+CacheEvent = collections.namedtuple('CacheEvent', ['cache', 'hit'])
+
+
+class Histogram(object):
+    """!
+    @brief Counts observed values in buckets with fixed upper bounds.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """!
+        @brief Return the upper bound of the bucket holding the given
+        quantile, between 0 and 1, or None if no values are observed.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        """!
+        @brief Return a dictionary with the count, sum, extremes, estimated
+        percentiles and cumulative bucket counts of the observed values.
+        """
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': cumulative,
+        }
+
+
+class RequestMetrics(object):
+    """!
+    @brief Counters for requests with the same method to the same collection.
+    """
+
+    def __init__(self, buckets):
+        self.count = 0
+        self.errors = 0
+        self.abandoned = 0
+        self.retries = 0
+        self.hedges = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.status_codes = collections.Counter()
+        self.latency = Histogram(buckets)
+
+    def record(self, event):
+        self.count += 1
+        if event.status_code is None:
+            self.errors += 1
+        else:
+            self.status_codes[event.status_code] += 1
+        if event.abandoned:
+            self.abandoned += 1
+        if event.retry:
+            self.retries += 1
+        if event.hedge:
+            self.hedges += 1
+        self.bytes_out += event.bytes_out
+        self.bytes_in += event.bytes_in
+        self.latency.observe(event.latency)
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'abandoned': self.abandoned,
+            'retries': self.retries,
+            'hedges': self.hedges,
+            'bytes_out': self.bytes_out,
+            'bytes_in': self.bytes_in,
+            'status_codes': dict(self.status_codes),
+            'latency': self.latency.snapshot(),
+        }
+
+
+class Metrics(object):
+    """!
+    @brief Thread-safe request and cache counters, which may be shared by
+    several Api objects.
+
+    Counters are kept separately in each process: they start from zero in
+    unpickled objects, and in child processes after os.fork(). Exporters are
+    kept in child processes, but not pickled.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """!
+        @param buckets Upper bounds of the latency histogram buckets, in seconds.
+        """
+        self.buckets = tuple(buckets)
+        self._exporters = []
+        self._reset_after_fork()
+
+    def _reset_after_fork(self):
+        """!
+        @brief Create a new lock, and reset all counters. Called after
+        unpickling, and in child processes after os.fork().
+        """
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._cache = collections.defaultdict(collections.Counter)
+
+    def reset(self):
+        """!
+        @brief Reset all counters.
+        """
+        with self._lock:
+            self._requests = {}
+            self._cache = collections.defaultdict(collections.Counter)
+
+    def __getstate__(self):
+        return {'buckets': self.buckets}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def add_exporter(self, exporter):
+        """!
+        @brief Call `exporter` with every RequestEvent and CacheEvent recorded
+        from now on. Exporters are called in the thread sending the request,
+        and must be thread-safe. Exceptions raised by exporters are logged.
+        """
+        with self._lock:
+            self._exporters = self._exporters + [exporter]
+
+    def remove_exporter(self, exporter):
+        """!
+        @brief Stop calling an exporter added with add_exporter().
+        """
+        with self._lock:
+            self._exporters = [x for x in self._exporters if x != exporter]
+
+    def _export(self, event):
+        for exporter in self._exporters:
+            try:
+                exporter(event)
+            except Exception:
+                logging.warning('Metrics exporter %r failed' % exporter, exc_info=True)
+
+    def record_request(self, method, collection, status_code, latency, bytes_out=0, bytes_in=0, abandoned=False, retry=False, hedge=False):
+        """!
+        @brief Record an HTTP request.
+        @param method HTTP method.
+        @param collection Name of the resource collection, or None.
+        @param status_code HTTP status code, or None if no response was received.
+        @param latency Number of seconds the request took.
+        @param bytes_out Size of the request body.
+        @param bytes_in Size of the response body.
+        @param abandoned True if the response was not used, because another
+            hedged request was answered first.
+        @param retry True if the request was sent again after a failed request.
+        @param hedge True if the request was sent because an identical
+            request was slower than usual.
+        """
+        event = RequestEvent(method.lower(), collection, status_code, latency, bytes_out, bytes_in,
+                             bool(abandoned), bool(retry), bool(hedge))
+        with self._lock:
+            key = (event.method, collection)
+            metrics = self._requests.get(key)
+            if metrics is None:
+                metrics = self._requests[key] = RequestMetrics(self.buckets)
+            metrics.record(event)
+        self._export(event)
+
+    def record_cache(self, cache, hit):
+        """!
+        @brief Record a lookup in a client-side cache.
+        @param cache Name of the cache.
+        @param hit True if the value was found in the cache.
+        """
+        event = CacheEvent(cache, bool(hit))
+        with self._lock:
+            self._cache[cache]['hits' if hit else 'misses'] += 1
+        self._export(event)
+
+    def snapshot(self):
+        """!
+        @brief Return a dictionary with all counters. Requests are listed
+        for each method and collection, and summed up in `totals`.
+        """
+        with self._lock:
+            requests = [dict(method=method, collection=collection, **metrics.snapshot())
+                        for (method, collection), metrics in sorted(self._requests.items(), key=lambda x: (x[0][0], x[0][1] or ''))]
+            cache = dict((name, {'hits': x['hits'], 'misses': x['misses']}) for name, x in self._cache.items())
+        totals = {}
+        for name in ('count', 'errors', 'abandoned', 'retries', 'hedges', 'bytes_out', 'bytes_in'):
+            totals[name] = sum(x[name] for x in requests)
+        totals['seconds'] = sum(x['latency']['sum'] for x in requests)
+        return {'requests': requests, 'totals': totals, 'cache': cache}
+
+    def __repr__(self):
+        with self._lock:
+            count = sum(x.count for x in self._requests.values())
+        return '<Metrics requests=%d>' % count
@@ -0,0 +1,276 @@
+"""!
+Profiling where the Productstatus client library spends its time.
+
+A PhaseProfiler attributes the wall time spent while it is active to the
+following phases, for each resource collection:
+
+* `network`: waiting for responses in Api._do_request(), including retries.
+* `decode`: decoding JSON response bodies in Api._unserialize().
+* `convert`: converting field values in Resource._unserialize().
+* `user`: everything else, i.e. time spent in the calling program.
+
+Time spent in a phase nested inside another, such as a schema request made
+while converting field values, is only counted in the innermost phase. If
+memory tracing is enabled, memory allocated and not freed during each phase is
+counted as well, using the `tracemalloc` module.
+
+The results are shown as a table, or written as folded stacks for flame
+graph tools, such as `flamegraph.pl` or speedscope, in which each stack
+consists of the calling program's functions, the collection, and the phase.
+
+Example usage:
+
+with productstatus.profiler.PhaseProfiler(api, trace_memory=True) as profiler:
+    for datainstance in api.datainstance.objects.filter(format=netcdf):
+        print(datainstance.url)
+print(profiler.table())
+profiler.write_folded('sweep.folded')
+"""
+
+import collections
+import inspect
+import sys
+import threading
+import time
+import tracemalloc
+
+import productstatus.exceptions
+import productstatus.utils
+
+
+# Phases attributed to the library, in the order they are shown.
+PHASES = ('network', 'decode', 'convert')
+
+# Maximum number of calling program frames included in folded stacks.
+MAX_STACK_DEPTH = 64
+
+
+class PhaseStats(object):
+    """!
+    @brief Time and memory spent in one phase for one collection.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.allocated = 0
+
+
+class _Frame(object):
+    """!
+    @brief A phase being timed by a thread.
+    """
+
+    def __init__(self, key, stack, start, memory):
+        self.key = key
+        self.stack = stack
+        self.start = start
+        self.memory = memory
+        self.child_seconds = 0.0
+        self.child_memory = 0
+
+
+class PhaseProfiler(object):
+    """!
+    @brief Context manager attributing wall time and memory allocations to
+    library phases and collections.
+
+    The profiler measures phases in all threads using the Api object. The
+    time attributed to the calling program is the wall time during which no
+    phase was active, and is only meaningful if the Api object is used by a
+    single thread. The asyncio client is not supported.
+    """
+
+    def __init__(self, api, trace_memory=False):
+        """!
+        @param api The productstatus.api.Api object to profile.
+        @param trace_memory If True, count memory allocated in each phase
+            using `tracemalloc`, which slows down the program considerably.
+        """
+        if inspect.iscoroutinefunction(api._do_request):
+            raise productstatus.exceptions.ProductstatusException(
+                'PhaseProfiler does not support the asyncio client'
+            )
+        self.api = api
+        self.trace_memory = trace_memory
+        self.stats = collections.defaultdict(PhaseStats)
+        self.folded = collections.Counter()
+        self.wall_seconds = 0.0
+        self.allocated = 0
+        self._lock = threading.Lock()
+        self._thread_local = threading.local()
+        self._previous = None
+        self._started_tracemalloc = False
+
+    def __enter__(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._memory_start = self._memory()
+        self._previous = self.api._profiler
+        self.api._profiler = self
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.wall_seconds += time.perf_counter() - self._start
+        self.allocated += self._memory() - self._memory_start
+        self.api._profiler = self._previous
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _memory(self):
+        if self.trace_memory and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[0]
+        return 0
+
+    def _frames(self):
+        try:
+            return self._thread_local.frames
+        except AttributeError:
+            self._thread_local.frames = []
+            return self._thread_local.frames
+
+    def enter(self, phase, collection):
+        """!
+        @brief Start timing a phase in the current thread. Every call must be
+        followed by a call to leave().
+        """
+        frames = self._frames()
+        if frames:
+            stack = frames[-1].stack
+        else:
+            stack = _calling_stack(sys._getframe(1))
+        frames.append(_Frame((phase, collection), stack, time.perf_counter(), self._memory()))
+
+    def leave(self):
+        """!
+        @brief Stop timing the innermost phase started in the current thread.
+        """
+        frames = self._frames()
+        frame = frames.pop()
+        seconds = time.perf_counter() - frame.start
+        memory = self._memory() - frame.memory
+        if frames:
+            frames[-1].child_seconds += seconds
+            frames[-1].child_memory += memory
+        seconds -= frame.child_seconds
+        memory -= frame.child_memory
+        with self._lock:
+            stats = self.stats[frame.key]
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.allocated += memory
+            self.folded[frame.stack + (frame.key[1] or '-', frame.key[0])] += seconds
+
+    def phase(self, phase, collection):
+        """!
+        @brief Return a context manager timing a phase.
+        """
+        return _Phase(self, phase, collection)
+
+    def user_seconds(self):
+        """!
+        @brief Return the wall time during which no phase was active.
+        """
+        with self._lock:
+            return max(0.0, self.wall_seconds - sum(x.seconds for x in self.stats.values()))
+
+    def summary(self):
+        """!
+        @brief Return a list of (phase, collection, calls, seconds, allocated
+        bytes) tuples, ordered by phase and decreasing time, followed by the
+        time spent in the calling program.
+        """
+        with self._lock:
+            items = sorted(self.stats.items(), key=lambda x: (PHASES.index(x[0][0]), -x[1].seconds))
+            rows = [(phase, collection, x.calls, x.seconds, x.allocated) for (phase, collection), x in items]
+            library_allocated = sum(x.allocated for x in self.stats.values())
+        rows.append(('user', None, None, self.user_seconds(), self.allocated - library_allocated))
+        return rows
+
+    def table(self):
+        """!
+        @brief Return the summary as a human-readable table.
+        """
+        lines = ['%-8s %-24s %8s %10s %7s %12s' % ('phase', 'collection', 'calls', 'seconds', 'time', 'allocated')]
+        total = self.wall_seconds or 1.0
+        for phase, collection, calls, seconds, allocated in self.summary():
+            lines.append('%-8s %-24s %8s %10.3f %6.1f%% %12s' % (
+                phase,
+                collection or '-',
+                '-' if calls is None else calls,
+                seconds,
+                100.0 * seconds / total,
+                _format_bytes(allocated) if self.trace_memory else '-',
+            ))
+        lines.append('%-8s %-24s %8s %10.3f %6.1f%% %12s' % (
+            'total', '', '', self.wall_seconds, 100.0, _format_bytes(self.allocated) if self.trace_memory else '-',
+        ))
+        return '\n'.join(lines)
+
+    def folded_stacks(self):
+        """!
+        @brief Return the profile as lines in the folded stack format used by
+        flame graph tools, with sample counts in microseconds. Time spent in
+        the calling program is shown as a single `user` stack.
+        """
+        with self._lock:
+            lines = ['%s %d' % (';'.join(stack), round(seconds * 1e6))
+                     for stack, seconds in sorted(self.folded.items())]
+        lines.append('user %d' % round(self.user_seconds() * 1e6))
+        return [x for x in lines if not x.endswith(' 0')]
+
+    def write_folded(self, path):
+        """!
+        @brief Write folded stacks to a file.
+        """
+        with open(path, 'w') as f:
+            for line in self.folded_stacks():
+                f.write(line + '\n')
+
+    def __repr__(self):
+        return '<PhaseProfiler %.3f seconds>' % self.wall_seconds
+
+
+class _Phase(object):
+    """!
+    @brief Context manager returned by PhaseProfiler.phase().
+    """
+
+    __slots__ = ('profiler', 'phase', 'collection')
+
+    def __init__(self, profiler, phase, collection):
+        self.profiler = profiler
+        self.phase = phase
+        self.collection = collection
+
+    def __enter__(self):
+        self.profiler.enter(self.phase, self.collection)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.leave()
+
+
+def _calling_stack(frame):
+    """!
+    @brief Return the names of the calling program's functions on the stack,
+    outermost first, leaving out functions of the client library itself.
+    """
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        if not productstatus.utils.is_library_frame(frame):
+            names.append('%s.%s' % (frame.f_globals.get('__name__', ''), frame.f_code.co_name))
+        frame = frame.f_back
+    names.reverse()
+    return tuple(names)
+
+
+def _format_bytes(value):
+    if abs(value) < 1024:
+        return '%d B' % value
+    for unit in ('KiB', 'MiB', 'GiB'):
+        value /= 1024.0
+        if abs(value) < 1024 or unit == 'GiB':
+            return '%.1f %s' % (value, unit)
@@ -0,0 +1,281 @@
+"""!
+Recording and replaying HTTP traffic of the Productstatus client library.
+
+A RecordingTransport sends requests through another transport, and appends
+every request and its response to a file. A ReplayTransport serves the
+recorded responses back without contacting any server, optionally simulating
+server latency, which makes runs reproducible offline, e.g. in tests and
+benchmarks.
+
+Recordings are stored as JSON lines, one request and response per line. If
+the file name ends with `.gz`, the file is compressed with gzip. Child
+processes, such as QuerySet.parallel_map() workers, record to files of their
+own, named after their process ID; see process_path().
+
+Example usage:
+
+api = productstatus.api.Api('https://productstatus.fqdn',
+                            transport=productstatus.replay.record('session.jsonl.gz'))
+...
+api.close()
+
+api = productstatus.api.Api('https://productstatus.fqdn',
+                            transport=productstatus.replay.replay('session.jsonl.gz', latency='recorded'))
+"""
+
+import base64
+import collections
+import functools
+import gzip
+import json
+import os
+import threading
+import time
+import urllib.parse
+
+import requests.structures
+
+import productstatus.exceptions
+import productstatus.transport
+
+
+def _open(path, mode):
+    """!
+    @brief Open a recording for reading or appending text, compressed with
+    gzip if the file name ends with `.gz`.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='UTF-8')
+    return open(path, mode, encoding='UTF-8')
+
+
+def process_path(path, pid):
+    """!
+    @brief Return the name of the file that the process `pid` records to,
+    when it is not the process that created the recording transport. The
+    process ID is inserted before the file extension, e.g.
+    `session.1234.jsonl.gz` for `session.jsonl.gz`.
+    """
+    suffix = ''
+    if path.endswith('.gz'):
+        path, suffix = path[:-3], '.gz'
+    root, extension = os.path.splitext(path)
+    return '%s.%d%s%s' % (root, pid, extension, suffix)
+
+
+def request_key(method, url, params=None, data=None):
+    """!
+    @brief Return the key identifying a request in a recording. The scheme
+    and host name of the URL are ignored, so that a recording can be replayed
+    against any server.
+    """
+    url = urllib.parse.urlsplit(url)
+    path = url.path
+    if url.query:
+        path += '?' + url.query
+    query = urllib.parse.urlencode(productstatus.transport.query_parameters(params or []))
+    if isinstance(data, bytes):
+        data = data.decode('UTF-8')
+    return (method.lower(), path, query, data)
+
+
+class ReplayResponse(object):
+    """!
+    @brief A response served from a recording, with the same attributes as
+    the responses returned by other transports.
+    """
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('UTF-8', errors='replace')
+
+    def __repr__(self):
+        return '<ReplayResponse [%d]>' % self.status_code
+
+
+class RecordingTransport(productstatus.transport.Transport):
+    """!
+    @brief Sends requests through another transport, and appends each request
+    and response to a recording.
+
+    Requests raising exceptions are not recorded. The recording is complete
+    once the transport is closed, i.e. when Api.close() is called.
+
+    Only the owner process appends to `path`. Other processes, such as those
+    created with os.fork() or multiprocessing, append to the file named by
+    process_path() instead, so that their records are not interleaved.
+    """
+
+    def __init__(self, path, *args, **kwargs):
+        """!
+        @param path Name of the file the recording is appended to.
+        @param transport The transport used to send requests, given in the
+            same way as to the Api constructor. Defaults to `requests`.
+        @param owner_pid ID of the process that appends to `path`. Defaults
+            to the current process.
+
+        The remaining arguments are passed on to the transport.
+        """
+        transport = kwargs.pop('transport', 'requests')
+        self.owner_pid = kwargs.pop('owner_pid', None) or os.getpid()
+        super(RecordingTransport, self).__init__(*args, **kwargs)
+        self.transport = productstatus.transport.get_transport_class(transport)(*args, **kwargs)
+        self.recording = path
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        """!
+        @brief Open the file that the current process records to.
+        """
+        self._pid = os.getpid()
+        self.path = self.recording if self._pid == self.owner_pid else process_path(self.recording, self._pid)
+        self._file = _open(self.path, 'a')
+
+    def _reset_after_fork(self):
+        """!
+        @brief Detach the file inherited from the parent process, by pointing
+        its descriptor at the null device, so that closing it in this process
+        cannot write to the parent's recording. The file of this process is
+        opened when its first request is recorded.
+        """
+        if self._file is None or self._pid == os.getpid():
+            return
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        try:
+            os.dup2(devnull, self._file.fileno())
+        finally:
+            os.close(devnull)
+        self._file = None
+
+    def request(self, method, url, params=None, data=None, timeout=None):
+        start = time.monotonic()
+        response = self.transport.request(method, url, params=params, data=data, timeout=timeout)
+        latency = time.monotonic() - start
+        key = request_key(method, url, params, data)
+        record = {
+            'method': key[0],
+            'path': key[1],
+            'query': key[2],
+            'data': key[3],
+            'status_code': response.status_code,
+            'headers': dict(response.headers),
+            'latency': round(latency, 6),
+        }
+        try:
+            record['content'] = response.content.decode('UTF-8')
+        except UnicodeDecodeError:
+            record['content_base64'] = base64.b64encode(response.content).decode('ascii')
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._reset_after_fork()
+            if self._file is None:
+                self._open()
+            self._file.write(line)
+            self._file.flush()
+        return response
+
+    def close(self):
+        self.transport.close()
+        with self._lock:
+            self._reset_after_fork()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ReplayTransport(productstatus.transport.Transport):
+    """!
+    @brief Serves responses from a recording made by RecordingTransport.
+
+    Requests are matched by method, path, query string and body. When the
+    same request was recorded several times, its responses are served in the
+    order they were recorded, and the last one is served again once all have
+    been used. Requests that were never recorded raise
+    productstatus.exceptions.ReplayException.
+    """
+
+    def __init__(self, path, *args, **kwargs):
+        """!
+        @param path Name of the file holding the recording.
+        @param latency Simulated latency of each response: None to respond
+            immediately, a number of seconds, or `recorded` to wait as long
+            as the original request took.
+
+        The remaining arguments are accepted for compatibility with other
+        transports, and ignored.
+        """
+        self.latency = kwargs.pop('latency', None)
+        super(ReplayTransport, self).__init__(*args, **kwargs)
+        self.path = path
+        self._lock = threading.Lock()
+        self._responses = collections.defaultdict(collections.deque)
+        for record in self.load(path):
+            key = (record['method'], record['path'], record['query'], record['data'])
+            self._responses[key].append(record)
+
+    @staticmethod
+    def load(path):
+        """!
+        @brief Return a list of all records in a recording. Records following
+        a truncated end of a compressed file are ignored.
+        """
+        records = []
+        with _open(path, 'r') as f:
+            try:
+                for line in f:
+                    if line.endswith('\n'):
+                        records.append(json.loads(line))
+            except EOFError:
+                pass
+        return records
+
+    def _next_record(self, key):
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                return None
+            if len(responses) > 1:
+                return responses.popleft()
+            return responses[0]
+
+    def request(self, method, url, params=None, data=None, timeout=None):
+        key = request_key(method, url, params, data)
+        record = self._next_record(key)
+        if record is None:
+            raise productstatus.exceptions.ReplayException(
+                'No response recorded in %s for %s %s' % (self.path, method.upper(), key[1])
+            )
+        latency = record['latency'] if self.latency == 'recorded' else self.latency
+        if latency:
+            time.sleep(latency if timeout is None else min(latency, timeout))
+            if timeout is not None and latency > timeout:
+                raise productstatus.exceptions.TransportException('Timed out after %s seconds' % timeout)
+        if 'content_base64' in record:
+            content = base64.b64decode(record['content_base64'])
+        else:
+            content = record['content'].encode('UTF-8')
+        return ReplayResponse(url, record['status_code'], record['headers'], content)
+
+
+def record(path, transport='requests'):
+    """!
+    @brief Return a transport for the Api constructor which records all
+    requests to the file `path`, sending them through `transport`. The
+    calling process is the owner of the recording.
+    """
+    return functools.partial(RecordingTransport, path, transport=transport, owner_pid=os.getpid())
+
+
+def replay(path, latency=None):
+    """!
+    @brief Return a transport for the Api constructor which serves responses
+    from the recording in the file `path`, with the given simulated latency.
+    """
+    return functools.partial(ReplayTransport, path, latency=latency)
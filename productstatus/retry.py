@@ -0,0 +1,147 @@
+"""!
+Retry policies used by the Productstatus client library.
+
+A RetryPolicy decides whether a failed request is sent again, how long to
+wait before doing so, and when a GET request is hedged by sending a second,
+identical request while the first one is still running. The default policy
+sends every request exactly once.
+
+Example usage:
+
+policy = productstatus.retry.RetryPolicy(max_attempts=4, deadline=30, hedge_percentile=95)
+api = productstatus.api.Api('https://productstatus.fqdn', retry=policy)
+"""
+
+import collections
+import email.utils
+import random
+import time
+
+
+# HTTP methods that can safely be sent more than once.
+IDEMPOTENT_METHODS = frozenset(['get', 'head', 'options', 'put', 'delete'])
+
+# HTTP status codes indicating that a request may succeed if sent again.
+RETRY_STATUS_CODES = frozenset([429, 502, 503, 504])
+
+
+class RetryPolicy(object):
+    """!
+    @brief Decides how failed requests are retried and slow requests are hedged.
+
+    Requests using idempotent methods are retried on connection errors,
+    timeouts and the status codes in `retry_status_codes`, waiting for an
+    exponentially increasing, randomized delay between attempts. If the
+    server sends a `Retry-After` header, its delay is used instead. All
+    attempts of a request must complete within `deadline` seconds.
+
+    If `hedge_percentile` is set, the latency of successful GET requests is
+    recorded. When a GET request takes longer than this percentile of recent
+    latencies, a second request is sent, and the first response is used.
+    """
+
+    def __init__(self,
+                 max_attempts=1,
+                 backoff=0.1,
+                 max_backoff=10.0,
+                 jitter=True,
+                 deadline=None,
+                 retry_methods=IDEMPOTENT_METHODS,
+                 retry_status_codes=RETRY_STATUS_CODES,
+                 respect_retry_after=True,
+                 hedge_percentile=None,
+                 hedge_min_samples=20,
+                 hedge_window=100):
+        """!
+        @param max_attempts Maximum number of times a request is sent.
+        @param backoff Delay in seconds before the first retry, doubled for each subsequent retry.
+        @param max_backoff Maximum delay in seconds between two attempts.
+        @param jitter If True, delays are picked randomly between zero and the exponential delay.
+        @param deadline Maximum number of seconds spent on a request, including retries, or None.
+        @param retry_methods HTTP methods which are retried.
+        @param retry_status_codes HTTP status codes which are retried.
+        @param respect_retry_after Whether to wait as long as the `Retry-After` header asks for.
+        @param hedge_percentile Latency percentile after which GET requests are hedged, or None.
+        @param hedge_min_samples Number of latencies recorded before hedging starts.
+        @param hedge_window Number of recent latencies used to compute the percentile.
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.deadline = deadline
+        self.retry_methods = frozenset(x.lower() for x in retry_methods)
+        self.retry_status_codes = frozenset(retry_status_codes)
+        self.respect_retry_after = respect_retry_after
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._latencies = collections.deque(maxlen=hedge_window)
+
+    def should_retry_status(self, status_code):
+        """!
+        @brief Return True if a response with this status code may be retried.
+        """
+        return status_code in self.retry_status_codes
+
+    def retry_delay(self, method, attempt, response=None):
+        """!
+        @brief Return the number of seconds to wait before sending a request
+        again, or None if it must not be retried.
+
+        @param method HTTP method of the request.
+        @param attempt Number of attempts made so far.
+        @param response The response of the last attempt, or None if it raised an exception.
+        """
+        if attempt >= self.max_attempts or method.lower() not in self.retry_methods:
+            return None
+        if response is not None and self.respect_retry_after:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return retry_after
+        delay = min(self.max_backoff, self.backoff * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def record_latency(self, method, seconds):
+        """!
+        @brief Record the latency of a successful request, used to decide when to hedge.
+        """
+        if self.hedge_percentile is not None and method.lower() == 'get':
+            self._latencies.append(seconds)
+
+    def hedge_delay(self, method):
+        """!
+        @brief Return the number of seconds after which a second request is
+        sent, or None if the request must not be hedged.
+        """
+        if self.hedge_percentile is None or method.lower() != 'get':
+            return None
+        latencies = sorted(self._latencies)
+        if len(latencies) < self.hedge_min_samples:
+            return None
+        index = min(len(latencies) - 1, int(len(latencies) * self.hedge_percentile / 100.0))
+        return latencies[index]
+
+    def __repr__(self):
+        return '<RetryPolicy max_attempts=%d deadline=%s hedge_percentile=%s>' % (
+            self.max_attempts, self.deadline, self.hedge_percentile)
+
+
+def parse_retry_after(value):
+    """!
+    @brief Convert the value of a `Retry-After` header, given either in
+    seconds or as a HTTP date, into a number of seconds. Returns None if the
+    value is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
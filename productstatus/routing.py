@@ -0,0 +1,215 @@
+"""!
+Read routing across several Productstatus servers.
+
+An EndpointRouter picks the server that a read request is sent to, among a
+primary server and its read replicas. Servers are scored by the exponentially
+weighted moving average (EWMA) of their recent latency, multiplied by the
+number of requests in flight to them, so that load is spread across servers
+with similar latency. Servers that fail repeatedly are ejected for a while,
+and tried again afterwards. For a short while after a write, reads are sent
+to the primary server, so that they are not answered by a replica that has
+not received the write yet.
+
+Example usage:
+
+api = productstatus.api.Api([
+    'https://productstatus.fqdn',
+    'https://productstatus-replica1.fqdn',
+    'https://productstatus-replica2.fqdn',
+])
+"""
+
+import logging
+import threading
+import time
+
+
+# HTTP methods that change data on the primary server.
+WRITE_METHODS = frozenset(['post', 'put', 'patch', 'delete'])
+
+
+class Endpoint(object):
+    """!
+    @brief The health and latency of a single server.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.latency = None
+        self.in_flight = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Requests in flight and monotonic times are meaningless in other processes
+        del state['in_flight']
+        del state['ejected_until']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.in_flight = 0
+        self.ejected_until = 0.0
+
+    def __repr__(self):
+        return '<Endpoint %s latency=%s in_flight=%d>' % (self.url, self.latency, self.in_flight)
+
+
+class EndpointRouter(object):
+    """!
+    @brief Chooses a server for each read request, based on latency and health.
+
+    Servers without recorded latency are assumed to have `initial_latency`,
+    or the mean latency of the measured servers, and win ties with measured
+    servers. After record_write() is called, reads are sent to the primary
+    server for `read_after_write` seconds, unless it is ejected.
+
+    A server that fails `eject_after` requests in a row, through connection
+    errors or 5xx responses, is not used for `eject_duration` seconds. If it
+    fails again when it is next used, it is ejected for twice as long, up to
+    `max_eject_duration`. A successful request resets its health. When all
+    servers are ejected, the one that recovers first is used.
+    """
+
+    def __init__(self, urls, smoothing=0.3, eject_after=3, eject_duration=10.0, max_eject_duration=300.0,
+                 initial_latency=None, read_after_write=5.0):
+        """!
+        @param urls List of base URLs of servers serving the same data. The
+            first one is the primary server.
+        @param smoothing Weight of the newest latency in the moving average.
+        @param eject_after Number of consecutive failures before a server is ejected.
+        @param eject_duration Number of seconds a server is ejected the first time.
+        @param max_eject_duration Maximum number of seconds a server is ejected.
+        @param initial_latency Latency in seconds assumed for servers that
+            have not been measured yet, or None to assume the mean latency of
+            the measured servers.
+        @param read_after_write Number of seconds after a write during which
+            reads are sent to the primary server, or 0 to spread them across
+            all servers at all times.
+        """
+        self.endpoints = [Endpoint(x) for x in urls]
+        self.smoothing = smoothing
+        self.eject_after = eject_after
+        self.eject_duration = eject_duration
+        self.max_eject_duration = max_eject_duration
+        self.initial_latency = initial_latency
+        self.read_after_write = read_after_write
+        self._reset_after_fork()
+
+    def _reset_after_fork(self):
+        """!
+        @brief Forget requests in flight, ejections and recent writes, and
+        create a new lock. Called after unpickling, and in child processes
+        after os.fork().
+        """
+        self._lock = threading.Lock()
+        self._primary_until = 0.0
+        for endpoint in self.endpoints:
+            endpoint.in_flight = 0
+            endpoint.ejected_until = 0.0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        # Monotonic times are meaningless in other processes
+        del state['_primary_until']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_after_fork()
+
+    def _prior_latency(self):
+        """!
+        @brief Return the latency assumed for servers that have not been measured yet.
+        """
+        if self.initial_latency is not None:
+            return self.initial_latency
+        measured = [x.latency for x in self.endpoints if x.latency is not None]
+        if not measured:
+            # Only the number of requests in flight matters
+            return 1.0
+        return sum(measured) / len(measured)
+
+    def _score(self, endpoint, prior):
+        """!
+        @brief Return the expected cost of sending a request to a server,
+        where lower is better, and unmeasured servers win ties.
+        """
+        latency = prior if endpoint.latency is None else endpoint.latency
+        return (latency * (endpoint.in_flight + 1), endpoint.latency is not None)
+
+    def record_write(self):
+        """!
+        @brief Send reads to the primary server for the next `read_after_write` seconds.
+        """
+        if self.read_after_write:
+            with self._lock:
+                self._primary_until = max(self._primary_until, time.monotonic() + self.read_after_write)
+
+    def choose(self):
+        """!
+        @brief Choose a server for a request, and count the request as in
+        flight until finish() is called.
+        @returns An Endpoint object.
+        """
+        now = time.monotonic()
+        with self._lock:
+            healthy = [x for x in self.endpoints if x.ejected_until <= now]
+            if not healthy:
+                healthy = [min(self.endpoints, key=lambda x: x.ejected_until)]
+            if now < self._primary_until and self.endpoints[0] in healthy:
+                endpoint = self.endpoints[0]
+            else:
+                prior = self._prior_latency()
+                endpoint = min(healthy, key=lambda x: self._score(x, prior))
+            endpoint.in_flight += 1
+            return endpoint
+
+    def finish(self, endpoint, latency, ok):
+        """!
+        @brief Record the outcome of a request sent to a server chosen by choose().
+        @param endpoint The Endpoint object returned by choose().
+        @param latency Number of seconds the request took, or None if the
+            request was not sent after all.
+        @param ok False if the request failed because of the server.
+        """
+        with self._lock:
+            endpoint.in_flight -= 1
+            if latency is None:
+                return
+            if ok:
+                if endpoint.latency is None:
+                    endpoint.latency = latency
+                else:
+                    endpoint.latency += self.smoothing * (latency - endpoint.latency)
+                endpoint.failures = 0
+                endpoint.ejections = 0
+                return
+            endpoint.failures += 1
+            if endpoint.failures < self.eject_after:
+                return
+            duration = min(self.max_eject_duration, self.eject_duration * 2 ** endpoint.ejections)
+            endpoint.ejected_until = time.monotonic() + duration
+            endpoint.ejections += 1
+        logging.warning('%s failed %d requests in a row, not used for %.0f seconds' % (
+            endpoint.url, endpoint.failures, duration))
+
+    def stats(self):
+        """!
+        @brief Return a list of dictionaries describing the state of each server.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                'url': x.url,
+                'latency': x.latency,
+                'in_flight': x.in_flight,
+                'failures': x.failures,
+                'ejected': x.ejected_until > now,
+            } for x in self.endpoints]
+
+    def __repr__(self):
+        return '<EndpointRouter %s>' % ', '.join(x.url for x in self.endpoints)
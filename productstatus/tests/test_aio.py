@@ -0,0 +1,367 @@
+import unittest
+import datetime
+import json
+import pickle
+
+import productstatus.api
+import productstatus.exceptions
+import productstatus.limiter
+import productstatus.profiler
+import productstatus.retry
+
+try:
+    import aiohttp.web
+    import aiohttp.test_utils
+    import productstatus.aio
+except ImportError:
+    aiohttp = None
+
+try:
+    import numpy
+    import productstatus.columnar
+except ImportError:
+    numpy = None
+
+
+FOO_SCHEMA = {
+    'allowed_list_http_methods': ['get', 'post'],
+    'fields': {
+        'id': {'type': 'string', 'readonly': False, 'nullable': False},
+        'resource_uri': {'type': 'string', 'readonly': True, 'nullable': False},
+        'slug': {'type': 'string', 'readonly': False, 'nullable': False},
+        'number': {'type': 'integer', 'readonly': False, 'nullable': True},
+        'created': {'type': 'datetime', 'readonly': False, 'nullable': False},
+        'bar': {'type': 'related', 'related_type': 'to_one', 'readonly': False, 'nullable': True},
+    },
+}
+
+FOO_OBJECTS = [
+    {
+        'id': '66340f0b-2c2c-436d-a077-3d939f4f7283',
+        'slug': 'foo',
+        'number': 1,
+        'created': '2015-01-01T10:00:00Z',
+        'resource_uri': '/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/',
+        'bar': '/api/v1/foo/8a3c4389-8911-452e-b06b-dd7238c787a5/',
+    },
+    {
+        'id': '8a3c4389-8911-452e-b06b-dd7238c787a5',
+        'slug': 'bar',
+        'number': 2,
+        'created': '2015-01-01T11:00:00Z',
+        'resource_uri': '/api/v1/foo/8a3c4389-8911-452e-b06b-dd7238c787a5/',
+        'bar': None,
+    },
+]
+
+
+def make_app(requests_, failures=None):
+    """!
+    @brief Return an aiohttp application serving a minimal Productstatus API,
+    recording all requests in `requests_`. Requests for single resources are
+    answered with the status codes in `failures` first, if given.
+    """
+    async def record(request):
+        requests_.append((request.method, request.path, request.query_string, await request.text()))
+
+    async def root(request):
+        await record(request)
+        return aiohttp.web.json_response({'foo': {'list_endpoint': '/api/v1/foo/', 'schema': '/api/v1/foo/schema/'}})
+
+    async def schema(request):
+        await record(request)
+        return aiohttp.web.json_response(FOO_SCHEMA)
+
+    async def list_(request):
+        await record(request)
+        objects = FOO_OBJECTS
+        if 'slug' in request.query:
+            objects = [x for x in objects if x['slug'] == request.query['slug']]
+        if 'slug__in' in request.query:
+            objects = [x for x in objects if x['slug'] in request.query['slug__in'].split(',')]
+        offset = int(request.query.get('offset', 0))
+        return aiohttp.web.json_response({
+            'meta': {'limit': 1, 'offset': offset, 'total_count': len(objects)},
+            'objects': objects[offset:offset + 1],
+        })
+
+    async def create(request):
+        await record(request)
+        return aiohttp.web.Response(status=201, headers={'Location': FOO_OBJECTS[0]['resource_uri']})
+
+    async def bulk(request):
+        await record(request)
+        return aiohttp.web.Response(status=202)
+
+    async def detail(request):
+        await record(request)
+        if failures:
+            return aiohttp.web.Response(status=failures.pop(0))
+        for item in FOO_OBJECTS:
+            if item['id'] == request.match_info['id']:
+                if request.method == 'PATCH':
+                    return aiohttp.web.Response(status=202)
+                return aiohttp.web.json_response(item)
+        return aiohttp.web.Response(status=404, text='Not found')
+
+    app = aiohttp.web.Application()
+    app.router.add_get('/api/v1/', root)
+    app.router.add_get('/api/v1/foo/schema/', schema)
+    app.router.add_get('/api/v1/foo/', list_)
+    app.router.add_post('/api/v1/foo/', create)
+    app.router.add_patch('/api/v1/foo/', bulk)
+    app.router.add_route('*', '/api/v1/foo/{id}/', detail)
+    return app
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class AsyncApiTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+        self.server = aiohttp.test_utils.TestServer(make_app(self.requests))
+        await self.server.start_server()
+        self.api = productstatus.aio.AsyncApi(str(self.server.make_url('/')))
+        await self.api.__aenter__()
+
+    async def asyncTearDown(self):
+        await self.api.__aexit__(None, None, None)
+        await self.server.close()
+
+    async def test_fetch(self):
+        """!
+        @brief Test that resources are fetched and converted into proper types.
+        """
+        resource = self.api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283']
+        await resource.fetch()
+        self.assertEqual(resource.number, 1)
+        self.assertIsInstance(resource.created, datetime.datetime)
+        self.assertIsInstance(resource.bar, productstatus.aio.AsyncResource)
+        with self.assertRaises(productstatus.exceptions.ProductstatusException):
+            resource.bar.number
+        await resource.bar.fetch()
+        self.assertEqual(resource.bar.number, 2)
+
+    async def test_fetch_not_found(self):
+        resource = self.api.foo['00000000-0000-0000-0000-000000000000']
+        with self.assertRaises(productstatus.exceptions.ResourceNotFoundException):
+            await resource.fetch()
+
+    async def test_async_iteration(self):
+        """!
+        @brief Test that query sets can be iterated across pages with `async for`.
+        """
+        qs = self.api.foo.objects.filter(number__gte=1)
+        resources = [x async for x in qs]
+        self.assertEqual([x.number for x in resources], [1, 2])
+        self.assertEqual(await qs.count(), 2)
+        self.assertEqual((await qs.get(1)).slug, 'bar')
+
+    async def test_pickle_api(self):
+        """!
+        @brief Test that AsyncApi objects can be pickled while their aiohttp
+        session is open, and create a new session after unpickling and in
+        child processes.
+        """
+        await self.api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283'].fetch()
+        api = pickle.loads(pickle.dumps(self.api))
+        self.assertIsNone(api._session)
+        self.assertEqual(api.foo.schema, FOO_SCHEMA)
+        resource = await api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283'].fetch()
+        self.assertEqual(resource.number, 1)
+        session = api._session
+        api._reset_after_fork()
+        self.assertIsNone(api._session)
+        await session.close()
+
+    async def test_slug(self):
+        resource = await self.api.foo.get('bar')
+        self.assertEqual(resource.id, '8a3c4389-8911-452e-b06b-dd7238c787a5')
+        with self.assertRaises(productstatus.exceptions.ResourceNotFoundException):
+            await self.api.foo.get('baz')
+
+    async def test_save(self):
+        """!
+        @brief Test that resources are created and updated.
+        """
+        await self.api.foo.load_schema()
+        resource = self.api.foo.create()
+        resource.number = 3
+        await resource.save()
+        self.assertEqual(resource.resource_uri, FOO_OBJECTS[0]['resource_uri'])
+        resource.number = 4
+        await resource.save()
+        methods = [(x[0], x[1], x[3]) for x in self.requests if x[0] != 'GET']
+        self.assertEqual(methods[0][:2], ('POST', '/api/v1/foo/'))
+        self.assertEqual(methods[1], ('PATCH', FOO_OBJECTS[0]['resource_uri'], json.dumps({'number': 4})))
+
+    async def test_bulk_save(self):
+        """!
+        @brief Test that resources are saved with a single PATCH request, and
+        that coroutine functions can be lazily evaluated.
+        """
+        await self.api.foo.load_schema()
+        self.api.foo.schema['allowed_list_http_methods'] = ['get', 'post', 'patch']
+
+        async def get_bar():
+            return await self.api.foo.get('bar')
+
+        resources = [self.api.foo.create(), self.api.foo.create()]
+        resources[0].number = 3
+        resources[1].number = 4
+        resources[1].bar = productstatus.api.EvaluatedResource(get_bar)
+        self.assertEqual(await self.api.foo.bulk_save(resources), resources)
+        patches = [x for x in self.requests if x[0] == 'PATCH']
+        self.assertEqual(len(patches), 1)
+        objects = json.loads(patches[0][3])['objects']
+        self.assertEqual([x['number'] for x in objects], [3, 4])
+        self.assertEqual(objects[1]['bar'], FOO_OBJECTS[1]['resource_uri'])
+        for resource, data in zip(resources, objects):
+            self.assertEqual(resource.resource_uri, '/api/v1/foo/%s/' % data['id'])
+
+    async def test_bulk_save_single(self):
+        """!
+        @brief Test that resources are saved with concurrent requests when the
+        server does not allow bulk PATCH requests, and that validation errors
+        are reported by argument position.
+        """
+        await self.api.foo.load_schema()
+        resources = [self.api.foo.create(), self.api.foo.create()]
+        resources[0].number = 3
+        resources[1].number = 4
+        await self.api.foo.bulk_save(resources)
+        self.assertEqual([x[:2] for x in self.requests if x[0] != 'GET'], [('POST', '/api/v1/foo/')] * 2)
+        resources.append(self.api.foo.create())
+        resources[2].number = 'five'
+        with self.assertRaisesRegex(productstatus.exceptions.ValidationException, r'\[2\] number'):
+            await self.api.foo.bulk_save(resources)
+
+    async def test_find_or_create_many(self):
+        """!
+        @brief Test that identical parameters are searched for once, and that
+        missing resources are created.
+        """
+        resources = await self.api.foo.find_or_create_many([{'slug': 'bar'}, {'slug': 'baz'}, {'slug': 'bar'}])
+        self.assertEqual(resources[0].id, FOO_OBJECTS[1]['id'])
+        self.assertIs(resources[0], resources[2])
+        self.assertEqual(resources[1].resource_uri, FOO_OBJECTS[0]['resource_uri'])
+        searches = [x for x in self.requests if x[:2] == ('GET', '/api/v1/foo/')]
+        self.assertEqual(len(searches), 2)
+        self.assertEqual([x[:2] for x in self.requests if x[0] != 'GET'], [('POST', '/api/v1/foo/')])
+
+    async def test_find_or_create_many_batched(self):
+        """!
+        @brief Test that searches for values of a field allowing `__in`
+        filters are batched.
+        """
+        await self.api.foo.load_schema()
+        self.api.foo.schema['filtering'] = {'slug': 1}
+        resources = await self.api.foo.find_or_create_many([{'slug': 'bar'}, {'slug': 'baz'}, {'slug': 'bar'}])
+        self.assertEqual(resources[0].id, FOO_OBJECTS[1]['id'])
+        self.assertIs(resources[0], resources[2])
+        searches = [x[2] for x in self.requests if x[:2] == ('GET', '/api/v1/foo/')]
+        self.assertEqual(len(searches), 1)
+        self.assertIn('slug__in=bar,baz', searches[0])
+        self.assertEqual([x[:2] for x in self.requests if x[0] != 'GET'], [('POST', '/api/v1/foo/')])
+
+    async def test_delete(self):
+        """!
+        @brief Test that all matching resources are deleted, one request at a
+        time when bulk deletes are not allowed.
+        """
+        report = await self.api.foo.objects.filter(number__gte=1).delete()
+        self.assertEqual(report.deleted, 2)
+        self.assertEqual(report.failed, [])
+        deletes = sorted(x[1] for x in self.requests if x[0] == 'DELETE')
+        self.assertEqual(deletes, sorted(x['resource_uri'] for x in FOO_OBJECTS))
+
+    async def test_sync_only(self):
+        """!
+        @brief Test that members only available in the synchronous client
+        raise an exception explaining so.
+        """
+        for obj, name in [(self.api, 'session'), (self.api, 'deadline'), (self.api.foo.objects, 'parallel_map')]:
+            self.assertFalse(hasattr(obj, name))
+            with self.assertRaisesRegex(AttributeError, 'not available in the asyncio client'):
+                getattr(obj, name)
+        with self.assertRaises(productstatus.exceptions.ProductstatusException):
+            productstatus.profiler.PhaseProfiler(self.api)
+
+    async def test_unsupported_options(self):
+        """!
+        @brief Test that options of the synchronous client which the asyncio
+        client does not support raise an exception.
+        """
+        url = str(self.server.make_url('/'))
+        with self.assertRaisesRegex(productstatus.exceptions.ProductstatusException, 'limit_per_host'):
+            productstatus.aio.AsyncApi(url, limiter=productstatus.limiter.AdaptiveLimiter())
+        with self.assertRaisesRegex(productstatus.exceptions.ProductstatusException, 'hedge'):
+            productstatus.aio.AsyncApi(url, retry=productstatus.retry.RetryPolicy(max_attempts=2, hedge_percentile=95))
+
+    async def test_retry(self):
+        """!
+        @brief Test that failed requests are retried according to the retry policy.
+        """
+        failures = [503, 503]
+        requests_ = []
+        server = aiohttp.test_utils.TestServer(make_app(requests_, failures))
+        await server.start_server()
+        retry = productstatus.retry.RetryPolicy(max_attempts=3, backoff=0.01)
+        try:
+            async with productstatus.aio.AsyncApi(str(server.make_url('/')), retry=retry) as api:
+                resource = api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283']
+                await resource.fetch()
+                self.assertEqual(resource.slug, 'foo')
+                stats = api.stats()
+                failures.extend([503, 503, 503])
+                with self.assertRaises(productstatus.exceptions.ServiceUnavailableException):
+                    await api.foo['8a3c4389-8911-452e-b06b-dd7238c787a5'].fetch()
+        finally:
+            await server.close()
+        details = [x for x in requests_ if x[1] in ['/api/v1/foo/%s/' % item['id'] for item in FOO_OBJECTS]]
+        self.assertEqual(len(details), 6)
+        self.assertEqual(stats['totals']['retries'], 2)
+
+    async def test_replicas(self):
+        """!
+        @brief Test that reads are sent to the fastest server, and to the
+        primary server right after a write.
+        """
+        replica_requests = []
+        replica = aiohttp.test_utils.TestServer(make_app(replica_requests))
+        await replica.start_server()
+        urls = [str(self.server.make_url('/')), str(replica.make_url('/'))]
+        try:
+            async with productstatus.aio.AsyncApi(urls) as api:
+                await api.foo.load_schema()
+                api._router.endpoints[0].latency = 10.0
+                api._router.endpoints[1].latency = 0.0
+                del self.requests[:]
+                resource = api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283']
+                await resource.fetch()
+                self.assertEqual(self.requests, [])
+                self.assertEqual(replica_requests[-1][:2], ('GET', '/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/'))
+                resource.number = 3
+                await resource.save()
+                await api.foo['8a3c4389-8911-452e-b06b-dd7238c787a5'].fetch()
+                self.assertEqual([x[:2] for x in self.requests], [
+                    ('PATCH', '/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/'),
+                    ('GET', '/api/v1/foo/8a3c4389-8911-452e-b06b-dd7238c787a5/'),
+                ])
+                self.assertEqual([x.in_flight for x in api._router.endpoints], [0, 0])
+        finally:
+            await replica.close()
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    async def test_columnar_export(self):
+        await self.api.foo.load_schema()
+        with self.assertRaisesRegex(productstatus.exceptions.ProductstatusException, 'to_columns'):
+            productstatus.columnar.to_numpy(self.api.foo.objects, ['number'])
+
+    async def test_stats(self):
+        """!
+        @brief Test that requests are counted in the API metrics.
+        """
+        await self.api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283'].fetch()
+        stats = self.api.stats()
+        self.assertEqual(stats['totals']['count'], len(self.requests))
+        self.assertIsNone(stats['limiter'])
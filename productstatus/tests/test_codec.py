@@ -0,0 +1,53 @@
+import unittest
+import json
+
+import productstatus.codec
+
+
+DOCUMENT = {
+    "id": "66340f0b-2c2c-436d-a077-3d939f4f7283",
+    "resource_uri": "/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/",
+    "name": "Blåbær",
+    "number": 1,
+    "float": 0.1,
+    "list": [1, None, True, False],
+    "null": None,
+}
+
+
+class CodecTest(unittest.TestCase):
+    def tearDown(self):
+        productstatus.codec.set_backend()
+
+    def test_loads_bytes(self):
+        """!
+        @brief Test that all available backends decode bytes identically to the standard library.
+        """
+        data = json.dumps(DOCUMENT).encode('UTF-8')
+        for backend in productstatus.codec.DECODERS.keys():
+            productstatus.codec.set_backend(backend)
+            self.assertEqual(productstatus.codec.loads(data), DOCUMENT)
+
+    def test_dumps_identical(self):
+        """!
+        @brief Test that all available backends encode identically to the standard library.
+        """
+        for backend in productstatus.codec.DECODERS.keys():
+            productstatus.codec.set_backend(backend)
+            self.assertEqual(productstatus.codec.dumps(DOCUMENT, sort_keys=True),
+                             json.dumps(DOCUMENT, sort_keys=True))
+            self.assertEqual(productstatus.codec.dumps(DOCUMENT),
+                             json.dumps(DOCUMENT))
+
+    def test_loads_invalid(self):
+        """!
+        @brief Test that invalid data raises ValueError regardless of backend.
+        """
+        for backend in productstatus.codec.DECODERS.keys():
+            productstatus.codec.set_backend(backend)
+            with self.assertRaises(ValueError):
+                productstatus.codec.loads(b'{invalid')
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            productstatus.codec.set_backend('foo')
@@ -0,0 +1,88 @@
+import unittest
+import httmock
+import json
+
+import productstatus.api
+
+try:
+    import numpy
+    import productstatus.columnar
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+BASE_URL = 'http://192.168.254.254'
+
+
+@httmock.urlmatch(path=r'^/api/v1/$')
+def req_schema(url, request):
+    return json.dumps({
+        'foo': {'list_endpoint': '/api/v1/foo/', 'schema': '/api/v1/foo/schema/'},
+    }).encode('UTF-8')
+
+
+@httmock.urlmatch(path=r'^/api/v1/foo/schema/$')
+def req_foo_schema(url, request):
+    return json.dumps({
+        'fields': {
+            'id': {'type': 'string', 'readonly': False, 'nullable': False},
+            'number': {'type': 'integer', 'readonly': False, 'nullable': True},
+            'created': {'type': 'datetime', 'readonly': False, 'nullable': True},
+            'bar': {'type': 'related', 'related_type': 'to_one', 'readonly': False, 'nullable': True},
+        },
+    }).encode('UTF-8')
+
+
+@httmock.urlmatch(path=r'^/api/v1/foo/$')
+def req_foo_list(url, request):
+    offset = int(dict(x.split('=') for x in url.query.split('&'))['offset'])
+    objects = [
+        {'id': 'a', 'number': 1, 'created': '2015-01-01T10:00:00Z', 'bar': '/api/v1/foo/b/'},
+        {'id': 'b', 'number': 2, 'created': '2015-01-01T12:00:00+0100', 'bar': None},
+        {'id': 'c', 'number': None, 'created': None, 'bar': '/api/v1/foo/b/'},
+    ]
+    return json.dumps({
+        'meta': {'limit': 2, 'offset': offset, 'total_count': len(objects)},
+        'objects': objects[offset:offset + 2],
+    }).encode('UTF-8')
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class ColumnarTest(unittest.TestCase):
+    def setUp(self):
+        self.api = productstatus.api.Api(BASE_URL)
+        with httmock.HTTMock(req_schema, req_foo_schema):
+            self.qs = self.api.foo.objects
+            self.api.foo.schema
+
+    def test_to_numpy(self):
+        """!
+        @brief Test that QuerySets are exported into typed NumPy arrays across pages.
+        """
+        with httmock.HTTMock(req_foo_list):
+            columns = productstatus.columnar.to_numpy(self.qs, ['id', 'number', 'created', 'bar'])
+        self.assertEqual(list(columns['id']), ['a', 'b', 'c'])
+        self.assertEqual(columns['number'][0], 1.0)
+        self.assertTrue(numpy.isnan(columns['number'][2]))
+        self.assertEqual(columns['created'].dtype, numpy.dtype('datetime64[s]'))
+        self.assertEqual(columns['created'][1], numpy.datetime64('2015-01-01T11:00:00'))
+        self.assertTrue(numpy.isnat(columns['created'][2]))
+        self.assertEqual(list(columns['bar'].codes), [0, -1, 0])
+        self.assertEqual(list(columns['bar'].categories), ['/api/v1/foo/b/'])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_to_arrow(self):
+        """!
+        @brief Test that QuerySets are exported into an Arrow table with one batch per page.
+        """
+        with httmock.HTTMock(req_foo_list):
+            table = productstatus.columnar.to_arrow(self.qs, ['number', 'created', 'bar'])
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.column('number').to_pylist(), [1, 2, None])
+        self.assertEqual(table.column('created').null_count, 1)
+        self.assertEqual(table.column('bar').to_pylist(), ['/api/v1/foo/b/', None, '/api/v1/foo/b/'])
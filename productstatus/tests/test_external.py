@@ -4,9 +4,19 @@ import mock
 import datetime
 import dateutil.tz
 import json
+import threading
+import pickle
+import urllib.parse
+import sys
+import warnings
 
 import productstatus.api
 import productstatus.exceptions
+import productstatus.retry
+import productstatus.limiter
+import productstatus.metrics
+import productstatus.lazyload
+import productstatus.unitofwork
 
 
 BASE_URL = 'http://192.168.254.254'
@@ -65,12 +75,19 @@ def req_put_foo_resource(url, request):
     }
 
 
+@httmock.urlmatch(method='patch', path=r'^/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/$')
+def req_patch_foo_resource(url, request):
+    return {
+        'status_code': 202
+    }
+
+
 @httmock.urlmatch(path=r'^/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/$')
 def req_foo_resource(url, request):
     return bytes(json.dumps(foo_unserialized).encode('UTF-8'))
 
 
-@httmock.urlmatch(path=r'^/api/v1/foo/$', query=r'foo=bar(&offset=0)?$')
+@httmock.urlmatch(path=r'^/api/v1/foo/$', query=r'foo=bar(&limit=\d+)?(&offset=0)?$')
 def req_filter_foo_resource(url, request):
     return b"""
     {
@@ -138,7 +155,7 @@ def req_search_foo_slug_resource_no_results(url, request):
     """
 
 
-@httmock.urlmatch(path=r'^/api/v1/foo/$', query=r'foo=bar&offset=1?$')
+@httmock.urlmatch(path=r'^/api/v1/foo/$', query=r'foo=bar(&limit=\d+)?&offset=1?$')
 def req_filter_foo_resource_page2(url, request):
     return b"""
     {
@@ -273,6 +290,17 @@ def req_foo_schema(url, request):
     """
 
 
+def resource_number_and_year(resource):
+    """!
+    @brief Function run in worker processes by QuerySet.parallel_map() tests.
+    """
+    return (resource.number, resource.created.year)
+
+
+def resource_fail(resource):
+    raise RuntimeError('failed on %s' % resource.id)
+
+
 class ExternalTest(unittest.TestCase):
     def setUp(self):
         self.api = productstatus.api.Api(BASE_URL, verify_ssl=False)
@@ -338,16 +366,100 @@ class ExternalTest(unittest.TestCase):
             resource.save()
             self.assertEqual(resource.text, 'baz')
 
-    def test_put_resource(self):
+    def test_patch_resource(self):
         """
         Test that resource members can be updated.
         """
         resource = self.api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283']
-        with httmock.HTTMock(req_put_foo_resource, req_foo_resource, req_bar_resource, req_foo_schema):
+        with httmock.HTTMock(req_patch_foo_resource, req_foo_resource, req_bar_resource, req_foo_schema):
             resource.text = 'baz'
             resource.save()
             self.assertEqual(resource.text, 'baz')
 
+    def test_patch_dirty_fields(self):
+        """!
+        @brief Test that updates send only changed fields in a single PATCH
+        request, and that the local values are kept after saving.
+        """
+        requests_ = []
+
+        @httmock.all_requests
+        def req_record(url, request):
+            requests_.append(request)
+            return req_patch_foo_resource(url, request)
+
+        with httmock.HTTMock(req_foo_schema):
+            self.api.foo.schema
+        resource = self.api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283']
+        with httmock.HTTMock(req_record):
+            resource.text = 'qux'
+            resource.number = 2
+            resource.save()
+            self.assertEqual(resource.text, 'qux')
+            self.assertEqual(resource.number, 2)
+        self.assertEqual(len(requests_), 1)
+        self.assertEqual(requests_[0].method, 'PATCH')
+        self.assertEqual(json.loads(requests_[0].body), {'text': 'qux', 'number': 2})
+
+    def test_patch_fields_changed_in_place(self):
+        """!
+        @brief Test that list and dict values changed in place are saved,
+        and that values which are only read are not.
+        """
+        requests_ = []
+
+        @httmock.urlmatch(method='get', path=r'^/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/$')
+        def req_get(url, request):
+            return json.dumps(dict(foo_unserialized, extra={'a': 1}, tags=['x']))
+
+        @httmock.urlmatch(method='patch')
+        def req_patch(url, request):
+            requests_.append(json.loads(request.body))
+            return {'status_code': 202}
+
+        with httmock.HTTMock(req_foo_schema):
+            fields = self.api.foo.schema['fields']
+            fields['extra'] = dict(fields['text'], type='dict', blank=True, nullable=True)
+            fields['tags'] = dict(fields['text'], type='list', blank=True, nullable=True)
+        resource = self.api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283']
+        with httmock.HTTMock(req_get, req_patch):
+            self.assertEqual(resource.tags, ['x'])
+            resource.extra['b'] = 2
+            self.assertTrue(resource._needs_save())
+            resource.save()
+            self.assertFalse(resource._needs_save())
+            resource.save()
+            resource.tags.append('y')
+            resource.text = 'qux'
+            resource.save()
+        self.assertEqual(requests_, [
+            {'extra': {'a': 1, 'b': 2}},
+            {'tags': ['x', 'y'], 'text': 'qux'},
+        ])
+
+    def test_patch_refresh_from_response(self):
+        """!
+        @brief Test that resources are refreshed from the response body of a PATCH request.
+        """
+        with httmock.HTTMock(req_foo_schema):
+            resource = self.api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283']
+            resource.number = 5
+        with httmock.HTTMock(req_foo_resource):
+            resource.save()
+        with httmock.HTTMock(req_500):
+            self.assertEqual(resource.number, 1)
+            self.assertEqual(resource.text, 'baz')
+
+    def test_unsaved_changes_survive_fetch(self):
+        """!
+        @brief Test that unsaved local changes are kept when the rest of the resource is fetched.
+        """
+        with httmock.HTTMock(req_foo_schema, req_foo_resource):
+            resource = self.api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283']
+            resource.text = 'qux'
+            self.assertEqual(resource.number, 1)
+            self.assertEqual(resource.text, 'qux')
+
     def test_serialize_resource(self):
         """
         Test that resources are properly serialized.
@@ -548,6 +660,1034 @@ class ExternalTest(unittest.TestCase):
             func = mock.MagicMock(return_value=relation)
             lazy = productstatus.api.EvaluatedResource(func)
             resource = self.api.foo.create()
+            resource.text = 'baz'
             resource.bar = lazy.resource
             resource.save()
             self.assertEqual(resource.bar.id, relation.id)
+
+    def test_queryset_to_columns(self):
+        """!
+        @brief Test that all pages of a QuerySet can be exported as columns of raw values.
+        """
+        with httmock.HTTMock(req_schema):
+            qs = self.api.foo.objects
+        qs.filter(foo='bar')
+        with httmock.HTTMock(req_filter_foo_resource, req_filter_foo_resource_page2, req_foo_schema):
+            columns = qs.to_columns(['number', 'created', 'bar'])
+        self.assertEqual(columns['number'], [1, 5])
+        self.assertEqual(columns['created'], ['2015-01-01T10:00:00Z', '2015-01-01T10:00:00Z'])
+        self.assertEqual(columns['bar'], ['/api/v1/foo/8a3c4389-8911-452e-b06b-dd7238c787a5/'] * 2)
+
+    def test_queryset_to_columns_invalid_field(self):
+        """!
+        @brief Test that exporting a field that does not exist in the schema raises an exception.
+        """
+        with httmock.HTTMock(req_schema, req_foo_schema):
+            qs = self.api.foo.objects
+            with self.assertRaises(KeyError):
+                qs.to_columns(['nonexistent'])
+
+    def test_validate_invalid_type(self):
+        """!
+        @brief Test that resources with invalid data are rejected before being sent to the server.
+        """
+        with httmock.HTTMock(req_foo_schema, req_500):
+            resource = self.api.foo.create()
+            resource.number = 'one'
+            with self.assertRaises(productstatus.exceptions.ValidationException):
+                resource.save()
+
+    def test_validate_not_nullable(self):
+        """!
+        @brief Test that null values are rejected for non-nullable fields.
+        """
+        with httmock.HTTMock(req_foo_schema, req_500):
+            resource = self.api.foo.create()
+            resource.text = None
+            with self.assertRaises(productstatus.exceptions.ValidationException):
+                resource.save()
+            resource.bar = None
+            resource.text = 'baz'
+            resource.validate()
+
+    def test_validate_batch(self):
+        """!
+        @brief Test that a batch of resources can be validated at once.
+        """
+        with httmock.HTTMock(req_foo_schema):
+            valid = self.api.foo.create()
+            valid.text = 'baz'
+            valid.number = 1
+            invalid = self.api.foo.create()
+            invalid.text = 'baz'
+            invalid.number = True
+            self.api.foo.validate([valid])
+            with self.assertRaisesRegex(productstatus.exceptions.ValidationException, r'\[1\] number'):
+                self.api.foo.validate([valid, invalid])
+
+    def test_validator_constraints(self):
+        """!
+        @brief Test that max length and choices constraints are validated when present in the schema.
+        """
+        validate = productstatus.api._compile_validator({
+            'type': 'string',
+            'nullable': False,
+            'max_length': 3,
+            'choices': [['foo', 'Foo'], ['ba', 'Ba']],
+        })
+        self.assertIsNone(validate('foo'))
+        self.assertIsNotNone(validate('fooo'))
+        self.assertIsNotNone(validate('bar'))
+        self.assertIsNotNone(validate(None))
+
+    def test_validate_required(self):
+        """!
+        @brief Test that new resources missing a required field are rejected,
+        while fields with defaults, and fields of existing resources, may be left out.
+        """
+        with httmock.HTTMock(req_foo_schema, req_500):
+            resource = self.api.foo.create()
+            resource.number = 1
+            with self.assertRaisesRegex(productstatus.exceptions.ValidationException, 'text: required field is missing'):
+                resource.save()
+            with self.assertRaisesRegex(productstatus.exceptions.ValidationException, r'\[0\] text'):
+                self.api.foo.bulk_save([resource])
+            resource.text = 'baz'
+            resource.validate()
+            existing = self.api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283']
+            existing.number = 2
+            existing._prepare_save()
+
+    def test_validator_conversions(self):
+        """!
+        @brief Test that numeric values converted by the server are accepted.
+        """
+        validate = productstatus.api._compile_validator({'type': 'integer', 'nullable': False})
+        self.assertIsNone(validate(2))
+        self.assertIsNone(validate(2.0))
+        self.assertIsNone(validate('2'))
+        self.assertIsNotNone(validate(2.5))
+        self.assertIsNotNone(validate('two'))
+        self.assertIsNotNone(validate(True))
+        validate = productstatus.api._compile_validator({'type': 'float', 'nullable': False})
+        self.assertIsNone(validate('2.5'))
+        self.assertIsNotNone(validate('two'))
+
+    def test_bulk_save(self):
+        """!
+        @brief Test that new and changed resources are saved with a single
+        PATCH request to the list endpoint, and that new resources get URIs.
+        """
+        requests_ = []
+
+        @httmock.urlmatch(method='patch', path=r'^/api/v1/foo/$')
+        def req_patch_list(url, request):
+            requests_.append(request)
+            return {'status_code': 202}
+
+        with httmock.HTTMock(req_foo_schema):
+            self.api.foo.schema
+        new = [self.api.foo.create() for x in range(3)]
+        for index, resource in enumerate(new):
+            resource.text = 'baz'
+            resource.number = index
+        existing = self.api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283']
+        existing.text = 'qux'
+        with httmock.HTTMock(req_patch_list):
+            self.api.foo.bulk_save(new + [existing])
+        self.assertEqual(len(requests_), 1)
+        objects = json.loads(requests_[0].body)['objects']
+        self.assertEqual([x.get('number') for x in objects], [0, 1, 2, None])
+        self.assertEqual(objects[3], {'text': 'qux', 'resource_uri': existing.resource_uri})
+        for resource in new:
+            self.assertEqual(resource.resource_uri, '/api/v1/foo/%s/' % resource.id)
+
+    def test_bulk_save_chunks(self):
+        """!
+        @brief Test that bulk saves are split into chunks.
+        """
+        requests_ = []
+
+        @httmock.urlmatch(method='patch', path=r'^/api/v1/foo/$')
+        def req_patch_list(url, request):
+            requests_.append(request)
+            return {'status_code': 202}
+
+        with httmock.HTTMock(req_foo_schema, req_patch_list):
+            resources = [self.api.foo.create() for x in range(5)]
+            for resource in resources:
+                resource.text = 'baz'
+                resource.number = 1
+            self.api.foo.bulk_save(resources, chunk_size=2)
+        self.assertEqual([len(json.loads(x.body)['objects']) for x in requests_], [2, 2, 1])
+
+    def test_bulk_save_fallback(self):
+        """!
+        @brief Test that bulk saves fall back to single POST requests when
+        the list endpoint does not allow PATCH.
+        """
+        @httmock.urlmatch(method='patch', path=r'^/api/v1/foo/$')
+        def req_patch_list(url, request):
+            return {'status_code': 405}
+
+        with httmock.HTTMock(req_foo_schema, req_patch_list, req_post_foo_resource):
+            resources = [self.api.foo.create() for x in range(3)]
+            for resource in resources:
+                resource.text = 'baz'
+                resource.number = 1
+            self.api.foo.bulk_save(resources)
+        for resource in resources:
+            self.assertEqual(resource.resource_uri, '/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/')
+            self.assertEqual(resource._dirty, set())
+
+    def test_bulk_save_validation(self):
+        """!
+        @brief Test that no resources are saved if any of them fail validation.
+        """
+        with httmock.HTTMock(req_foo_schema, req_500):
+            resources = [self.api.foo.create() for x in range(2)]
+            resources[1].number = 'one'
+            with self.assertRaises(productstatus.exceptions.ValidationException):
+                self.api.foo.bulk_save(resources)
+
+    def test_bulk_save_validation_index(self):
+        """!
+        @brief Test that validation errors refer to the position of each
+        resource in the argument, also when unchanged resources are skipped.
+        """
+        with httmock.HTTMock(req_foo_schema, req_500):
+            unchanged = self.api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283']
+            invalid = self.api.foo.create()
+            invalid.text = 'baz'
+            invalid.number = 'one'
+            with self.assertRaisesRegex(productstatus.exceptions.ValidationException, r'\[1\] number'):
+                self.api.foo.bulk_save([unchanged, invalid])
+
+    def test_session_dependency_order(self):
+        """!
+        @brief Test that sessions save resources after the resources they refer to.
+        """
+        requests_ = []
+
+        @httmock.urlmatch(method='patch', path=r'^/api/v1/foo/$')
+        def req_patch_list(url, request):
+            requests_.append(json.loads(request.body)['objects'])
+            return {'status_code': 202}
+
+        with httmock.HTTMock(req_foo_schema):
+            self.api.foo.schema
+        with httmock.HTTMock(req_patch_list):
+            with self.api.session() as session:
+                child = self.api.foo.create()
+                parent = self.api.foo.create()
+                grandchild = self.api.foo.create()
+                grandchild.bar = productstatus.api.EvaluatedResource(lambda x: x, child)
+                child.bar = parent
+                parent.number = 1
+                for resource in [child, parent, grandchild]:
+                    resource.text = 'baz'
+            self.assertEqual(len(requests_), 3)
+        self.assertEqual(requests_[0][0]['number'], 1)
+        self.assertEqual(requests_[1][0]['bar'], parent.resource_uri)
+        self.assertEqual(requests_[2][0]['bar'], child.resource_uri)
+
+    def test_session_unchanged_reference(self):
+        """!
+        @brief Test that sessions save unsaved resources that are referred to,
+        even if none of their fields have been set.
+        """
+        requests_ = []
+
+        @httmock.urlmatch(method='patch', path=r'^/api/v1/foo/$')
+        def req_patch_list(url, request):
+            requests_.append(json.loads(request.body)['objects'])
+            return {'status_code': 202}
+
+        with httmock.HTTMock(req_foo_schema):
+            self.api.foo.schema['fields']['text']['blank'] = True
+        parent = self.api.foo.create()
+        with httmock.HTTMock(req_patch_list):
+            with self.api.session():
+                child = self.api.foo.create()
+                child.bar = parent
+        self.assertEqual(len(requests_), 2)
+        self.assertEqual(requests_[0], [{'id': parent.id}])
+        self.assertEqual(requests_[1][0]['bar'], parent.resource_uri)
+
+    def test_session_concurrent_level(self):
+        """!
+        @brief Test that independent resources are saved together in one bulk request.
+        """
+        requests_ = []
+
+        @httmock.urlmatch(method='patch', path=r'^/api/v1/foo/$')
+        def req_patch_list(url, request):
+            requests_.append(json.loads(request.body)['objects'])
+            return {'status_code': 202}
+
+        with httmock.HTTMock(req_foo_schema, req_patch_list):
+            with self.api.session():
+                resources = [self.api.foo.create() for x in range(4)]
+                for resource in resources:
+                    resource.text = 'baz'
+                    resource.number = 1
+        self.assertEqual([len(x) for x in requests_], [4])
+
+    def test_session_exception(self):
+        """!
+        @brief Test that sessions are not flushed when an exception is raised.
+        """
+        with httmock.HTTMock(req_foo_schema, req_500):
+            with self.assertRaises(RuntimeError):
+                with self.api.session():
+                    resource = self.api.foo.create()
+                    resource.number = 1
+                    raise RuntimeError('foo')
+            self.assertFalse(resource._has_url())
+            self.assertEqual(self.api._sessions, [])
+
+    def test_session_circular_reference(self):
+        """!
+        @brief Test that circular references between unsaved resources are detected.
+        """
+        with httmock.HTTMock(req_foo_schema, req_500):
+            with self.assertRaises(productstatus.exceptions.ProductstatusException):
+                with self.api.session():
+                    a = self.api.foo.create()
+                    b = self.api.foo.create()
+                    a.bar = b
+                    b.bar = a
+
+    def test_find_or_create_many(self):
+        """!
+        @brief Test that find_or_create_many() searches once per distinct key,
+        and creates missing resources in bulk.
+        """
+        requests_ = []
+
+        @httmock.all_requests
+        def req_record(url, request):
+            requests_.append((request.method, url.query))
+
+        @httmock.urlmatch(method='patch', path=r'^/api/v1/foo/$')
+        def req_patch_list(url, request):
+            return {'status_code': 202}
+
+        with httmock.HTTMock(req_foo_schema):
+            self.api.foo.schema
+        with httmock.HTTMock(req_record, req_patch_list, req_search_foo_slug_resource, req_search_foo_slug_resource_no_results):
+            resources = self.api.foo.find_or_create_many([
+                {'slug': 'bar'},
+                {'slug': 'notfound'},
+                {'slug': 'bar'},
+            ], extra_params={'number': 3, 'text': 'baz'})
+        self.assertEqual(sorted(requests_), [('GET', 'slug=bar'), ('GET', 'slug=notfound'), ('PATCH', '')])
+        self.assertIs(resources[0], resources[2])
+        self.assertEqual(resources[0].id, '66340f0b-2c2c-436d-a077-3d939f4f7283')
+        self.assertTrue(resources[1]._has_url())
+        self.assertEqual(resources[1].slug, 'notfound')
+        self.assertEqual(resources[1].number, 3)
+
+    def test_find_or_create_many_batched(self):
+        """!
+        @brief Test that single-field searches on fields allowing `__in`
+        filters are batched, using the first match for each value, and that
+        other searches are not.
+        """
+        requests_ = []
+        created = []
+
+        @httmock.all_requests
+        def req_record(url, request):
+            requests_.append((request.method, sorted(urllib.parse.parse_qsl(url.query))))
+
+        @httmock.urlmatch(method='get', path=r'^/api/v1/foo/$', query=r'.*slug__in=')
+        def req_search_in(url, request):
+            objects = [
+                dict(foo_unserialized, id='00000001-0000-0000-0000-000000000000', slug='bar', number=1,
+                     resource_uri='/api/v1/foo/00000001-0000-0000-0000-000000000000/'),
+                dict(foo_unserialized, id='00000002-0000-0000-0000-000000000000', slug='baz', number=2,
+                     resource_uri='/api/v1/foo/00000002-0000-0000-0000-000000000000/'),
+                dict(foo_unserialized, id='00000003-0000-0000-0000-000000000000', slug='bar', number=3,
+                     resource_uri='/api/v1/foo/00000003-0000-0000-0000-000000000000/'),
+            ]
+            return json.dumps({'meta': {'limit': 100, 'offset': 0, 'total_count': 3}, 'objects': objects})
+
+        @httmock.urlmatch(method='patch', path=r'^/api/v1/foo/$')
+        def req_patch_list(url, request):
+            created.extend(x['slug'] for x in json.loads(request.body)['objects'])
+            return {'status_code': 202}
+
+        with httmock.HTTMock(req_foo_schema):
+            self.api.foo.schema['filtering'] = {'slug': 1, 'number': ['exact']}
+        with httmock.HTTMock(req_record, req_patch_list, req_search_in, req_search_foo_slug_resource_no_results):
+            resources = self.api.foo.find_or_create_many([
+                {'slug': 'bar'},
+                {'slug': 'notfound'},
+                {'slug': 'baz'},
+                {'slug': 'bar'},
+            ], order_by='number', extra_params={'number': 4, 'text': 'baz'})
+        self.assertEqual(requests_, [
+            ('GET', [('limit', '100'), ('offset', '0'), ('order_by', 'number'), ('slug__in', 'bar,notfound,baz')]),
+            ('PATCH', []),
+        ])
+        self.assertEqual([x.number for x in resources[:1] + resources[2:]], [1, 2, 1])
+        self.assertIs(resources[0], resources[3])
+        self.assertEqual(created, ['notfound'])
+
+        @httmock.urlmatch(method='get', path=r'^/api/v1/foo/$')
+        def req_search(url, request):
+            return req_search_foo_slug_resource(url._replace(query='slug=bar'), request)
+
+        del requests_[:]
+        with httmock.HTTMock(req_record, req_search):
+            self.api.foo.find_or_create_many([{'number': 1}, {'slug': 'bar', 'number': 1}])
+        self.assertEqual(sorted(x[1] for x in requests_), [
+            [('number', '1')],
+            [('number', '1'), ('slug', 'bar')],
+        ])
+
+    def test_find_or_create_many_memo_not_found(self):
+        """!
+        @brief Test that a memoized resource that turns out to be deleted on
+        the server is removed from the find_or_create_many() cache.
+        """
+        productstatus.api.clear_find_or_create_memo()
+        with httmock.HTTMock(req_foo_schema, req_search_foo_slug_resource):
+            self.api.foo.find_or_create_many([{'slug': 'bar'}], memo=True)
+        resource = self.api.foo.find_or_create_many([{'slug': 'bar'}], memo=True)[0]
+        with httmock.HTTMock(req_404):
+            with self.assertRaises(productstatus.exceptions.ResourceNotFoundException):
+                resource.number
+        self.assertEqual(len(productstatus.api._find_or_create_memo), 0)
+
+    def test_find_or_create_many_memo(self):
+        """!
+        @brief Test that memoized find_or_create_many() results are reused without requests.
+        """
+        productstatus.api.clear_find_or_create_memo()
+        with httmock.HTTMock(req_foo_schema, req_search_foo_slug_resource):
+            first = self.api.foo.find_or_create_many([{'slug': 'bar'}], memo=True)
+        with httmock.HTTMock(req_500):
+            second = self.api.foo.find_or_create_many([{'slug': 'bar'}, {'slug': 'bar'}], memo=True)
+        productstatus.api.clear_find_or_create_memo()
+        self.assertEqual(second[0].resource_uri, first[0].resource_uri)
+        self.assertIs(second[0], second[1])
+
+    def test_find_or_create_many_memo_parameters(self):
+        """!
+        @brief Test that memoized results are only reused with the same
+        ordering and extra parameters, and that the cache size is bounded.
+        """
+        requests_ = []
+
+        @httmock.all_requests
+        def req_record(url, request):
+            requests_.append(url.query)
+
+        @httmock.urlmatch(path=r'^/api/v1/foo/$', query=r'^order_by=-number&slug=bar$')
+        def req_search_ordered(url, request):
+            return req_search_foo_slug_resource(url._replace(query='slug=bar'), request)
+
+        with httmock.HTTMock(req_foo_schema):
+            self.api.foo.schema
+        productstatus.api.clear_find_or_create_memo()
+        with httmock.HTTMock(req_record, req_search_foo_slug_resource, req_search_ordered):
+            self.api.foo.find_or_create_many([{'slug': 'bar'}], memo=True)
+            self.api.foo.find_or_create_many([{'slug': 'bar'}], memo=True)
+            self.api.foo.find_or_create_many([{'slug': 'bar'}], order_by='-number', memo=True)
+            self.api.foo.find_or_create_many([{'slug': 'bar'}], extra_params={'number': 1}, memo=True)
+        self.assertEqual(requests_, ['slug=bar', 'order_by=-number&slug=bar', 'slug=bar'])
+        with mock.patch('productstatus.api.FIND_OR_CREATE_MEMO_SIZE', 2):
+            productstatus.api._find_or_create_memo_update([('a', '/a/'), ('b', '/b/')])
+            productstatus.api._find_or_create_memo_get('a')
+            productstatus.api._find_or_create_memo_update([('c', '/c/')])
+            self.assertEqual(list(productstatus.api._find_or_create_memo.keys()), ['a', 'c'])
+        productstatus.api.clear_find_or_create_memo()
+
+    def test_delete_resource(self):
+        """!
+        @brief Test that resources can be deleted.
+        """
+        requests_ = []
+
+        @httmock.urlmatch(method='delete', path=r'^/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/$')
+        def req_delete(url, request):
+            requests_.append(request)
+            return {'status_code': 204}
+
+        with httmock.HTTMock(req_foo_schema, req_delete):
+            resource = self.api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283']
+            resource.delete()
+        self.assertEqual(len(requests_), 1)
+        self.assertFalse(resource._has_url())
+
+    def test_delete_nonexistent_resource(self):
+        """!
+        @brief Test that deleting a resource that does not exist throws an exception.
+        """
+        with httmock.HTTMock(req_foo_schema, req_404):
+            with self.assertRaises(productstatus.exceptions.ResourceNotFoundException):
+                self.api.foo[BLANK_UUID].delete()
+
+    def test_queryset_delete_bulk(self):
+        """!
+        @brief Test that query sets are deleted through the list endpoint.
+        """
+        requests_ = []
+
+        @httmock.urlmatch(method='patch', path=r'^/api/v1/foo/$')
+        def req_patch_list(url, request):
+            requests_.append(json.loads(request.body))
+            return {'status_code': 202}
+
+        with httmock.HTTMock(req_schema):
+            qs = self.api.foo.objects
+        qs.filter(foo='bar')
+        with httmock.HTTMock(req_patch_list, req_filter_foo_resource, req_filter_foo_resource_page2, req_foo_schema):
+            report = qs.delete()
+        self.assertEqual(report.deleted, 2)
+        self.assertEqual(report.failed, [])
+        self.assertEqual(requests_, [{
+            'objects': [],
+            'deleted_objects': [
+                '/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/',
+                '/api/v1/foo/8a3c4389-8911-452e-b06b-dd7238c787a5/',
+            ],
+        }])
+
+    def test_queryset_delete_pages(self):
+        """!
+        @brief Test that resources to delete are collected using large pages,
+        and that the pages after the first one are requested by offset, using
+        the page size returned by the server.
+        """
+        queries = []
+        uris = ['/api/v1/foo/%s/' % uuid for uuid in (
+            '00000001-0000-0000-0000-000000000000',
+            '00000002-0000-0000-0000-000000000000',
+            '00000003-0000-0000-0000-000000000000',
+            '00000004-0000-0000-0000-000000000000',
+            '00000005-0000-0000-0000-000000000000',
+        )]
+        deleted = []
+
+        @httmock.urlmatch(method='get', path=r'^/api/v1/foo/$')
+        def req_page(url, request):
+            queries.append(url.query)
+            offset = int(dict(urllib.parse.parse_qsl(url.query))['offset'])
+            objects = [{'resource_uri': uri} for uri in uris[offset:offset + 2]]
+            return json.dumps({'meta': {'limit': 2, 'offset': offset, 'total_count': len(uris)}, 'objects': objects})
+
+        @httmock.urlmatch(method='patch', path=r'^/api/v1/foo/$')
+        def req_patch_list(url, request):
+            deleted.extend(json.loads(request.body)['deleted_objects'])
+            return {'status_code': 202}
+
+        with httmock.HTTMock(req_foo_schema, req_page, req_patch_list):
+            report = self.api.foo.objects.filter(foo='bar').delete()
+        self.assertEqual(report.deleted, 5)
+        self.assertEqual(deleted, uris)
+        self.assertEqual(sorted(queries), [
+            'foo=bar&limit=1000&offset=0',
+            'foo=bar&limit=1000&offset=2',
+            'foo=bar&limit=1000&offset=4',
+        ])
+
+    def test_delete_forgets_find_or_create_memo(self):
+        """!
+        @brief Test that deleted resources are removed from the
+        find_or_create_many() cache, so that they are searched for again.
+        """
+        productstatus.api.clear_find_or_create_memo()
+
+        @httmock.urlmatch(method='delete')
+        def req_delete(url, request):
+            return {'status_code': 204}
+
+        @httmock.urlmatch(method='patch', path=r'^/api/v1/foo/$')
+        def req_patch_list(url, request):
+            return {'status_code': 202}
+
+        with httmock.HTTMock(req_foo_schema, req_search_foo_slug_resource, req_delete):
+            resource = self.api.foo.find_or_create_many([{'slug': 'bar'}], memo=True)[0]
+            resource.delete()
+        self.assertEqual(len(productstatus.api._find_or_create_memo), 0)
+
+        with httmock.HTTMock(req_search_foo_slug_resource, req_filter_foo_resource,
+                             req_filter_foo_resource_page2, req_patch_list):
+            self.api.foo.find_or_create_many([{'slug': 'bar'}], memo=True)
+            self.api.foo.objects.filter(foo='bar').delete()
+        self.assertEqual(len(productstatus.api._find_or_create_memo), 0)
+        productstatus.api.clear_find_or_create_memo()
+
+    def test_queryset_delete_fallback(self):
+        """!
+        @brief Test that query sets are deleted with single requests when bulk
+        deletes are not allowed, and that failures are reported.
+        """
+        @httmock.urlmatch(method='patch', path=r'^/api/v1/foo/$')
+        def req_patch_list(url, request):
+            return {'status_code': 405}
+
+        @httmock.urlmatch(method='delete', path=r'^/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/$')
+        def req_delete(url, request):
+            return {'status_code': 204}
+
+        @httmock.urlmatch(method='delete')
+        def req_delete_error(url, request):
+            return {'status_code': 500}
+
+        with httmock.HTTMock(req_schema):
+            qs = self.api.foo.objects
+        qs.filter(foo='bar')
+        with httmock.HTTMock(req_patch_list, req_delete, req_delete_error, req_filter_foo_resource,
+                             req_filter_foo_resource_page2, req_foo_schema):
+            report = qs.delete()
+        self.assertEqual(report.deleted, 1)
+        self.assertEqual(len(report.failed), 1)
+        self.assertEqual(report.failed[0][0], '/api/v1/foo/8a3c4389-8911-452e-b06b-dd7238c787a5/')
+        self.assertIsInstance(report.failed[0][1], productstatus.exceptions.ServiceUnavailableException)
+
+    def test_purge_expired(self):
+        """!
+        @brief Test that expired resources are searched for using the expiry
+        field, with large pages by default.
+        """
+        with httmock.HTTMock(req_schema, req_foo_schema):
+            with mock.patch.object(productstatus.api.QuerySet, 'delete', autospec=True) as delete:
+                now = datetime.datetime(2016, 1, 1, tzinfo=dateutil.tz.tzutc())
+                self.api.foo.purge_expired(now=now, max_workers=4)
+        qs = delete.call_args[0][0]
+        self.assertEqual(qs._filters, {'expires__lt': '2016-01-01T00:00:00Z', 'limit': 1000})
+        self.assertEqual(delete.call_args[1], {'max_workers': 4})
+
+    def test_resolve_evaluated_resources(self):
+        """!
+        @brief Test that identical EvaluatedResource values are evaluated once,
+        and distinct ones are evaluated concurrently.
+        """
+        barrier = threading.Barrier(2, timeout=5)
+        with httmock.HTTMock(req_foo_schema):
+            results = {
+                'a': self.api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283'],
+                'b': self.api.foo['8a3c4389-8911-452e-b06b-dd7238c787a5'],
+            }
+            func = mock.MagicMock(side_effect=lambda key: barrier.wait() is not None and results[key])
+            resources = [self.api.foo.create() for x in range(3)]
+            resources[0].bar = productstatus.api.EvaluatedResource(func, 'a')
+            resources[1].bar = productstatus.api.EvaluatedResource(func, 'b')
+            resources[2].bar = productstatus.api.EvaluatedResource(func, 'a')
+            productstatus.api.resolve_evaluated_resources(resources)
+            self.assertEqual(func.call_count, 2)
+            self.assertIs(resources[0].bar, results['a'])
+            self.assertIs(resources[1].bar, results['b'])
+            self.assertIs(resources[2].bar, results['a'])
+
+    def test_concurrent_schema_initialization(self):
+        """!
+        @brief Test that the server and collection schemas are retrieved only
+        once when first accessed by several threads at the same time.
+        """
+        requests_ = []
+        barrier = threading.Barrier(8, timeout=5)
+
+        @httmock.urlmatch(path=r'^/api/v1/(foo/schema/)?$')
+        def req_counted_schema(url, request):
+            requests_.append(url.path)
+            if url.path == '/api/v1/':
+                return req_schema(url, request)
+            return req_foo_schema(url, request)
+
+        def get_schema(x):
+            barrier.wait()
+            return api.foo.schema
+
+        api = productstatus.api.Api(BASE_URL, verify_ssl=False)
+        with httmock.HTTMock(req_counted_schema):
+            schemas = api._map_concurrently(get_schema, range(8), 8)
+        self.assertEqual(sorted(requests_), ['/api/v1/', '/api/v1/foo/schema/'])
+        self.assertTrue(all(x is schemas[0] for x in schemas))
+
+    def test_session_thread_local(self):
+        """!
+        @brief Test that sessions do not collect resources changed by other threads.
+        """
+        with httmock.HTTMock(req_foo_schema):
+            with mock.patch.object(productstatus.unitofwork.Session, 'flush'):
+                with self.api.session() as session:
+                    resource = self.api.foo.create()
+                    thread = threading.Thread(target=setattr, args=(resource, 'number', 1))
+                    thread.start()
+                    thread.join()
+                    self.assertEqual(session._resources, [])
+                    resource.number = 2
+                    self.assertEqual(session._resources, [resource])
+
+    def test_connection_pool(self):
+        """!
+        @brief Test that connection pool settings are applied to the HTTP session.
+        """
+        api = productstatus.api.Api(BASE_URL, pool_connections=2, pool_maxsize=32, pool_block=True, keep_alive=False)
+        adapter = api._get_transport().session.get_adapter(BASE_URL)
+        self.assertEqual(adapter._pool_connections, 2)
+        self.assertEqual(adapter._pool_maxsize, 32)
+        self.assertTrue(adapter._pool_block)
+        self.assertEqual(api._get_transport().session.headers['connection'], 'close')
+        self.assertEqual(self.api._get_transport().session.headers['connection'], 'keep-alive')
+
+    def test_pickle_api(self):
+        """!
+        @brief Test that pickled Api objects keep their schemas and
+        find_or_create_many() results, and need no requests to use them.
+        """
+        productstatus.api.clear_find_or_create_memo()
+        with httmock.HTTMock(req_foo_schema, req_search_foo_slug_resource):
+            first = self.api.foo.find_or_create_many([{'slug': 'bar'}], memo=True)
+        data = pickle.dumps(self.api)
+        productstatus.api.clear_find_or_create_memo()
+        api = pickle.loads(data)
+        with httmock.HTTMock(req_500):
+            self.assertEqual(api.foo.schema, self.api.foo.schema)
+            second = api.foo.find_or_create_many([{'slug': 'bar'}], memo=True)
+        productstatus.api.clear_find_or_create_memo()
+        self.assertEqual(second[0].resource_uri, first[0].resource_uri)
+        self.assertIsNone(api._transport)
+
+    def test_pickle_resource(self):
+        """!
+        @brief Test that pickled resources share one restored Api object and collection.
+        """
+        with httmock.HTTMock(req_foo_schema, req_foo_resource):
+            resource = self.api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283']
+            resource.number
+            resources = pickle.loads(pickle.dumps([resource, resource.bar]))
+        with httmock.HTTMock(req_500):
+            self.assertEqual(resources[0].number, 1)
+            self.assertEqual(resources[0].resource_uri, resource.resource_uri)
+            self.assertIs(resources[0]._api, resources[1]._api)
+            self.assertIs(resources[0]._collection, resources[0]._api.foo)
+
+    def test_reset_after_fork(self):
+        """!
+        @brief Test that HTTP transports are recreated in child processes.
+        """
+        transport = self.api._get_transport()
+        productstatus.api._reset_after_fork()
+        self.assertIsNone(self.api._transport)
+        self.assertIsNot(self.api._get_transport(), transport)
+
+    def test_queryset_parallel_map(self):
+        """!
+        @brief Test that functions are run on all search results in worker
+        processes, and that results are returned in order.
+        """
+        qs = self.api.foo.objects.filter(foo='bar')
+        with httmock.HTTMock(req_filter_foo_resource, req_filter_foo_resource_page2, req_foo_schema):
+            results = list(qs.parallel_map(resource_number_and_year, processes=2, chunksize=1, max_pending_pages=1))
+            self.assertEqual(results, [(1, 2015), (5, 2015)])
+            results = qs.parallel_map(resource_number_and_year, processes=2, ordered=False)
+            self.assertEqual(sorted(results), [(1, 2015), (5, 2015)])
+
+    def test_queryset_parallel_map_exception(self):
+        """!
+        @brief Test that exceptions raised in worker processes are re-raised.
+        """
+        qs = self.api.foo.objects.filter(foo='bar')
+        with httmock.HTTMock(req_filter_foo_resource, req_filter_foo_resource_page2, req_foo_schema):
+            with self.assertRaises(RuntimeError):
+                list(qs.parallel_map(resource_fail, processes=1))
+
+    def test_retry(self):
+        """!
+        @brief Test that idempotent requests are retried on server errors,
+        and other requests are not, and that retries are counted.
+        """
+        statuses = []
+        api = productstatus.api.Api(BASE_URL, retry=productstatus.retry.RetryPolicy(max_attempts=3, backoff=0))
+
+        @httmock.urlmatch(path=r'^/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/$')
+        def req_flaky(url, request):
+            statuses.append(request.method)
+            if len(statuses) < 3:
+                return {'status_code': 503}
+            return req_foo_resource(url, request)
+
+        with httmock.HTTMock(req_schema, req_foo_schema, req_flaky):
+            self.assertEqual(api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283'].number, 1)
+            self.assertEqual(statuses, ['GET', 'GET', 'GET'])
+            del statuses[:]
+            with self.assertRaises(productstatus.exceptions.ServiceUnavailableException):
+                api._do_request('patch', BASE_URL + '/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/')
+            self.assertEqual(statuses, ['PATCH'])
+        self.assertEqual(api.stats()['totals']['retries'], 2)
+        self.assertEqual(api.stats()['totals']['hedges'], 0)
+
+    def test_retry_deadline(self):
+        """!
+        @brief Test that requests are not retried beyond their deadline.
+        """
+        requests_ = []
+
+        @httmock.all_requests
+        def req_retry_later(url, request):
+            requests_.append(request.url)
+            return {'status_code': 503, 'headers': {'Retry-After': '60'}}
+
+        api = productstatus.api.Api(BASE_URL, retry=productstatus.retry.RetryPolicy(max_attempts=3, deadline=10))
+        with httmock.HTTMock(req_retry_later):
+            with self.assertRaises(productstatus.exceptions.ServiceUnavailableException):
+                api._do_request('get', BASE_URL)
+            self.assertEqual(len(requests_), 1)
+            with api.deadline(0):
+                with self.assertRaises(productstatus.exceptions.DeadlineExceededException):
+                    api._do_request('get', BASE_URL)
+            self.assertEqual(len(requests_), 1)
+
+    def test_hedged_request(self):
+        """!
+        @brief Test that a second GET request is sent when the first one is
+        slow, and that the first response received is used.
+        """
+        requests_ = []
+        lock = threading.Lock()
+        answered = threading.Event()
+
+        @httmock.urlmatch(path=r'^/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/$')
+        def req_slow(url, request):
+            with lock:
+                requests_.append(request.url)
+                first = len(requests_) == 1
+            if first:
+                answered.wait(5)
+                return {'status_code': 500}
+            answered.set()
+            return req_foo_resource(url, request)
+
+        policy = productstatus.retry.RetryPolicy(hedge_percentile=50, hedge_min_samples=1)
+        policy.record_latency('get', 0.01)
+        self.api._retry = policy
+        with httmock.HTTMock(req_foo_schema, req_slow):
+            self.assertEqual(self.api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283'].number, 1)
+        self.assertEqual(len(requests_), 2)
+
+    def test_hedged_request_abandoned(self):
+        """!
+        @brief Test that the slower of two hedged requests gives back its
+        concurrency limiter slot as soon as the other one is answered, and
+        that hedges and abandoned requests are counted.
+        """
+        requests_ = []
+        lock = threading.Lock()
+        released = threading.Event()
+
+        @httmock.urlmatch(path=r'^/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/$')
+        def req_slow(url, request):
+            with lock:
+                requests_.append(request.url)
+                first = len(requests_) == 1
+            if first:
+                released.wait(5)
+            return req_foo_resource(url, request)
+
+        limiter = productstatus.limiter.AdaptiveLimiter(initial_limit=4, latency_tolerance=None)
+        policy = productstatus.retry.RetryPolicy(hedge_percentile=50, hedge_min_samples=1)
+        policy.record_latency('get', 0.01)
+        api = productstatus.api.Api(BASE_URL, retry=policy, limiter=limiter)
+        with httmock.HTTMock(req_schema, req_foo_schema, req_slow):
+            self.assertEqual(api.foo['66340f0b-2c2c-436d-a077-3d939f4f7283'].number, 1)
+            self.assertEqual(limiter.in_flight, 0)
+            released.set()
+            api._get_hedge_executor().shutdown(wait=True)
+        self.assertEqual(len(requests_), 2)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(api.stats()['totals']['abandoned'], 1)
+        self.assertEqual(api.stats()['totals']['hedges'], 1)
+        self.assertEqual(api.stats()['totals']['retries'], 0)
+
+    def test_concurrency_limiter(self):
+        """!
+        @brief Test that requests go through the concurrency limiter, and
+        that server errors decrease its limit.
+        """
+        limiter = productstatus.limiter.AdaptiveLimiter(initial_limit=8)
+        api = productstatus.api.Api(BASE_URL, limiter=limiter)
+        with httmock.HTTMock(req_schema):
+            api.foo
+        with httmock.HTTMock(req_500):
+            with self.assertRaises(productstatus.exceptions.ServiceUnavailableException):
+                api._do_request('get', BASE_URL)
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_concurrency_limiter_timeout_tuple(self):
+        """!
+        @brief Test that (connect, read) timeouts can be used with the
+        concurrency limiter and deadlines.
+        """
+        timeouts = []
+        limiter = productstatus.limiter.AdaptiveLimiter(initial_limit=1, max_limit=1)
+        api = productstatus.api.Api(BASE_URL, limiter=limiter, timeout=(2, None))
+        transport = api._get_transport()
+        request = transport.request
+
+        def record_timeout(*args, **kwargs):
+            timeouts.append(kwargs['timeout'])
+            return request(*args, **kwargs)
+
+        transport.request = record_timeout
+        with httmock.HTTMock(req_schema):
+            api._do_request('get', api._url)
+            with api.deadline(1):
+                api._do_request('get', api._url)
+            token = limiter.acquire()
+            with self.assertRaises(productstatus.exceptions.ServiceUnavailableException):
+                api._do_request('get', api._url, timeout=(0.01, 5))
+            limiter.release(token)
+        self.assertEqual(timeouts[0], (2, None))
+        self.assertLessEqual(timeouts[1][0], 1)
+        self.assertLessEqual(timeouts[1][1], 1)
+        self.assertEqual(len(timeouts), 2)
+
+    def test_read_replicas(self):
+        """!
+        @brief Test that reads are sent to the fastest server, writes and
+        reads right after them to the primary server, and that absolute
+        Location headers are resolved.
+        """
+        requests_ = []
+
+        @httmock.all_requests
+        def req_record(url, request):
+            requests_.append((request.method, url.netloc))
+
+        @httmock.urlmatch(method='post', path=r'^/api/v1/foo/$')
+        def req_post_absolute(url, request):
+            headers = {'Location': 'http://internal:8000/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/'}
+            return httmock.response(201, {}, headers, None, 5, request)
+
+        api = productstatus.api.Api([BASE_URL, 'http://replica'])
+        api._router.endpoints[0].latency = 1.0
+        api._router.endpoints[1].latency = 0.01
+        with httmock.HTTMock(req_record, req_schema, req_foo_schema, req_foo_resource,
+                             req_patch_foo_resource, req_post_absolute):
+            resource = api.foo.create()
+            resource.text = 'baz'
+            resource.number = 1
+            resource.save()
+            self.assertEqual(resource.resource_uri, '/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/')
+            self.assertIsInstance(resource.created, datetime.datetime)
+            resource.number = 2
+            resource.save()
+        self.assertEqual(requests_, [
+            ('GET', 'replica'),
+            ('GET', 'replica'),
+            ('POST', '192.168.254.254'),
+            ('GET', '192.168.254.254'),
+            ('PATCH', '192.168.254.254'),
+        ])
+
+        requests_.clear()
+        api = productstatus.api.Api([BASE_URL, 'http://replica'], read_after_write=0)
+        api._router.endpoints[0].latency = 1.0
+        api._router.endpoints[1].latency = 0.01
+        with httmock.HTTMock(req_record, req_schema, req_foo_schema, req_foo_resource, req_post_absolute):
+            resource = api.foo.create()
+            resource.text = 'baz'
+            resource.save()
+            resource.created
+        self.assertEqual(requests_[-2:], [('POST', '192.168.254.254'), ('GET', 'replica')])
+
+    def test_stats(self):
+        """!
+        @brief Test that requests are counted per method and collection, and
+        per query set, and that memoized results are counted as cache hits.
+        """
+        events = []
+        metrics = productstatus.metrics.Metrics()
+        metrics.add_exporter(events.append)
+        api = productstatus.api.Api(BASE_URL, metrics=metrics)
+        productstatus.api.clear_find_or_create_memo()
+        with httmock.HTTMock(req_schema, req_foo_schema, req_search_foo_slug_resource, req_filter_foo_resource):
+            qs = api.foo.objects
+            qs.filter(foo='bar').count()
+            api.foo.find_or_create_many([{'slug': 'bar'}], memo=True)
+            api.foo.find_or_create_many([{'slug': 'bar'}], memo=True)
+        with httmock.HTTMock(req_500):
+            with self.assertRaises(productstatus.exceptions.ServiceUnavailableException):
+                api._do_request('get', BASE_URL + '/api/v1/foo/1/')
+        productstatus.api.clear_find_or_create_memo()
+        stats = api.stats()
+        self.assertEqual([(x['method'], x['collection'], x['count'], x['status_codes']) for x in stats['requests']], [
+            ('get', None, 1, {200: 1}),
+            ('get', 'foo', 4, {200: 3, 500: 1}),
+        ])
+        self.assertEqual(stats['totals']['count'], 5)
+        self.assertGreater(stats['totals']['bytes_in'], 0)
+        self.assertEqual(stats['cache'], {'find_or_create': {'hits': 1, 'misses': 1}})
+        self.assertIsNone(stats['limiter'])
+        self.assertIsNone(stats['endpoints'])
+        self.assertEqual(qs.stats()['requests'], 1)
+        self.assertEqual(len([x for x in events if isinstance(x, productstatus.metrics.RequestEvent)]), 5)
+        self.assertEqual(events[-1].status_code, 500)
+
+    def lazy_load_mocks(self):
+        """!
+        @brief Return mocks serving a page of five foo resources, each
+        related to another foo resource through the `bar` field.
+        """
+        def foo(index):
+            return {
+                'id': '%08d-0000-0000-0000-000000000000' % index,
+                'resource_uri': '/api/v1/foo/%08d-0000-0000-0000-000000000000/' % index,
+                'bar': '/api/v1/foo/%08d-0000-0000-0000-000000000000/' % (index + 100),
+                'number': index,
+            }
+
+        @httmock.urlmatch(path=r'^/api/v1/foo/$')
+        def req_list(url, request):
+            return httmock.response(200, {
+                'meta': {'limit': 20, 'offset': 0, 'total_count': 5},
+                'objects': [foo(x) for x in range(5)],
+            })
+
+        @httmock.urlmatch(path=r'^/api/v1/foo/(\d+)-0000-0000-0000-000000000000/$')
+        def req_detail(url, request):
+            return httmock.response(200, foo(int(url.path.split('/')[4].split('-')[0])))
+
+        return httmock.HTTMock(req_schema, req_foo_schema, req_list, req_detail)
+
+    def test_lazy_load_detector_warning(self):
+        """!
+        @brief Test that repeated lazy loads through the same relation path
+        while iterating over a QuerySet are reported with a warning.
+        """
+        detector = productstatus.lazyload.LazyLoadDetector(threshold=3)
+        api = productstatus.api.Api(BASE_URL, lazy_load_detector=detector)
+        with self.lazy_load_mocks():
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                line = sys._getframe().f_lineno + 1
+                numbers = [x.bar.bar.number for x in api.foo.objects.filter(number=1)]
+            api.foo['00000001-0000-0000-0000-000000000000'].bar.number
+        self.assertEqual(numbers, [200, 201, 202, 203, 204])
+        self.assertEqual([str(x.message).split(' was')[0] for x in caught], ['foo.bar', 'foo.bar.bar'])
+        self.assertIn('foo.bar was lazily loaded more than 3 times', str(caught[0].message))
+        for warning in caught:
+            self.assertEqual(warning.category, productstatus.lazyload.LazyLoadWarning)
+            self.assertEqual((warning.filename, warning.lineno), (__file__, line))
+        self.assertEqual(detector.report(), [('foo.bar', 5), ('foo.bar.bar', 5)])
+
+    def test_lazy_load_detector_exception(self):
+        """!
+        @brief Test that the lazy load detector can raise an exception
+        instead, before the request exceeding the threshold is sent.
+        """
+        detector = productstatus.lazyload.LazyLoadDetector(threshold=2, raise_exception=True)
+        api = productstatus.api.Api(BASE_URL, lazy_load_detector=detector)
+        loaded = []
+        with self.lazy_load_mocks():
+            with self.assertRaises(productstatus.exceptions.LazyLoadException):
+                for resource in api.foo.objects.all():
+                    loaded.append(resource.bar.number)
+        self.assertEqual(loaded, [100, 101])
@@ -0,0 +1,70 @@
+import unittest
+import subprocess
+import sys
+
+
+# Modules that must not be imported until they are actually used: the Kafka
+# client, dateutil and six, and the dependencies of optional features, i.e.
+# the asyncio client, columnar export and the HTTP/2 transport.
+DEFERRED_MODULES = [
+    'kafka', 'dateutil', 'six', 'productstatus.event',
+    'aiohttp', 'numpy', 'pyarrow', 'httpx', 'h2',
+]
+
+# Maximum import time of the command-line client, not counting `requests`,
+# relative to the import time of `requests` in the same interpreter. Both are
+# slowed down alike on a busy machine, so the ratio is stable, while eagerly
+# importing any of the deferred modules makes it exceed the limit.
+IMPORT_TIME_RATIO = 1.0
+
+# Number of fresh interpreters to measure the import time in. The lowest
+# ratio is used, to ignore interference from other processes.
+IMPORT_TIME_ATTEMPTS = 3
+
+
+def import_times(module):
+    """!
+    @brief Import a module in a fresh interpreter and return a dictionary of
+    cumulative import times in microseconds, keyed by module name, as
+    reported by `python -X importtime`.
+    """
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    ).stderr
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, cumulative, name = line[12:].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class ImportTimeTest(unittest.TestCase):
+    def test_deferred_modules(self):
+        """!
+        @brief Test that Kafka, dateutil and the dependencies of optional
+        features are not imported by the package, the REST client and CLI.
+        """
+        for module in ['productstatus', 'productstatus.api', 'productstatus.cli']:
+            names = import_times(module)
+            self.assertIn(module, names)
+            for name in names:
+                for deferred in DEFERRED_MODULES:
+                    self.assertFalse(name == deferred or name.startswith(deferred + '.'),
+                                     '%s imports %s' % (module, name))
+
+    def test_import_time_relative_to_requests(self):
+        """!
+        @brief Test that the command-line client itself takes less time to
+        import than its `requests` dependency.
+        """
+        ratios = []
+        for attempt in range(IMPORT_TIME_ATTEMPTS):
+            times = import_times('productstatus.cli')
+            ratios.append((times['productstatus.cli'] - times['requests']) / float(times['requests']))
+        self.assertLess(min(ratios), IMPORT_TIME_RATIO,
+                        'productstatus.cli takes %.2f times as long to import as requests' % min(ratios))
@@ -0,0 +1,88 @@
+import unittest
+import pickle
+import threading
+
+import productstatus.limiter
+
+
+class AdaptiveLimiterTest(unittest.TestCase):
+    def test_additive_increase(self):
+        """!
+        @brief Test that the limit grows by about one per round trip while it is used.
+        """
+        limiter = productstatus.limiter.AdaptiveLimiter(initial_limit=4, latency_tolerance=None)
+        for x in range(4):
+            tokens = [limiter.acquire() for y in range(limiter.limit)]
+            for token in tokens:
+                limiter.release(token)
+        self.assertEqual(limiter.limit, 5)
+        self.assertEqual(limiter.stats()['decreases'], 0)
+
+    def test_no_increase_when_idle(self):
+        """!
+        @brief Test that the limit does not grow while most of it is unused.
+        """
+        limiter = productstatus.limiter.AdaptiveLimiter(initial_limit=4, latency_tolerance=None)
+        for x in range(100):
+            limiter.release(limiter.acquire())
+        self.assertEqual(limiter.limit, 4)
+
+    def test_multiplicative_decrease(self):
+        """!
+        @brief Test that the limit is halved once for all requests sent under
+        the same limit, and not below the minimum.
+        """
+        limiter = productstatus.limiter.AdaptiveLimiter(initial_limit=16, min_limit=3)
+        tokens = [limiter.acquire() for x in range(8)]
+        for token in tokens:
+            limiter.release(token, overloaded=True)
+        self.assertEqual(limiter.limit, 8)
+        for x in range(3):
+            limiter.release(limiter.acquire(), overloaded=True)
+        self.assertEqual(limiter.limit, 3)
+        self.assertEqual(limiter.stats()['decreases'], 3)
+
+    def test_latency_overload(self):
+        """!
+        @brief Test that increasing latency signals overload.
+        """
+        limiter = productstatus.limiter.AdaptiveLimiter(initial_limit=10, min_samples=2, smoothing=1.0)
+        for latency in [1.0, 1.5, 2.5]:
+            limiter.release(limiter.acquire() - latency)
+        self.assertEqual(limiter.limit, 5)
+
+    def test_cancel(self):
+        """!
+        @brief Test that cancelled slots are freed without adjusting the limit.
+        """
+        limiter = productstatus.limiter.AdaptiveLimiter(initial_limit=2, min_samples=1)
+        tokens = [limiter.acquire(), limiter.acquire()]
+        limiter.cancel(tokens[0])
+        self.assertEqual(limiter.in_flight, 1)
+        self.assertIsNotNone(limiter.acquire(timeout=0))
+        self.assertEqual(limiter.limit, 2)
+        self.assertIsNone(limiter.stats()['smoothed_latency'])
+
+    def test_acquire_waits(self):
+        """!
+        @brief Test that requests wait for a free slot, and time out.
+        """
+        limiter = productstatus.limiter.AdaptiveLimiter(initial_limit=1, latency_tolerance=None)
+        token = limiter.acquire()
+        self.assertIsNone(limiter.acquire(timeout=0.01))
+        timer = threading.Timer(0.01, limiter.release, (token,))
+        timer.start()
+        self.assertIsNotNone(limiter.acquire(timeout=5))
+        timer.join()
+        self.assertEqual(limiter.in_flight, 1)
+
+    def test_pickle(self):
+        limiter = productstatus.limiter.AdaptiveLimiter(initial_limit=7)
+        limiter.acquire()
+        limiter._last_decrease = 1e12
+        state = pickle.dumps(limiter)
+        self.assertNotIn(b'_last_decrease', state)
+        limiter = pickle.loads(state)
+        self.assertEqual(limiter.limit, 7)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(limiter._last_decrease, 0.0)
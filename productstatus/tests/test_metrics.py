@@ -0,0 +1,96 @@
+import unittest
+import pickle
+
+import productstatus.metrics
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_observe(self):
+        """!
+        @brief Test that values are counted in the first bucket they fit in.
+        """
+        histogram = productstatus.metrics.Histogram(buckets=(0.1, 1.0, float('inf')))
+        for value in (0.05, 0.1, 0.5, 20.0):
+            histogram.observe(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['buckets'], [(0.1, 2), (1.0, 3), (float('inf'), 4)])
+        self.assertEqual(snapshot['count'], 4)
+        self.assertAlmostEqual(snapshot['sum'], 20.65)
+        self.assertEqual(snapshot['min'], 0.05)
+        self.assertEqual(snapshot['max'], 20.0)
+
+    def test_quantile(self):
+        """!
+        @brief Test that quantiles are estimated by bucket upper bounds, and
+        never exceed the largest value.
+        """
+        histogram = productstatus.metrics.Histogram(buckets=(0.1, 1.0, float('inf')))
+        self.assertIsNone(histogram.quantile(0.5))
+        for value in [0.05] * 98 + [0.5, 3.0]:
+            histogram.observe(value)
+        self.assertEqual(histogram.quantile(0.5), 0.1)
+        self.assertEqual(histogram.quantile(0.99), 1.0)
+        self.assertEqual(histogram.quantile(1.0), 3.0)
+
+
+class MetricsTest(unittest.TestCase):
+
+    def test_record_request(self):
+        """!
+        @brief Test that requests are grouped by method and collection.
+        """
+        metrics = productstatus.metrics.Metrics()
+        metrics.record_request('GET', 'foo', 200, 0.01, 0, 100)
+        metrics.record_request('get', 'foo', 404, 0.02, 0, 10)
+        metrics.record_request('post', 'foo', None, 0.5, 40, 0)
+        metrics.record_request('get', None, 200, 0.01, 0, 1000)
+        snapshot = metrics.snapshot()
+        self.assertEqual([(x['method'], x['collection'], x['count'], x['errors']) for x in snapshot['requests']], [
+            ('get', None, 1, 0),
+            ('get', 'foo', 2, 0),
+            ('post', 'foo', 1, 1),
+        ])
+        self.assertEqual(snapshot['requests'][1]['status_codes'], {200: 1, 404: 1})
+        self.assertEqual(snapshot['totals']['bytes_in'], 1110)
+        self.assertEqual(snapshot['totals']['bytes_out'], 40)
+        metrics.reset()
+        self.assertEqual(metrics.snapshot()['requests'], [])
+
+    def test_exporter(self):
+        """!
+        @brief Test that exporters receive all events, and that failing
+        exporters do not prevent others from being called.
+        """
+        def fail(event):
+            raise RuntimeError('exporter failed')
+
+        events = []
+        metrics = productstatus.metrics.Metrics()
+        metrics.add_exporter(fail)
+        metrics.add_exporter(events.append)
+        with self.assertLogs(level='WARNING'):
+            metrics.record_request('get', 'foo', 200, 0.01)
+            metrics.record_cache('find_or_create', True)
+        self.assertEqual(events, [
+            productstatus.metrics.RequestEvent('get', 'foo', 200, 0.01, 0, 0),
+            productstatus.metrics.CacheEvent('find_or_create', True),
+        ])
+        metrics.remove_exporter(events.append)
+        metrics.remove_exporter(fail)
+        metrics.record_cache('find_or_create', False)
+        self.assertEqual(len(events), 2)
+        self.assertEqual(metrics.snapshot()['cache'], {'find_or_create': {'hits': 1, 'misses': 1}})
+
+    def test_pickle(self):
+        """!
+        @brief Test that unpickled metrics keep their buckets, and start
+        counting from zero without exporters.
+        """
+        metrics = productstatus.metrics.Metrics(buckets=(1.0, float('inf')))
+        metrics.add_exporter(lambda event: None)
+        metrics.record_request('get', 'foo', 200, 0.01)
+        metrics = pickle.loads(pickle.dumps(metrics))
+        self.assertEqual(metrics.buckets, (1.0, float('inf')))
+        self.assertEqual(metrics.snapshot()['requests'], [])
+        self.assertEqual(metrics._exporters, [])
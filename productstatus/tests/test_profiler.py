@@ -0,0 +1,117 @@
+import unittest
+import httmock
+import os
+import shutil
+import tempfile
+import time
+
+import productstatus.api
+import productstatus.profiler
+
+
+BASE_URL = 'http://192.168.254.254'
+
+
+@httmock.urlmatch(path=r'^/api/v1/$')
+def req_schema(url, request):
+    return b'{"foo": {"list_endpoint": "/api/v1/foo/", "schema": "/api/v1/foo/schema/"}}'
+
+
+@httmock.urlmatch(path=r'^/api/v1/foo/schema/$')
+def req_foo_schema(url, request):
+    return b"""
+    {
+        "fields": {
+            "id": {"type": "string", "readonly": false, "nullable": false},
+            "resource_uri": {"type": "string", "readonly": true, "nullable": false},
+            "number": {"type": "integer", "readonly": false, "nullable": true}
+        }
+    }
+    """
+
+
+@httmock.urlmatch(path=r'^/api/v1/foo/$')
+def req_foo_list(url, request):
+    time.sleep(0.02)
+    return httmock.response(200, {
+        'meta': {'limit': 20, 'offset': 0, 'total_count': 10},
+        'objects': [{
+            'id': '%08d-0000-0000-0000-000000000000' % x,
+            'resource_uri': '/api/v1/foo/%08d-0000-0000-0000-000000000000/' % x,
+            'number': x,
+        } for x in range(10)],
+    }, None, None, 5, request)
+
+
+def sweep(api):
+    total = 0
+    for resource in api.foo.objects.all():
+        total += resource.number
+        time.sleep(0.002)
+    return total
+
+
+class PhaseProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.api = productstatus.api.Api(BASE_URL)
+
+    def profile(self, **kwargs):
+        with httmock.HTTMock(req_schema, req_foo_schema, req_foo_list):
+            with productstatus.profiler.PhaseProfiler(self.api, **kwargs) as profiler:
+                self.assertEqual(sweep(self.api), 45)
+        self.assertIsNone(self.api._profiler)
+        return profiler
+
+    def test_phases(self):
+        """!
+        @brief Test that time is attributed to phases for each collection,
+        and that time spent in nested phases is only counted once.
+        """
+        profiler = self.profile()
+        rows = dict(((phase, collection), (calls, seconds)) for phase, collection, calls, seconds, _ in profiler.summary())
+        self.assertEqual(sorted(rows.keys(), key=str), sorted([
+            ('network', None),
+            ('network', 'foo'),
+            ('decode', None),
+            ('decode', 'foo'),
+            ('convert', 'foo'),
+            ('user', None),
+        ], key=str))
+        self.assertEqual(rows[('network', 'foo')][0], 2)
+        self.assertEqual(rows[('convert', 'foo')][0], 10)
+        self.assertGreaterEqual(rows[('network', 'foo')][1], 0.02)
+        self.assertGreaterEqual(rows[('user', None)][1], 0.02)
+        self.assertAlmostEqual(sum(x[1] for x in rows.values()), profiler.wall_seconds)
+
+    def test_table(self):
+        """!
+        @brief Test that the summary table lists all phases and the total,
+        with allocated memory when tracing memory.
+        """
+        profiler = self.profile(trace_memory=True)
+        lines = profiler.table().splitlines()
+        self.assertEqual(lines[0].split(), ['phase', 'collection', 'calls', 'seconds', 'time', 'allocated'])
+        self.assertEqual([x.split()[0] for x in lines[1:]], ['network', 'network', 'decode', 'decode', 'convert', 'user', 'total'])
+        self.assertIn('B', lines[-1].split()[-1])
+
+    def test_folded_stacks(self):
+        """!
+        @brief Test that folded stacks start with the calling functions, and
+        end with the collection and phase.
+        """
+        profiler = self.profile()
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'profile.folded')
+            profiler.write_folded(path)
+            with open(path) as f:
+                lines = f.read().splitlines()
+        finally:
+            shutil.rmtree(directory)
+        stacks = [x.rsplit(' ', 1)[0].split(';') for x in lines]
+        leaves = [[x[-3].split('.')[-1]] + x[-2:] for x in stacks[:-1]]
+        self.assertIn(['sweep', 'foo', 'network'], leaves)
+        self.assertIn(['sweep', 'foo', 'convert'], leaves)
+        self.assertEqual(stacks[-1], ['user'])
+        self.assertTrue(all(int(x.rsplit(' ', 1)[1]) > 0 for x in lines))
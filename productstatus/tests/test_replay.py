@@ -0,0 +1,147 @@
+import unittest
+import httmock
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import productstatus.api
+import productstatus.exceptions
+import productstatus.replay
+
+
+BASE_URL = 'http://192.168.254.254'
+
+
+@httmock.urlmatch(path=r'^/api/v1/$')
+def req_schema(url, request):
+    return b'{"foo": {"list_endpoint": "/api/v1/foo/", "schema": "/api/v1/foo/schema/"}}'
+
+
+@httmock.urlmatch(path=r'^/api/v1/foo/schema/$')
+def req_foo_schema(url, request):
+    return b"""
+    {
+        "fields": {
+            "id": {"type": "string", "readonly": false, "nullable": false},
+            "resource_uri": {"type": "string", "readonly": true, "nullable": false},
+            "number": {"type": "integer", "readonly": false, "nullable": true}
+        },
+        "filtering": {"number": 1}
+    }
+    """
+
+
+@httmock.urlmatch(path=r'^/api/v1/foo/$')
+def req_foo_list(url, request):
+    number = int(url.query.split('number=')[1].split('&')[0])
+    return httmock.response(200, {
+        'meta': {'limit': 20, 'offset': 0, 'total_count': 1, 'next': None},
+        'objects': [{
+            'id': '66340f0b-2c2c-436d-a077-3d939f4f7283',
+            'resource_uri': '/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/',
+            'number': number,
+        }],
+    }, {'content-type': 'application/json'})
+
+
+@httmock.all_requests
+def req_500(url, request):
+    return {'status_code': 500, 'content': b'Internal server error'}
+
+
+class ReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'session.jsonl.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def record(self):
+        api = productstatus.api.Api(BASE_URL, transport=productstatus.replay.record(self.path))
+        with httmock.HTTMock(req_schema, req_foo_schema, req_foo_list):
+            numbers = [api.foo.objects.filter(number=x)[0].number for x in (1, 2, 1)]
+        api.close()
+        return numbers
+
+    def test_record_and_replay(self):
+        """!
+        @brief Test that recorded responses are served back without sending
+        any requests.
+        """
+        self.assertEqual(self.record(), [1, 2, 1])
+        api = productstatus.api.Api('https://other.fqdn', transport=productstatus.replay.replay(self.path))
+        with httmock.HTTMock(req_500):
+            numbers = [api.foo.objects.filter(number=x)[0].number for x in (1, 2, 1)]
+            self.assertEqual(api.foo.schema['fields']['number']['type'], 'integer')
+        self.assertEqual(numbers, [1, 2, 1])
+
+    def test_record_contents(self):
+        """!
+        @brief Test that requests are recorded in the order they were sent.
+        """
+        self.record()
+        records = productstatus.replay.ReplayTransport.load(self.path)
+        self.assertEqual([(x['method'], x['path'], x['query']) for x in records], [
+            ('get', '/api/v1/', ''),
+            ('get', '/api/v1/foo/', 'number=1&offset=0'),
+            ('get', '/api/v1/foo/schema/', ''),
+            ('get', '/api/v1/foo/', 'number=2&offset=0'),
+            ('get', '/api/v1/foo/', 'number=1&offset=0'),
+        ])
+        self.assertEqual(records[0]['status_code'], 200)
+
+    @unittest.skipIf(not hasattr(os, 'fork'), 'os.fork() is not available')
+    def test_record_child_process(self):
+        """!
+        @brief Test that child processes record to a file of their own.
+        """
+        api = productstatus.api.Api(BASE_URL, transport=productstatus.replay.record(self.path))
+        with httmock.HTTMock(req_schema, req_foo_schema, req_foo_list):
+            api.foo.objects.filter(number=1)[0]
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    api.foo.objects.filter(number=2)[0]
+                    api.close()
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+            api.foo.objects.filter(number=3)[0]
+        api.close()
+        parent = productstatus.replay.ReplayTransport.load(self.path)
+        child = productstatus.replay.ReplayTransport.load(productstatus.replay.process_path(self.path, pid))
+        self.assertEqual([x['query'] for x in parent if x['path'] == '/api/v1/foo/'], ['number=1&offset=0', 'number=3&offset=0'])
+        self.assertEqual([x['query'] for x in child], ['number=2&offset=0'])
+        self.assertEqual(os.path.basename(productstatus.replay.process_path(self.path, 12)), 'session.12.jsonl.gz')
+
+    def test_replay_missing_request(self):
+        """!
+        @brief Test that requests missing from the recording raise an exception.
+        """
+        self.record()
+        api = productstatus.api.Api(BASE_URL, transport=productstatus.replay.replay(self.path))
+        with self.assertRaises(productstatus.exceptions.ReplayException):
+            api.foo.objects.filter(number=3)[0]
+
+    def test_replay_latency(self):
+        """!
+        @brief Test that replayed responses are delayed by the simulated latency.
+        """
+        self.record()
+        api = productstatus.api.Api(BASE_URL, transport=productstatus.replay.replay(self.path, latency=0.05))
+        start = time.monotonic()
+        api.foo.objects.filter(number=1)[0]
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_pickle_api(self):
+        """!
+        @brief Test that Api objects replaying a recording can be pickled.
+        """
+        self.record()
+        api = productstatus.api.Api(BASE_URL, transport=productstatus.replay.replay(self.path))
+        api = pickle.loads(pickle.dumps(api))
+        self.assertEqual(api.foo.objects.filter(number=2)[0].number, 2)
@@ -0,0 +1,72 @@
+import unittest
+import email.utils
+import time
+
+import mock
+
+import productstatus.retry
+
+
+class RetryPolicyTest(unittest.TestCase):
+    def test_default_single_attempt(self):
+        """!
+        @brief Test that the default policy never retries.
+        """
+        policy = productstatus.retry.RetryPolicy()
+        self.assertIsNone(policy.retry_delay('get', 1))
+        self.assertIsNone(policy.hedge_delay('get'))
+
+    def test_exponential_backoff(self):
+        """!
+        @brief Test that delays double for each attempt, up to the maximum.
+        """
+        policy = productstatus.retry.RetryPolicy(max_attempts=10, backoff=0.5, max_backoff=3, jitter=False)
+        self.assertEqual([policy.retry_delay('get', x) for x in range(1, 6)], [0.5, 1, 2, 3, 3])
+        self.assertIsNone(policy.retry_delay('get', 10))
+
+    def test_jitter(self):
+        policy = productstatus.retry.RetryPolicy(max_attempts=10, backoff=1, max_backoff=4)
+        for attempt in range(1, 6):
+            self.assertTrue(0 <= policy.retry_delay('get', attempt) <= 4)
+
+    def test_idempotent_methods(self):
+        """!
+        @brief Test that non-idempotent requests are not retried.
+        """
+        policy = productstatus.retry.RetryPolicy(max_attempts=3, jitter=False)
+        self.assertIsNotNone(policy.retry_delay('GET', 1))
+        self.assertIsNotNone(policy.retry_delay('delete', 1))
+        self.assertIsNone(policy.retry_delay('post', 1))
+        self.assertIsNone(policy.retry_delay('patch', 1))
+
+    def test_retry_after(self):
+        """!
+        @brief Test that the Retry-After header overrides the backoff delay.
+        """
+        policy = productstatus.retry.RetryPolicy(max_attempts=3, jitter=False)
+        response = mock.MagicMock(headers={'Retry-After': '7'})
+        self.assertEqual(policy.retry_delay('get', 1, response), 7)
+        policy.respect_retry_after = False
+        self.assertEqual(policy.retry_delay('get', 1, response), 0.1)
+
+    def test_parse_retry_after(self):
+        self.assertIsNone(productstatus.retry.parse_retry_after(None))
+        self.assertIsNone(productstatus.retry.parse_retry_after('soon'))
+        self.assertEqual(productstatus.retry.parse_retry_after('2.5'), 2.5)
+        value = email.utils.formatdate(time.time() + 60, usegmt=True)
+        self.assertTrue(55 < productstatus.retry.parse_retry_after(value) <= 60)
+        value = email.utils.formatdate(time.time() - 60, usegmt=True)
+        self.assertEqual(productstatus.retry.parse_retry_after(value), 0)
+
+    def test_hedge_delay(self):
+        """!
+        @brief Test that GET requests are hedged after a percentile of recent latencies.
+        """
+        policy = productstatus.retry.RetryPolicy(hedge_percentile=90, hedge_min_samples=10)
+        for latency in range(1, 10):
+            policy.record_latency('get', latency / 100.0)
+        self.assertIsNone(policy.hedge_delay('get'))
+        policy.record_latency('get', 0.1)
+        policy.record_latency('post', 5)
+        self.assertEqual(policy.hedge_delay('get'), 0.1)
+        self.assertIsNone(policy.hedge_delay('post'))
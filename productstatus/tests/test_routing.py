@@ -0,0 +1,109 @@
+import unittest
+import pickle
+
+import productstatus.routing
+
+
+class EndpointRouterTest(unittest.TestCase):
+    def setUp(self):
+        self.router = productstatus.routing.EndpointRouter(['http://a', 'http://b'], smoothing=1.0, eject_after=2)
+
+    def request(self, latency=0.1, ok=True):
+        endpoint = self.router.choose()
+        self.router.finish(endpoint, latency, ok)
+        return endpoint.url
+
+    def test_lowest_latency(self):
+        """!
+        @brief Test that unmeasured servers are tried first, and that the
+        server with the lowest latency is preferred afterwards.
+        """
+        self.assertEqual(self.request(0.2), 'http://a')
+        self.assertEqual(self.request(0.1), 'http://b')
+        self.assertEqual(self.request(0.1), 'http://b')
+
+    def test_in_flight(self):
+        """!
+        @brief Test that requests in flight spread load across servers with similar latency.
+        """
+        self.request(0.1)
+        self.request(0.15)
+        first = self.router.choose()
+        second = self.router.choose()
+        self.assertEqual((first.url, second.url), ('http://a', 'http://b'))
+
+    def test_unmeasured_in_flight(self):
+        """!
+        @brief Test that unmeasured servers are assumed to have the mean
+        latency of the others, or the initial latency, so that requests in
+        flight to them count.
+        """
+        self.request(0.1)
+        self.router.endpoints[1].in_flight = 3
+        self.assertEqual(self.request(0.1), 'http://a')
+        self.router.initial_latency = 0.01
+        self.assertEqual(self.request(0.1), 'http://b')
+
+    def test_read_after_write(self):
+        """!
+        @brief Test that reads are sent to the primary server for a while after a write.
+        """
+        self.request(1.0)
+        self.request(0.1)
+        self.router.record_write()
+        self.assertEqual(self.request(1.0), 'http://a')
+        self.router._primary_until = 0.0
+        self.assertEqual(self.request(), 'http://b')
+        self.router.read_after_write = 0
+        self.router.record_write()
+        self.assertEqual(self.request(), 'http://b')
+
+    def test_ejection(self):
+        """!
+        @brief Test that failing servers are ejected, retried afterwards, and
+        ejected for longer if they fail again.
+        """
+        self.request(0.1)
+        self.request(0.2)
+        self.request(ok=False)
+        self.request(ok=False)
+        self.assertEqual([x['ejected'] for x in self.router.stats()], [True, False])
+        self.assertEqual(self.request(), 'http://b')
+        endpoint = self.router.endpoints[0]
+        endpoint.ejected_until = 0
+        self.assertEqual(self.request(ok=False), 'http://a')
+        self.assertEqual(endpoint.ejections, 2)
+        self.assertTrue(self.router.stats()[0]['ejected'])
+
+    def test_all_ejected(self):
+        """!
+        @brief Test that the server recovering first is used when all are ejected.
+        """
+        for endpoint, ejected_until in zip(self.router.endpoints, [2e9, 1e9]):
+            endpoint.ejected_until = ejected_until
+        self.assertEqual(self.request(), 'http://b')
+
+    def test_pickle(self):
+        endpoint = self.router.choose()
+        router = pickle.loads(pickle.dumps(self.router))
+        self.assertEqual([x.in_flight for x in router.endpoints], [0, 0])
+        self.router.finish(endpoint, 0.1, True)
+
+    def test_monotonic_times_reset(self):
+        """!
+        @brief Test that ejections and reads after writes, which are timed
+        with the monotonic clock of this process, are forgotten when the
+        router is pickled or the process forks.
+        """
+        self.router.record_write()
+        self.request(ok=False)
+        self.request(ok=False)
+        self.assertGreater(self.router.endpoints[0].ejected_until, 0.0)
+        state = pickle.dumps(self.router)
+        self.assertNotIn(b'ejected_until', state)
+        self.assertNotIn(b'_primary_until', state)
+        for router in [pickle.loads(state), self.router]:
+            router._reset_after_fork()
+            self.assertEqual([x.ejected_until for x in router.endpoints], [0.0, 0.0])
+            self.assertEqual(router._primary_until, 0.0)
+            self.assertEqual([x.ejections for x in router.endpoints], [1, 0])
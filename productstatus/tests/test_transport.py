@@ -0,0 +1,139 @@
+import unittest
+import threading
+import json
+import http.server
+import importlib.util
+
+import productstatus.api
+import productstatus.exceptions
+import productstatus.transport
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# HTTP/2 support in httpx requires the h2 package
+if importlib.util.find_spec('h2') is None:
+    httpx = None
+
+
+FOO_RESOURCE = {
+    'id': '66340f0b-2c2c-436d-a077-3d939f4f7283',
+    'resource_uri': '/api/v1/foo/66340f0b-2c2c-436d-a077-3d939f4f7283/',
+    'number': 1,
+}
+
+SCHEMAS = {
+    '/api/v1/': {'foo': {'list_endpoint': '/api/v1/foo/', 'schema': '/api/v1/foo/schema/'}},
+    '/api/v1/foo/schema/': {'fields': {
+        'id': {'type': 'string', 'readonly': False, 'nullable': False},
+        'resource_uri': {'type': 'string', 'readonly': True, 'nullable': False},
+        'number': {'type': 'integer', 'readonly': False, 'nullable': True},
+    }},
+    FOO_RESOURCE['resource_uri']: FOO_RESOURCE,
+}
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """!
+    @brief Serves a minimal Productstatus API, recording all requests on the server.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def respond(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length).decode('UTF-8')
+        self.server.requests.append((self.command, self.path, dict(self.headers), body))
+        path = self.path.split('?')[0]
+        if path in SCHEMAS:
+            content = json.dumps(SCHEMAS[path]).encode('UTF-8')
+            self.send_response(200)
+        else:
+            content = b'Not found'
+            self.send_response(404)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = respond
+    do_POST = respond
+    do_PATCH = respond
+
+
+class TransportTest(unittest.TestCase):
+    transport = 'requests'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        cls.server.requests = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+        cls.base_url = 'http://127.0.0.1:%d' % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+
+    def setUp(self):
+        del self.server.requests[:]
+        self.api = productstatus.api.Api(self.base_url, username='user', api_key='key', transport=self.transport)
+
+    def tearDown(self):
+        self.api.close()
+
+    def test_get(self):
+        """!
+        @brief Test that resources are fetched with credentials and query parameters.
+        """
+        self.assertEqual(self.api.foo[FOO_RESOURCE['id']].number, 1)
+        response = self.api._do_request('get', self.base_url + '/api/v1/', params=[('a', [1, 2]), ('b', True)])
+        self.assertEqual(self.api._get_response_data(response), SCHEMAS['/api/v1/'])
+        method, path, headers, body = self.server.requests[-1]
+        self.assertEqual(path, '/api/v1/?a=1&a=2&b=True')
+        self.assertEqual(headers['Authorization'], 'ApiKey user:key')
+        self.assertEqual(headers['content-type'], 'application/json')
+
+    def test_patch(self):
+        resource = self.api.foo[FOO_RESOURCE['id']]
+        resource.number = 2
+        resource.save()
+        self.assertEqual(self.server.requests[-1][0], 'PATCH')
+        self.assertEqual(json.loads(self.server.requests[-1][3]), {'number': 2})
+
+    def test_not_found(self):
+        with self.assertRaises(productstatus.exceptions.NotFoundException):
+            self.api._do_request('get', self.base_url + '/api/v1/bar/')
+
+    def test_connection_error(self):
+        """!
+        @brief Test that connection errors raise ServiceUnavailableException.
+        """
+        transport = self.api._create_transport()
+        with self.assertRaises(productstatus.exceptions.TransportException):
+            transport.request('get', 'http://127.0.0.1:1/', timeout=1)
+        with self.assertRaises(productstatus.exceptions.ServiceUnavailableException):
+            productstatus.api.Api('http://127.0.0.1:1', transport=self.transport)._do_request('get', 'http://127.0.0.1:1/')
+        transport.close()
+
+
+@unittest.skipIf(httpx is None, 'httpx with HTTP/2 support is not installed')
+class HttpxTransportTest(TransportTest):
+    transport = 'httpx'
+
+
+class TransportClassTest(unittest.TestCase):
+    def test_get_transport_class(self):
+        self.assertIs(productstatus.transport.get_transport_class('requests'), productstatus.transport.RequestsTransport)
+        self.assertIs(productstatus.transport.get_transport_class(productstatus.transport.HttpxTransport),
+                      productstatus.transport.HttpxTransport)
+        with self.assertRaises(ValueError):
+            productstatus.transport.get_transport_class('foo')
+        with self.assertRaises(ValueError):
+            productstatus.transport.get_transport_class(42)
@@ -1,5 +1,8 @@
 import unittest
 import datetime
+import functools
+import sys
+import types
 import dateutil.tz
 
 import productstatus.utils
@@ -25,6 +28,170 @@ class SerializeBaseTest(unittest.TestCase):
             self.class_._serialize_datetime(dt)
 
 
+class Nested(productstatus.utils.SerializeBase):
+    __serializable__ = ['value']
+
+    def __init__(self, value=None):
+        self.value = value
+
+
+class Serializable(productstatus.utils.SerializeBase):
+    __serializable__ = ['number', 'text', 'nested', 'timestamp']
+
+    def serialize_number(self, value):
+        return str(value)
+
+    def unserialize_number(self, value):
+        return int(value)
+
+    @staticmethod
+    def serialize_text(value):
+        return value.upper()
+
+    def serialize_timestamp(self, value):
+        return self._serialize_datetime(value)
+
+    def unserialize_timestamp(self, value):
+        return self._unserialize_datetime(value)
+
+
+class SerializableChild(Serializable):
+    __serializable__ = ['number']
+
+
+class SerializeBasePlanTest(unittest.TestCase):
+    def setUp(self):
+        self.object_ = Serializable()
+        self.object_.number = 5
+        self.object_.text = 'foo'
+        self.object_.nested = Nested(1)
+        self.object_.timestamp = datetime.datetime.utcfromtimestamp(3661).replace(tzinfo=dateutil.tz.tzutc())
+        self.serialized = {
+            'number': '5',
+            'text': 'FOO',
+            'nested': {'value': 1},
+            'timestamp': '1970-01-01T01:01:01Z',
+        }
+
+    def test_serialize(self):
+        self.assertEqual(self.object_.serialize(), self.serialized)
+
+    def test_serialize_missing_member(self):
+        object_ = Nested()
+        del object_.value
+        self.assertEqual(object_.serialize(), {'value': None})
+
+    def test_unserialize(self):
+        object_ = Serializable()
+        object_.unserialize({
+            'number': '5',
+            'text': 'foo',
+            'nested': {'value': 1},
+            'timestamp': '1970-01-01T01:01:01Z',
+        })
+        self.assertEqual(object_.number, 5)
+        self.assertEqual(object_.text, 'foo')
+        self.assertEqual(object_.nested, {'value': 1})
+        self.assertEqual(object_.timestamp, self.object_.timestamp)
+
+    def test_plan_per_class(self):
+        """!
+        @brief Test that subclasses compile their own serialization plan.
+        """
+        self.assertEqual(self.object_.serialize(), self.serialized)
+        child = SerializableChild()
+        child.number = 3
+        self.assertEqual(child.serialize(), {'number': '3'})
+        self.assertEqual(self.object_.serialize(), self.serialized)
+
+
+class Upper(object):
+    """!
+    @brief Callable object used as a converter.
+    """
+
+    def __call__(self, value):
+        return value.upper()
+
+
+class CallableConverters(productstatus.utils.SerializeBase):
+    __serializable__ = ['number', 'text', 'label']
+
+    serialize_number = functools.partial(str)
+    unserialize_number = functools.partial(int)
+    serialize_text = Upper()
+    unserialize_label = len
+
+
+class SerializeBaseConverterTest(unittest.TestCase):
+    def serialize(self, object_, reflective):
+        return {key: func(object_, getattr(object_, key, None))
+                for key, func in object_._get_serialize_plan(reflective)}
+
+    def unserialize(self, object_, data, reflective):
+        for key, func in object_._get_unserialize_plan(reflective):
+            setattr(object_, key, data[key] if func is None else func(object_, data[key]))
+        return dict((key, getattr(object_, key)) for key in object_.__serializable__)
+
+    def assertSamePaths(self, make_object, data):
+        """!
+        @brief Assert that the compiled and the reflective converters give
+        the same output, and return it.
+        """
+        serialized = self.serialize(make_object(), False)
+        self.assertEqual(serialized, self.serialize(make_object(), True))
+        unserialized = self.unserialize(make_object(), data, False)
+        self.assertEqual(unserialized, self.unserialize(make_object(), data, True))
+        return serialized, unserialized
+
+    def test_callable_objects(self):
+        """!
+        @brief Test that converters which are not plain functions are called
+        with the value only.
+        """
+        def make_object():
+            object_ = CallableConverters()
+            object_.number = 5
+            object_.text = 'foo'
+            object_.label = 'bar'
+            return object_
+        data = {'number': '5', 'text': 'foo', 'label': 'bar'}
+        serialized, unserialized = self.assertSamePaths(make_object, data)
+        self.assertEqual(serialized, {'number': '5', 'text': 'FOO', 'label': 'bar'})
+        self.assertEqual(unserialized, {'number': 5, 'text': 'foo', 'label': 3})
+        self.assertEqual(make_object().serialize(), serialized)
+
+    def test_plain_methods(self):
+        def make_object():
+            object_ = Serializable()
+            object_.number = 5
+            object_.text = 'foo'
+            object_.nested = Nested(1)
+            object_.timestamp = datetime.datetime.utcfromtimestamp(3661).replace(tzinfo=dateutil.tz.tzutc())
+            return object_
+        data = {'number': '5', 'text': 'foo', 'nested': {'value': 1}, 'timestamp': '1970-01-01T01:01:01Z'}
+        self.assertSamePaths(make_object, data)
+
+    def test_instance_converters(self):
+        """!
+        @brief Test that converters set on an instance override the ones of its class.
+        """
+        object_ = Serializable()
+        object_.number = 5
+        object_.text = 'foo'
+        object_.nested = None
+        object_.timestamp = None
+        object_.serialize_number = lambda value: value * 2
+        object_.serialize_timestamp = lambda value: 'never'
+        object_.unserialize_text = lambda value: value[::-1]
+        self.assertEqual(object_.serialize(), {'number': 10, 'text': 'FOO', 'nested': None, 'timestamp': 'never'})
+        object_.unserialize({'number': '7', 'text': 'foo', 'nested': None, 'timestamp': '1970-01-01T01:01:01Z'})
+        self.assertEqual((object_.number, object_.text), (7, 'oof'))
+        other = Serializable()
+        other.unserialize({'number': '7', 'text': 'foo', 'nested': None, 'timestamp': '1970-01-01T01:01:01Z'})
+        self.assertEqual((other.number, other.text), (7, 'foo'))
+
+
 class TestUtilsTest(unittest.TestCase):
     def test_build_url(self):
         url = productstatus.utils.build_url('a', 'b', 'c')
@@ -33,3 +200,32 @@ class TestUtilsTest(unittest.TestCase):
     def test_build_url_slash(self):
         url = productstatus.utils.build_url('/a', '/b/', 'c/')
         self.assertEqual(url, 'a/b/c/')
+
+
+class ResolveLocationTest(unittest.TestCase):
+    def test_relative(self):
+        self.assertEqual(productstatus.utils.resolve_location('http://a', '/api/v1/foo/1/'),
+                         'http://a/api/v1/foo/1/')
+
+    def test_absolute(self):
+        """!
+        @brief Test that absolute Location URLs are rebased onto the base URL.
+        """
+        self.assertEqual(productstatus.utils.resolve_location('http://a', 'http://b:8000/api/v1/foo/1/'),
+                         'http://a/api/v1/foo/1/')
+        self.assertEqual(productstatus.utils.resolve_location('http://a/ps', 'http://b/ps/api/v1/foo/1/'),
+                         'http://a/ps/api/v1/foo/1/')
+
+
+class IsLibraryFrameTest(unittest.TestCase):
+    def frame(self, module):
+        return types.SimpleNamespace(f_globals={'__name__': module})
+
+    def test_library(self):
+        for module in ['productstatus', 'productstatus.api', 'productstatus.aio']:
+            self.assertTrue(productstatus.utils.is_library_frame(self.frame(module)), module)
+
+    def test_calling_program(self):
+        for module in ['__main__', 'productstatus_extras', 'productstatus.tests.test_utils']:
+            self.assertFalse(productstatus.utils.is_library_frame(self.frame(module)), module)
+        self.assertFalse(productstatus.utils.is_library_frame(sys._getframe()))
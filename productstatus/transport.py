@@ -0,0 +1,204 @@
+"""!
+HTTP transports used by the Productstatus client library.
+
+A transport sends HTTP requests on behalf of an Api object, and returns
+response objects with `status_code`, `headers`, `content` and `text`
+attributes. Transports must be safe to use from several threads at once, and
+raise productstatus.exceptions.TransportException when a request cannot be
+completed.
+
+Two transports are available:
+
+* `requests`, the default, which uses a pool of HTTP/1.1 connections, each
+  serving one request at a time.
+* `httpx`, which negotiates HTTP/2 where the server supports it, and then
+  multiplexes all concurrent requests to a server over one connection. It
+  requires the `httpx` package with HTTP/2 support, installed with
+  `pip install productstatus-client[http2]`.
+"""
+
+import requests
+import requests.auth
+import requests.adapters
+
+import productstatus.exceptions
+
+
+def query_parameters(params):
+    """!
+    @brief Convert query parameters, given as a dictionary or a list of
+    (key, value) tuples, into a list of (key, value) tuples encoded the same
+    way as by the `requests` library.
+    """
+    if isinstance(params, dict):
+        params = sorted(params.items())
+    result = []
+    for key, value in params:
+        for item in (value if isinstance(value, list) else [value]):
+            if isinstance(item, bool) or not isinstance(item, (str, int, float)):
+                item = str(item)
+            result.append((key, item))
+    return result
+
+
+class TastypieApiKeyAuth(requests.auth.AuthBase):
+    """
+    Django Tastypie requires a special Authorization header format, which is
+    implemented by this class.
+    """
+
+    def __init__(self, username, api_key):
+        self.username = username
+        self.api_key = api_key
+
+    def __call__(self, request):
+        request.headers.update({'Authorization': 'ApiKey %s:%s' % (self.username, self.api_key)})
+        return request
+
+
+class Transport(object):
+    """!
+    @brief Base class for HTTP transports.
+    """
+
+    def __init__(self, verify_ssl=True, username=None, api_key=None,
+                 pool_connections=10, pool_maxsize=10, pool_block=False, keep_alive=True):
+        """!
+        @param verify_ssl Whether or not to verify SSL certificates.
+        @param username Client API username.
+        @param api_key Client API key.
+        @param pool_connections Number of hosts to keep connection pools for.
+        @param pool_maxsize Maximum number of connections kept open to one host.
+        @param pool_block If True, wait for a free connection when
+            `pool_maxsize` connections to a host are in use.
+        @param keep_alive Whether or not to reuse connections between requests.
+        """
+        self.verify_ssl = verify_ssl
+        self.username = username
+        self.api_key = api_key
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+
+    def has_credentials(self):
+        return bool(self.username and self.api_key)
+
+    def request(self, method, url, params=None, data=None, timeout=None):
+        """!
+        @brief Send a request, and return the response.
+        @param method HTTP method.
+        @param url Absolute URL.
+        @param params List of query string parameters as (key, value) tuples.
+        @param data Request body, as a string.
+        @param timeout Timeout in seconds, or None.
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """!
+        @brief Close all connections.
+        """
+        pass
+
+    def _reset_after_fork(self):
+        """!
+        @brief Called in child processes after os.fork(), before the inherited
+        transport is discarded without being closed.
+        """
+        pass
+
+
+class RequestsTransport(Transport):
+    """!
+    @brief HTTP/1.1 transport using a `requests` session.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(RequestsTransport, self).__init__(*args, **kwargs)
+        self.session = requests.Session()
+        self.session.verify = self.verify_ssl
+        self.session.headers.update({'content-type': 'application/json'})
+        if not self.keep_alive:
+            self.session.headers.update({'connection': 'close'})
+        adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_connections,
+                                                pool_maxsize=self.pool_maxsize,
+                                                pool_block=self.pool_block)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if self.has_credentials():
+            self.session.auth = TastypieApiKeyAuth(self.username, self.api_key)
+
+    def request(self, method, url, params=None, data=None, timeout=None):
+        try:
+            return self.session.request(method, url, params=params, data=data, timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            raise productstatus.exceptions.TransportException(str(e))
+
+    def close(self):
+        self.session.close()
+
+
+class HttpxTransport(Transport):
+    """!
+    @brief HTTP/2 transport using a `httpx` client.
+
+    The connection limits apply to the whole client: at most `pool_maxsize`
+    connections are kept open, and if `pool_block` is set, no more than
+    that number of connections are opened at all. With HTTP/2, one
+    connection per server is usually enough.
+
+    HTTP/2 is negotiated during the TLS handshake. On unencrypted connections
+    it is only used if `http1` is disabled, and the server is known to
+    support it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.http1 = kwargs.pop('http1', True)
+        self.http2 = kwargs.pop('http2', True)
+        super(HttpxTransport, self).__init__(*args, **kwargs)
+        # httpx is an optional dependency, imported only when used
+        import httpx
+        self._exceptions = (httpx.HTTPError, httpx.InvalidURL)
+        headers = {'content-type': 'application/json'}
+        if not self.keep_alive:
+            headers['connection'] = 'close'
+        if self.has_credentials():
+            headers['Authorization'] = 'ApiKey %s:%s' % (self.username, self.api_key)
+        limits = httpx.Limits(
+            max_connections=self.pool_maxsize if self.pool_block else None,
+            max_keepalive_connections=self.pool_maxsize if self.keep_alive else 0,
+        )
+        self.client = httpx.Client(http1=self.http1, http2=self.http2, verify=self.verify_ssl, headers=headers, limits=limits)
+
+    def request(self, method, url, params=None, data=None, timeout=None):
+        try:
+            if params is not None:
+                params = query_parameters(params)
+            return self.client.request(method.upper(), url, params=params, content=data, timeout=timeout)
+        except self._exceptions as e:
+            raise productstatus.exceptions.TransportException(str(e))
+
+    def close(self):
+        self.client.close()
+
+
+# Transports selectable by name in the Api constructor.
+TRANSPORTS = {
+    'requests': RequestsTransport,
+    'httpx': HttpxTransport,
+}
+
+
+def get_transport_class(transport):
+    """!
+    @brief Return a Transport class given its name in TRANSPORTS. Transport
+    classes, and other callables returning Transport objects, such as
+    `functools.partial` objects, are returned unchanged.
+    """
+    if callable(transport):
+        return transport
+    try:
+        return TRANSPORTS[transport]
+    except (KeyError, TypeError):
+        raise ValueError('Unknown transport %r; use one of: %s' % (transport, ', '.join(sorted(TRANSPORTS))))
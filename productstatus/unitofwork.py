@@ -0,0 +1,177 @@
+"""!
+The productstatus.unitofwork module collects new and changed resources, and
+saves them together in dependency order.
+
+Example usage:
+
+with api.session() as session:
+    productinstance = api.productinstance.create()
+    productinstance.product = product
+    ...
+    data = api.data.create()
+    data.productinstance = productinstance
+    ...
+# productinstance is saved first, then data.
+"""
+
+import logging
+
+import productstatus.api
+import productstatus.exceptions
+
+
+class Session(object):
+    """!
+    @brief A unit of work that tracks new and changed Resource objects, and
+    saves them when flushed.
+
+    While a session is active, any Resource of the same Api whose attributes
+    are changed is added to the session automatically. When the session is
+    flushed, resources are sorted into levels using their to-one relations,
+    so that every resource is saved after the resources it refers to. All
+    EvaluatedResource values in one level are evaluated concurrently, and then
+    all resources in the level are saved concurrently, using bulk saves for
+    each resource type.
+
+    A session is flushed when its `with` block exits without an exception.
+    """
+
+    def __init__(self, api, chunk_size=100, max_workers=8):
+        """!
+        @param api The productstatus.api.Api object.
+        @param chunk_size Maximum number of resources per bulk save request.
+        @param max_workers Maximum number of concurrent requests.
+        """
+        self._api = api
+        self._chunk_size = chunk_size
+        self._max_workers = max_workers
+        self._resources = []
+        self._resource_ids = set()
+
+    def add(self, resource):
+        """!
+        @brief Add a Resource object to this session.
+        """
+        if id(resource) in self._resource_ids:
+            return
+        self._resource_ids.add(id(resource))
+        self._resources.append(resource)
+
+    def _pending(self):
+        """!
+        @brief Return a list of all tracked resources with unsaved changes,
+        including unsaved resources they refer to, whether or not any of their
+        fields have been set.
+        """
+        pending = []
+        seen = set()
+        stack = list(reversed(self._resources))
+        while stack:
+            resource = stack.pop()
+            if id(resource) in seen or not resource._needs_save():
+                continue
+            seen.add(id(resource))
+            pending.append(resource)
+            stack += [x for x in _referenced_resources(resource) if not x._has_url()]
+        return pending
+
+    def _levels(self, resources):
+        """!
+        @brief Sort resources into a list of dependency levels. Resources in a
+        level refer only to resources in earlier levels.
+        """
+        pending = dict((id(x), x) for x in resources)
+        dependencies = dict(
+            (id(x), set(id(y) for y in _referenced_resources(x) if id(y) in pending))
+            for x in resources
+        )
+        levels = []
+        done = set()
+        remaining = list(resources)
+        while remaining:
+            level = [x for x in remaining if dependencies[id(x)] <= done]
+            if not level:
+                raise productstatus.exceptions.ProductstatusException(
+                    'Circular references between unsaved resources: %s' % remaining
+                )
+            levels.append(level)
+            done.update(id(x) for x in level)
+            remaining = [x for x in remaining if id(x) not in done]
+        return levels
+
+    def _flush_level(self, level):
+        """!
+        @brief Save all resources in a dependency level, one bulk save per
+        resource type, running concurrently.
+        """
+        productstatus.api.resolve_evaluated_resources(level, max_workers=self._max_workers)
+        groups = {}
+        for resource in level:
+            groups.setdefault(resource._collection._resource_name, []).append(resource)
+
+        def save_group(resources):
+            return resources[0]._collection.bulk_save(resources,
+                                                      chunk_size=self._chunk_size,
+                                                      max_workers=self._max_workers)
+
+        self._api._map_concurrently(save_group, list(groups.values()), self._max_workers)
+
+    def flush(self):
+        """!
+        @brief Save all new and changed resources in dependency order.
+        """
+        levels = self._levels(self._pending())
+        for index, level in enumerate(levels):
+            logging.info('%s: saving %d resources in level %d of %d' % (self, len(level), index + 1, len(levels)))
+            self._flush_level(level)
+        self._resources = []
+        self._resource_ids = set()
+
+    def __enter__(self):
+        self._api._sessions.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._api._sessions.remove(self)
+        if exc_type is None:
+            self.flush()
+
+    def __repr__(self):
+        return '<Session on %s>' % self._api
+
+
+def _find_resources(value):
+    """!
+    @brief Return a list of Resource objects found in a value, searching
+    through lists, tuples and dictionary values.
+    """
+    if isinstance(value, productstatus.api.Resource):
+        return [value]
+    if isinstance(value, (list, tuple)):
+        return [x for item in value for x in _find_resources(item)]
+    if isinstance(value, dict):
+        return [x for item in value.values() for x in _find_resources(item)]
+    return []
+
+
+def _referenced_resources(resource):
+    """!
+    @brief Return a list of Resource objects that must be saved before the
+    given resource can be saved.
+
+    For EvaluatedResource values that have not been evaluated yet, Resource
+    objects in the function arguments are dependencies, because the function
+    typically needs them to be stored on the server.
+    """
+    references = []
+    for name in resource._changed_fields():
+        value = resource._data[name]
+        if isinstance(value, productstatus.api.EvaluatedResource):
+            if value._resource is not None:
+                value = value._resource
+            else:
+                references += _find_resources(list(value.args) + list(value.kwargs.values()))
+                continue
+        if isinstance(value, productstatus.api.Resource):
+            references.append(value)
+    return references
@@ -1,5 +1,7 @@
 import datetime
-import dateutil.tz
+import functools
+import inspect
+import urllib.parse
 
 
 def build_url(*args):
@@ -10,43 +12,178 @@ def build_url(*args):
     return '/'.join([x.strip('/') for x in args]) + '/'
 
 
+def resolve_location(base_url, location):
+    """
+    Return the URL of a resource given in a Location header, relative to the
+    server at base_url. Absolute URLs are rebased onto base_url, as the
+    server may name itself differently than the client does, e.g. behind a
+    proxy or when several servers are used.
+    """
+    path = urllib.parse.urlsplit(location).path
+    if '://' in location:
+        prefix = urllib.parse.urlsplit(base_url).path.rstrip('/')
+        if prefix and path.startswith(prefix + '/'):
+            path = path[len(prefix):]
+    return build_url(base_url, path)
+
+
+def parse_datetime(value):
+    """
+    Return a DateTime object from an ISO 8601 string.
+    """
+    # dateutil is slow to import, and only loaded when first needed
+    import dateutil.parser
+    return dateutil.parser.parse(value)
+
+
 def get_utc_now():
     """
     Return a time-zone aware DateTime object with the current date and time
     """
-    return datetime.datetime.utcnow().replace(tzinfo=dateutil.tz.tzutc())
+    return datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
+
+
+def is_library_frame(frame):
+    """
+    Return True if a stack frame belongs to a function of the client library
+    itself, rather than to the calling program. The library's own tests count
+    as a calling program.
+    """
+    module = frame.f_globals.get('__name__', '')
+    if module.startswith('productstatus.tests'):
+        return False
+    return module == 'productstatus' or module.startswith('productstatus.')
+
+
+def _serialize_value(instance, value):
+    """
+    Default member serializer: use the value's own serialize() method if it
+    has one, otherwise return the value unchanged.
+    """
+    if hasattr(value, 'serialize'):
+        return value.serialize()
+    return value
+
+
+def _compile_converter(cls, name, default):
+    """
+    Return the converter method called `name` on `cls` as a function taking
+    (instance, value), or `default` if no such method exists. Converters that
+    are not plain functions, static methods or class methods, such as
+    functools.partial objects or other callable objects, are looked up on
+    the instance by _reflective_converter() instead.
+    """
+    static = inspect.getattr_static(cls, name, None)
+    if static is None:
+        return default
+    if isinstance(static, staticmethod):
+        func = static.__func__
+        return lambda instance, value: func(value)
+    if isinstance(static, classmethod):
+        func = getattr(cls, name)
+        return lambda instance, value: func(value)
+    if inspect.isfunction(static):
+        return static
+    if not callable(static) and not hasattr(static, '__get__'):
+        return default
+    return _reflective_converter(name, default)
+
+
+def _reflective_converter(name, default):
+    """
+    Return a function taking (instance, value) which calls the converter
+    method called `name` looked up on the instance, or `default` if the
+    instance has no such method. If `default` is None, the value is returned
+    unchanged.
+    """
+    def convert(instance, value):
+        func = getattr(instance, name, None)
+        if callable(func):
+            return func(value)
+        if default is None:
+            return value
+        return default(instance, value)
+    return convert
 
 
 class SerializeBase(object):
+    """
+    Base class for objects that can be converted to and from JSON encodable
+    data structures. Members listed in __serializable__ are converted using the
+    methods serialize_<member> and unserialize_<member>, if they exist.
+
+    The list of converters is compiled once per class, the first time an
+    object of that class is serialized or unserialized. Objects that set
+    converters of their own as instance attributes are converted by looking
+    up each converter on the object instead.
+    """
     __serializable__ = []
 
+    @classmethod
+    def _get_serialize_plan(cls, reflective=False):
+        """
+        Return a list of (key, converter) tuples used by serialize(). With
+        `reflective`, the converters look up methods on the instance.
+        """
+        attr = '_reflective_serialize_plan' if reflective else '_serialize_plan'
+        plan = cls.__dict__.get(attr)
+        if plan is None:
+            compile_ = _reflective_converter if reflective else functools.partial(_compile_converter, cls)
+            plan = [(key, compile_('serialize_' + key, _serialize_value)) for key in cls.__serializable__]
+            setattr(cls, attr, plan)
+        return plan
+
+    @classmethod
+    def _get_unserialize_plan(cls, reflective=False):
+        """
+        Return a list of (key, converter) tuples used by unserialize(). The
+        converter is None for members that are stored unchanged. With
+        `reflective`, the converters look up methods on the instance.
+        """
+        attr = '_reflective_unserialize_plan' if reflective else '_unserialize_plan'
+        plan = cls.__dict__.get(attr)
+        if plan is None:
+            compile_ = _reflective_converter if reflective else functools.partial(_compile_converter, cls)
+            plan = [(key, compile_('unserialize_' + key, None)) for key in cls.__serializable__]
+            setattr(cls, attr, plan)
+        return plan
+
+    @classmethod
+    def _get_converter_names(cls):
+        """
+        Return the set of names of all converter methods the class may use.
+        """
+        names = cls.__dict__.get('_converter_names')
+        if names is None:
+            names = frozenset(prefix + key for key in cls.__serializable__ for prefix in ('serialize_', 'unserialize_'))
+            cls._converter_names = names
+        return names
+
+    def _has_instance_converters(self):
+        """
+        Return True if the object has converters set as instance attributes.
+        """
+        instance_dict = getattr(self, '__dict__', None)
+        return bool(instance_dict) and not instance_dict.keys().isdisjoint(self._get_converter_names())
+
     def serialize(self):
         """
         Create JSON encodable representation of internal data structure.
         """
         serialized = {}
-        for key in self.__serializable__:
-            func_name = 'serialize_' + key
-            func = getattr(self, func_name, None)
-            serialized[key] = getattr(self, key, None)
-            if callable(func):
-                serialized[key] = func(serialized[key])
-            elif hasattr(serialized[key], 'serialize'):
-                serialized[key] = serialized[key].serialize()
+        for key, func in self._get_serialize_plan(self._has_instance_converters()):
+            serialized[key] = func(self, getattr(self, key, None))
         return serialized
 
     def unserialize(self, data):
         """
         Load internal data structure from JSON decoded dictionary.
         """
-        for key in self.__serializable__:
-            func_name = 'unserialize_' + key
-            func = getattr(self, func_name, None)
-            if callable(func):
-                value = func(data[key])
+        for key, func in self._get_unserialize_plan(self._has_instance_converters()):
+            if func is None:
+                setattr(self, key, data[key])
             else:
-                value = data[key]
-            setattr(self, key, value)
+                setattr(self, key, func(self, data[key]))
 
     def _serialize_datetime(self, value):
         """
@@ -54,11 +191,11 @@ class SerializeBase(object):
         """
         if value.tzinfo is None:
             raise ValueError('Timezone not defined in datetime %s' % value)
-        utc_time = value.astimezone(tz=dateutil.tz.tzutc())
+        utc_time = value.astimezone(tz=datetime.timezone.utc)
         return utc_time.isoformat().replace(' ', 'T').replace('+00:00', 'Z')
 
     def _unserialize_datetime(self, value):
         """
         Return a DateTime object from a ISO 8601 string.
         """
-        return dateutil.parser.parse(value)
+        return parse_datetime(value)
@@ -15,6 +15,10 @@ config = {
         'kafka-python==1.4.3',
         'mock==2.0.0',
     ],
+    'extras_require': {
+        'aio': ['aiohttp>=3.5'],
+        'http2': ['httpx[http2]>=0.23'],
+    },
     'packages': find_packages(),
     'scripts': [],
 }